@@ -0,0 +1,195 @@
+"""
+Benchmark suite timing Simulation.update and GUI.draw_particles across particle counts, type counts and radii.
+Usage: python -m benchmarks.benchmark [--quick] [--max-particles N] [--update-baseline] [--tolerance 0.2]
+Results are saved as JSON tagged with the machine they were measured on and compared against the
+stored baseline of the same machine, so regressions in the hot path show up before they are deployed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numba
+import numpy as np
+from config import simulation_parameters, build_simulation
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+BASELINES_DIR = os.path.join(BENCHMARK_DIR, "baselines")
+
+PARTICLE_COUNTS = (1_000, 10_000, 100_000)
+TYPE_COUNTS = (5, 20, 64)
+RADII = {  # (min_radius, max_radius) regimes, from sparse to crowded neighbourhoods
+    "short": (0.005, 0.03),
+    "medium": (0.01, 0.07),
+    "default": (simulation_parameters["min_radius"], simulation_parameters["max_radius"])
+}
+
+def benchmark_cases(max_particles: int = max(PARTICLE_COUNTS)):
+    """
+    Returns the benchmark cases as dicts with a unique name and the parameters they override.
+    Every radius regime is timed at every particle count, the type counts at 10k particles.
+    The rendering is timed at every particle count.
+    """
+    cases = []
+    for n_particles in PARTICLE_COUNTS:
+        if n_particles > max_particles:
+            continue
+        for regime, (min_radius, max_radius) in RADII.items():
+            cases.append({"name": f"update-n{n_particles}-t5-{regime}", "kind": "update",
+                          "n_particles": n_particles, "n_types": 5, "min_radius": min_radius, "max_radius": max_radius})
+        cases.append({"name": f"draw-n{n_particles}", "kind": "draw", "n_particles": n_particles, "n_types": 5})
+
+    n_particles = min(10_000, max_particles)
+    for n_types in TYPE_COUNTS[1:]:
+        cases.append({"name": f"update-n{n_particles}-t{n_types}-default", "kind": "update",
+                      "n_particles": n_particles, "n_types": n_types})
+    return cases
+
+def machine_tag():
+    """
+    Describes the machine and library versions the results were measured with.
+    """
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "threads": numba.get_num_threads(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__
+    }
+
+def machine_name(tag: dict):
+    """
+    Returns a file name friendly identifier of the machine.
+    """
+    return f"{tag['node']}-{tag['machine']}-{tag['cpus']}cpu".replace(os.sep, "_")
+
+def time_calls(function, repeats: int, min_seconds: float):
+    """
+    Calls function at least `repeats` times and for at least min_seconds after one untimed warm-up call.
+    Returns the median, minimum and mean seconds per call.
+    """
+    function()  # Compiles the kernels and fills caches
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < repeats or time.perf_counter() - start < min_seconds:
+        call_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - call_start)
+    return {"median": float(np.median(timings)), "min": float(np.min(timings)),
+            "mean": float(np.mean(timings)), "calls": len(timings)}
+
+def make_gui(simulation):
+    """
+    Creates a GUI on a display-less SDL surface for timing the particle rendering.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from gui import GUI
+
+    pygame.init()
+    width, height = 1600, 1000
+    screen = pygame.display.set_mode((width, height))
+    controls = defaultdict(lambda: (lambda *args: 0))  # The buttons are never clicked while benchmarking
+    return GUI(screen, width, height, simulation.interaction_matrix, controls)
+
+def run_case(case: dict, repeats: int = 5, min_seconds: float = 1.0, seed: int = 0):
+    """
+    Times a single benchmark case.
+    Returns the timing dict of time_calls extended by the case description.
+    """
+    parameters = {**simulation_parameters, **{key: value for key, value in case.items() if key in simulation_parameters}}
+    simulation = build_simulation(parameters, seed=seed)
+
+    if case["kind"] == "draw":
+        gui = make_gui(simulation)
+        # Moves every particle a little between frames, so all rendered positions are updated
+        offsets = np.random.default_rng(seed).uniform(-0.002, 0.002, simulation.particles.positions.shape)
+        def function():
+            simulation.particles.positions += offsets
+            np.clip(simulation.particles.positions, 0, 1, out=simulation.particles.positions)
+            gui.draw_particles(simulation.particles)
+    else:
+        def function():
+            simulation.update(1 / 30)
+
+    return {**case, **time_calls(function, repeats, min_seconds)}
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2):
+    """
+    Compares the median times of all cases present in both result sets.
+    tolerance (float): Relative slowdown that is still accepted.
+    Returns a list of (name, baseline_median, median, ratio, regressed) tuples.
+    """
+    comparison = []
+    for name, case in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        before, after = baseline["cases"][name]["median"], case["median"]
+        ratio = after / before if before > 0 else float("inf")
+        comparison.append((name, before, after, ratio, ratio > 1 + tolerance))
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the simulation hot path and compare against a baseline.")
+    parser.add_argument("--quick", action="store_true", help="only run cases up to 10k particles with fewer repeats")
+    parser.add_argument("--max-particles", type=int, default=max(PARTICLE_COUNTS), help="skip larger particle counts")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=5, help="minimum timed calls per case")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum timed seconds per case")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as regression")
+    parser.add_argument("--baseline", help="baseline JSON file (defaults to the stored baseline of this machine)")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as this machine's baseline")
+    parser.add_argument("--output", help="results JSON file (defaults to benchmarks/results/<machine>-<time>.json)")
+    args = parser.parse_args(argv)
+
+    max_particles = min(args.max_particles, 10_000) if args.quick else args.max_particles
+    repeats, min_seconds = (3, 0.2) if args.quick else (args.repeats, args.min_seconds)
+
+    tag = machine_tag()
+    results = {"machine": tag, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "cases": {}}
+    for case in benchmark_cases(max_particles):
+        if args.filter not in case["name"]:
+            continue
+        result = run_case(case, repeats, min_seconds)
+        results["cases"][case["name"]] = result
+        print(f"{case['name']:<32} {result['median'] * 1000:10.2f} ms  (min {result['min'] * 1000:.2f} ms, {result['calls']} calls)")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{machine_name(tag)}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}")
+
+    baseline_path = args.baseline or os.path.join(BASELINES_DIR, f"{machine_name(tag)}.json")
+    regressions = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        if machine_name(baseline["machine"]) != machine_name(tag):  # Timings of other machines are not comparable
+            print(f"Warning: baseline was measured on {machine_name(baseline['machine'])}")
+        for name, before, after, ratio, regressed in compare(results, baseline, args.tolerance):
+            print(f"{name:<32} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  {ratio:6.2f}x{'  REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append(name)
+    else:
+        print(f"No baseline at {baseline_path}, run with --update-baseline to store one")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {baseline_path}")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+from numba import njit
+
+BOUNDARY_MODES = ("reflect", "clamp", "soft", "periodic")  # Available ways to treat the edges of the unit square
+
+class Boundaries:
+    """
+    Keeps the particles inside the unit square the simulation takes place in.
+    mode (str): How the edges behave:
+        "reflect": particles are put back onto the edge and their velocity is inverted.
+        "clamp": particles stop at the edge, losing the velocity component pointing outwards.
+        "soft": a repulsive wall of width wall_width pushes approaching particles back gradually.
+        "periodic": particles leaving on one side re-enter on the opposite side (toroidal world),
+            interactions reach across the edges using the minimum image convention.
+    wall_width (float): Thickness of the soft wall.
+    wall_stiffness (float): Velocity change per step at full penetration of the soft wall.
+    """
+    def __init__(self, mode: str = "reflect", wall_width: float = 0.02, wall_stiffness: float = 0.05):
+        """
+        Initializes the boundaries with the given mode and soft wall parameters.
+        """
+        if mode not in BOUNDARY_MODES:
+            raise ValueError(f"Unknown boundary mode '{mode}', expected one of {BOUNDARY_MODES}")
+        self.mode = mode
+        self.wall_width = wall_width
+        self.wall_stiffness = wall_stiffness
+
+    @property
+    def periodic(self):
+        """
+        Whether neighbor search and distances wrap around the edges.
+        """
+        return self.mode == "periodic"
+
+    def apply(self, positions, velocities):
+        """
+        Applies the boundary condition to all particles in place.
+        positions (numpy.ndarray): (N, 2) array of particle positions.
+        velocities (numpy.ndarray): (N, 2) array of particle velocities.
+        """
+        if self.mode == "reflect":
+            reflect(positions, velocities)
+        elif self.mode == "clamp":
+            clamp(positions, velocities)
+        elif self.mode == "soft":
+            soft_wall(positions, velocities, self.wall_width, self.wall_stiffness)
+        else:
+            wrap(positions)
+
+@njit(nogil=True)
+def reflect(positions, velocities):
+    """
+    Rounds every coordinate that is out of bounds onto the edge and inverts the velocity along that axis.
+    """
+    for i in range(positions.shape[0]):
+        for axis in range(2):
+            if positions[i, axis] <= 0 or positions[i, axis] >= 1:  # If the particle is out of bounds along the axis ...
+                positions[i, axis] = round(positions[i, axis])  # ... round its position and ...
+                velocities[i, axis] = -velocities[i, axis]  # ... invert the particle's velocity
+
+@njit(nogil=True)
+def clamp(positions, velocities):
+    """
+    Clamps every coordinate to the unit square and removes the velocity pointing out of it.
+    """
+    for i in range(positions.shape[0]):
+        for axis in range(2):
+            if positions[i, axis] < 0:
+                positions[i, axis] = 0.0
+                velocities[i, axis] = max(velocities[i, axis], 0.0)
+            elif positions[i, axis] > 1:
+                positions[i, axis] = 1.0
+                velocities[i, axis] = min(velocities[i, axis], 0.0)
+
+@njit(nogil=True)
+def soft_wall(positions, velocities, wall_width, wall_stiffness):
+    """
+    Pushes particles within wall_width of an edge back inwards, the harder the deeper they are in the wall.
+    Particles that still pass the edge are clamped onto it.
+    """
+    for i in range(positions.shape[0]):
+        for axis in range(2):
+            position = positions[i, axis]
+            if position < wall_width:  # Near the lower edge the wall pushes in positive direction
+                velocities[i, axis] += wall_stiffness * min((wall_width - position) / wall_width, 1.0)
+            elif position > 1 - wall_width:  # Near the upper edge the wall pushes in negative direction
+                velocities[i, axis] -= wall_stiffness * min((position - 1 + wall_width) / wall_width, 1.0)
+            positions[i, axis] = min(max(position, 0.0), 1.0)
+
+@njit(nogil=True)
+def wrap(positions):
+    """
+    Moves particles that left the unit square to the opposite side.
+    """
+    for i in range(positions.shape[0]):
+        for axis in range(2):
+            position = positions[i, axis] % 1.0
+            positions[i, axis] = 0.0 if position >= 1.0 else position  # Tiny negative values can round up to 1
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+CHECKPOINT_VERSION = 2  # Incremented whenever the stored arrays or metadata change incompatibly
+
+def write_checkpoint(path: str, arrays: dict, metadata: dict):
+    """
+    Writes arrays and metadata to an uncompressed .npz file.
+    The file is written under a temporary name first and then renamed, so an interrupted write
+    never destroys the previous checkpoint.
+    path (str): Target file, conventionally ending in .npz.
+    arrays (dict): Name -> numpy array.
+    metadata (dict): JSON serializable scalars, stored together with the format version.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:  # An open file keeps numpy from appending .npz to the temporary name
+        np.savez(file, metadata=np.array(json.dumps({**metadata, "version": CHECKPOINT_VERSION})), **arrays)
+    os.replace(temporary, path)
+
+def read_checkpoint(path: str):
+    """
+    Reads a file written by write_checkpoint.
+    Returns the dict of arrays and the metadata dict.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        metadata = json.loads(str(data["metadata"]))
+        if metadata.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {metadata.get('version')}, expected {CHECKPOINT_VERSION}")
+        arrays = {name: data[name] for name in data.files if name != "metadata"}
+    return arrays, metadata
+
+class Autosaver:
+    """
+    Periodically saves checkpoints of a simulation without stalling the frame loop.
+    The state is copied on the calling thread, which only takes a few memory copies, and written to disk
+    on a single background thread. If the previous write has not finished yet, the save is postponed.
+    path (str): File the checkpoints are written to, each one replacing the last.
+    interval (float): Minimum number of seconds between two saves.
+    """
+    def __init__(self, path: str, interval: float = 60.0):
+        """
+        Initializes the autosaver, the first checkpoint is written after one interval.
+        """
+        self.path = path
+        self.interval = interval
+        self.save_count = 0
+        self._last_save = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending = None  # Future of the write in progress
+
+    def maybe_save(self, simulation):
+        """
+        Saves a checkpoint in the background if the interval has passed and no write is in progress.
+        Returns True if a save was started.
+        """
+        if time.monotonic() - self._last_save < self.interval:
+            return False
+        if self._pending is not None and not self._pending.done():  # If the disk is slower than the interval
+            return False
+        self.save(simulation)
+        return True
+
+    def save(self, simulation):
+        """
+        Snapshots the simulation now and writes it in the background.
+        """
+        self._report_failure()
+        arrays, metadata = simulation.get_state()  # Copies, so the simulation can continue while writing
+        self._pending = self._executor.submit(write_checkpoint, self.path, arrays, metadata)
+        self._last_save = time.monotonic()
+        self.save_count += 1
+
+    def wait(self):
+        """
+        Blocks until the write in progress has finished, raising its error if it failed.
+        """
+        if self._pending is not None:
+            self._pending.result()
+
+    def close(self):
+        """
+        Finishes the write in progress and stops the background thread.
+        """
+        self._executor.shutdown(wait=True)
+        self._report_failure()
+
+    def _report_failure(self):
+        """
+        Prints the error of a failed background write instead of silently dropping it.
+        """
+        if self._pending is not None and self._pending.done() and self._pending.exception() is not None:
+            print(f"Autosave to {self.path} failed: {self._pending.exception()}")
+            self._pending = None
@@ -0,0 +1,129 @@
+import json
+import numpy as np
+from interactions import InteractionMatrix
+from simulation import Simulation
+
+# Centralizes adjustment of all relevant parameters
+simulation_parameters = {
+    "n_particles": 2000,        # Number of particles 
+    "n_types": 5,               # Number of particle types
+    "time_factor": 0.1,         # Controls simulation speed
+    "force_scaling": 0.2,       # Scales force acting on particles velocity
+    "min_radius": 0.01,         # Distance at which interaction starts and its force is strongest
+    "max_radius": 0.15,         # Distance at which interactions force is weakest and after which it stops
+    "global_repulsion": 0.004,  # Repulsive force acting on all particles
+    "friction": 0.5,            # Slows particles down over time
+    "random_movement": 0,       # Adds random movement to particles position
+    "type_friction": None,      # Friction factor of every particle type, e.g. [1, 1, 0.5, 2, 1] (None = same friction for all)
+    "type_force_scaling": None, # Force scaling factor of every particle type (None = same force scaling for all)
+    "engine": "serial",         # Force pass implementation: "serial", "parallel" (multi-core) or "domains" (multi-process)
+    "threads": None,            # Threads used by the parallel engine (None = all cores)
+    "workers": None,            # Processes used by the domains engine (None = all cores)
+    "grid_subdivisions": 1,     # Grid cells per max_radius (higher = fewer wasted pairs, more cells to visit)
+    "precision": "float64",     # Float type of the particle state and force pass, "float32" halves the memory traffic (see precision.py)
+    "force_model": "analytic",  # "analytic" calculates every pair force, "table" interpolates precomputed tables (no square roots or divisions)
+    "reorder": None,            # Space-filling curve the particles are sorted along for cache locality: "morton", "hilbert" or None (never)
+    "reorder_interval": 100,    # Updates between two reorderings (None = only when too scattered)
+    "reorder_threshold": None,  # Also reorders once this fraction of particles is scattered away from its cell (None = only by interval)
+    "neighbor_search": "cells", # "cells" searches the grid every step, "verlet" reuses neighbor lists while particles move little
+    "verlet_skin": 0.02,        # Extra radius kept in the neighbor lists (larger = fewer rebuilds, more pairs per step)
+    "layout": "uniform",        # Initial particle placement: "uniform", "regions" (a strip per type), "rings" (a ring per type) or "poisson_disk" (evenly spaced)
+    "boundary": "reflect",      # Edge behavior: "reflect", "clamp", "soft" (repulsive wall) or "periodic" (wrap around)
+    "checkpoint": None,         # Checkpoint file to resume from instead of generating a new simulation
+    "autosave_path": None,      # File a checkpoint is written to regularly in the background (None = no autosave)
+    "autosave_interval": 60.0,  # Seconds between two autosaves
+    "record_path": None,        # Directory the particle positions of every update are recorded to (None = no recording)
+    "record_every": 1,          # Records only every n-th update
+    "record_quantization": 65535, # Steps the positions of .ptz recordings are quantized to (fewer = smaller files, see codec.py)
+    "seed": None,               # Seed of all random numbers, the same seed and parameters give an identical run (None = random)
+    "physics_rate": None        # Updates per second on a separate simulation thread (None = one update per drawn frame)
+}
+
+def load_config(path: str):
+    """
+    Reads simulation parameters from a JSON or TOML file.
+    Parameters missing in the file keep their value from simulation_parameters.
+    path (str): Path to a .json or .toml file with a flat table of parameters.
+    Returns the complete parameter dict.
+    """
+    if path.endswith(".toml"):
+        import tomllib  # Only needed for TOML files
+        with open(path, "rb") as file:
+            config = tomllib.load(file)
+    else:
+        with open(path) as file:
+            config = json.load(file)
+
+    unknown = set(config) - set(simulation_parameters)
+    if unknown:  # If the file contains misspelled or unsupported parameters
+        raise ValueError(f"Unknown simulation parameters: {', '.join(sorted(unknown))}")
+
+    return {**simulation_parameters, **config}
+
+def build_simulation(parameters: dict, width: int = 1000, height: int = 1000, seed: int = None):
+    """
+    Creates the interaction matrix and the simulation described by a parameter dict.
+    parameters (dict): Parameters with the keys of simulation_parameters.
+    width, height (int): Size of the area the simulation is displayed in.
+    seed (int): Seeds the generator of the interaction matrix, the particles and their random movement,
+        so the same seed and parameters give an identical run (optional, overrides parameters["seed"]).
+    If parameters["checkpoint"] is set, the simulation continues from that file instead.
+    """
+    if parameters["checkpoint"]:  # If a checkpoint is given, only the machine specific options are taken from parameters
+        simulation = Simulation.from_checkpoint(
+            parameters["checkpoint"], width, height,
+            engine=parameters["engine"],
+            threads=parameters["threads"],
+            workers=parameters["workers"],
+            grid_subdivisions=parameters["grid_subdivisions"],
+            neighbor_search=parameters["neighbor_search"],
+            verlet_skin=parameters["verlet_skin"],
+            force_model=parameters["force_model"],
+            precision=parameters["precision"],
+            reorder=parameters["reorder"],
+            reorder_interval=parameters["reorder_interval"],
+            reorder_threshold=parameters["reorder_threshold"]
+        )
+        simulation.set_autosave(parameters["autosave_path"], parameters["autosave_interval"])
+        simulation.set_recorder(parameters["record_path"], parameters["record_every"], parameters["record_quantization"])
+        return simulation
+
+    # The only source of randomness, shared by the matrix and the simulation
+    rng = np.random.default_rng(seed if seed is not None else parameters["seed"])
+    interaction_matrix = InteractionMatrix(
+        parameters["n_types"],
+        parameters["min_radius"],
+        parameters["max_radius"],
+        parameters["global_repulsion"],
+        rng
+    )
+
+    simulation = Simulation(
+        width, height,
+        interaction_matrix,
+        parameters["n_particles"],
+        parameters["n_types"],
+        parameters["time_factor"],
+        parameters["force_scaling"],
+        parameters["friction"],
+        parameters["random_movement"],
+        engine=parameters["engine"],
+        threads=parameters["threads"],
+        workers=parameters["workers"],
+        grid_subdivisions=parameters["grid_subdivisions"],
+        neighbor_search=parameters["neighbor_search"],
+        verlet_skin=parameters["verlet_skin"],
+        boundary=parameters["boundary"],
+        layout=parameters["layout"],
+        force_model=parameters["force_model"],
+        precision=parameters["precision"],
+        reorder=parameters["reorder"],
+        reorder_interval=parameters["reorder_interval"],
+        reorder_threshold=parameters["reorder_threshold"],
+        rng=rng
+    )
+    simulation.set_type_friction(parameters["type_friction"])
+    simulation.set_type_force_scaling(parameters["type_force_scaling"])
+    simulation.set_autosave(parameters["autosave_path"], parameters["autosave_interval"])
+    simulation.set_recorder(parameters["record_path"], parameters["record_every"], parameters["record_quantization"])
+    return simulation
@@ -0,0 +1,341 @@
+"""
+Spatial domain decomposition of the unit square across worker processes.
+The square is split into vertical strips, each owned by one worker process that integrates its particles,
+calculates their forces and applies the boundaries. All particle data lives in shared memory, in two
+buffers that swap roles every step:
+1. Every worker integrates its particles and counts how many of them now belong to each strip.
+2. From these counts every worker knows where to copy its particles in the other buffer, so particles
+   that crossed a strip border migrate to their new owner without any process sorting all particles.
+3. Every worker copies the halo, the particles of the neighbouring strips within max_radius of its own,
+   straight out of the shared buffer and calculates the forces of its particles with the usual cell grid.
+The main process only copies the particles of the new buffer into the simulation's ParticleStore for drawing.
+"""
+import multiprocessing
+import os
+import threading
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+from interactions import InteractionMatrix
+from engine import CellGrid
+from boundaries import Boundaries
+from particle import integrate_particles, apply_scaled_forces
+
+MIN_CAPACITY = 1024  # Smallest number of particles the shared buffers are allocated for
+PARAMETERS = ("dt", "time_factor", "friction", "force_scaling", "random_movement",
+              "max_radius", "min_radius", "global_repulsion")  # Values sent to the workers every step
+STEP, STOP = 1, 0  # Commands of the workers
+BARRIERS_PER_STEP = 5  # Start, counted, migrated, halo copied, done
+
+class SharedArrays:
+    """
+    Numpy arrays carved out of a single shared memory block, which other processes can map by its name.
+    fields (dict): Array name -> (shape, dtype).
+    name (str): Name of an existing block to attach to, a new block is created if None.
+    """
+    def __init__(self, fields: dict, name: str = None):
+        """
+        Creates or attaches the shared memory block and the array views onto it.
+        """
+        self.fields = fields
+        offsets, size = {}, 0
+        for field, (shape, dtype) in fields.items():
+            offsets[field] = size
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8  # Keeps every array 8 byte aligned
+
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(size, 8))
+        self.name = self.shm.name
+        self.arrays = {field: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offsets[field])
+                       for field, (shape, dtype) in fields.items()}
+
+    def __getitem__(self, field):
+        return self.arrays[field]
+
+    def close(self, unlink: bool = False):
+        """
+        Unmaps the block, unlink removes it once every process closed it.
+        """
+        self.arrays = {}  # The views have to be released before the memory can be unmapped
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def strip_of(x, num_domains: int, periodic: bool):
+    """
+    Returns the index of the strip every x coordinate belongs to.
+    Coordinates outside the unit square are wrapped around in a periodic world and clamped to the edge strips otherwise.
+    """
+    x = np.mod(x, 1.0) if periodic else np.clip(x, 0.0, 1.0)
+    return np.minimum((x * num_domains).astype(np.int64), num_domains - 1)
+
+def halo_mask(x, domain: int, num_domains: int, max_radius: float, periodic: bool):
+    """
+    Returns which x coordinates lie within max_radius of strip `domain`, i.e. the particles that can interact with it.
+    """
+    width = 1.0 / num_domains
+    distance = x - (domain + 0.5) * width  # Distance to the center of the strip
+    if periodic:
+        distance = np.mod(distance + 0.5, 1.0) - 0.5
+    return np.abs(distance) <= 0.5 * width + max_radius
+
+def _fields(capacity: int, num_domains: int, num_types: int):
+    """
+    Returns the layout of the shared memory block for the given sizes.
+    """
+    fields = {
+        "control": ((2,), np.int64),  # Command and the buffer holding the current state
+        "parameters": ((len(PARAMETERS),), np.float64),
+        "interactions": ((num_types, num_types), np.float64),
+        "type_factors": ((2, num_types), np.float64),  # Friction and force scaling factor of every type
+        "counts": ((num_domains, num_domains), np.int64),  # Particles moving from strip i to strip j
+        "starts": ((2, num_domains + 1), np.int64)  # First particle of every strip in each buffer
+    }
+    for buffer in (0, 1):
+        fields[f"positions{buffer}"] = ((capacity, 2), np.float64)
+        fields[f"velocities{buffer}"] = ((capacity, 2), np.float64)
+        fields[f"types{buffer}"] = ((capacity,), np.int64)
+        fields[f"ids{buffer}"] = ((capacity,), np.int64)
+    return fields
+
+class DomainDecomposition:
+    """
+    Runs the update of a simulation on worker processes that each own a vertical strip of the unit square.
+    The workers are started on the first step and restarted whenever the number of strips, particle types,
+    boundary mode or the buffer capacity has to change.
+    workers (int): Requested number of worker processes, all cores if None. Strips are at least max_radius
+        wide, so halos only come from the neighbouring strips, which limits the number of workers for large radii.
+    num_domains (int): Number of strips of the running workers.
+    """
+    def __init__(self, workers: int = None):
+        """
+        Initializes the decomposition without starting any workers.
+        """
+        self.workers = workers
+        self.num_domains = 0
+        self.capacity = 0
+        self._config = None
+        self._shared = None
+        self._processes = []
+        self._barrier = None
+        self._errors = None
+        self._version = None  # Store version the shared buffers were filled from
+
+    def domain_count(self, max_radius: float):
+        """
+        Returns the number of strips used for the given interaction radius.
+        """
+        requested = self.workers or os.cpu_count() or 1
+        widest = int(1.0 / max_radius) if max_radius > 0 else requested
+        return max(min(requested, widest), 1)
+
+    def step(self, simulation, dt: float):
+        """
+        Advances the particles of the simulation by one update and copies the new state into its ParticleStore.
+        simulation (Simulation): Provides the particles, interaction matrix, boundaries and grid subdivisions.
+        dt (float): Time since the last update.
+        """
+        particles = simulation.particles
+        matrix = simulation.interaction_matrix
+        boundaries = simulation.boundaries
+        count = len(particles)
+
+        config = (self.domain_count(matrix.max_radius), matrix.interactions.shape[0], boundaries.mode,
+                  boundaries.wall_width, boundaries.wall_stiffness, simulation.cells.subdivisions)
+        if config != self._config or count > self.capacity:  # If the workers cannot continue with these settings
+            self._start(config, max(2 * count, MIN_CAPACITY), simulation.rng)
+        if particles.version != self._version:  # If particles were added, removed or replaced since the last step
+            self._scatter(particles, boundaries.periodic)
+
+        shared = self._shared
+        shared["parameters"][:] = (dt, simulation.time_factor, particles.friction, particles.force_scaling,
+                                   particles.random_movement, matrix.max_radius, matrix.min_radius, matrix.global_repulsion)
+        shared["interactions"][:] = matrix.interactions
+        shared["type_factors"][0] = particles.type_friction if particles.type_friction is not None else 1.0
+        shared["type_factors"][1] = particles.type_force_scaling if particles.type_force_scaling is not None else 1.0
+        shared["control"][0] = STEP
+        for _ in range(BARRIERS_PER_STEP):
+            self._wait()
+
+        # The workers wrote the new state into the other buffer
+        buffer = 1 - shared["control"][1]
+        shared["control"][1] = buffer
+        np.copyto(particles.positions, shared[f"positions{buffer}"][:count])  # Into the store's buffers, no copy outlives the step
+        np.copyto(particles.velocities, shared[f"velocities{buffer}"][:count])
+        np.copyto(particles.types, shared[f"types{buffer}"][:count])
+        np.copyto(particles.ids, shared[f"ids{buffer}"][:count])
+        np.copyto(particles.render_positions, particles.positions)  # The order changed, so earlier render positions do not match
+        particles.version += 1  # Cached per-particle data of the old order must not be reused
+        self._version = particles.version
+
+    def _scatter(self, particles, periodic: bool):
+        """
+        Copies the particles of the store into the current buffer, sorted by strip.
+        """
+        shared = self._shared
+        buffer = shared["control"][1]
+        strips = strip_of(particles.positions[:, 0], self.num_domains, periodic)
+        order = np.argsort(strips, kind="stable")
+        count = len(particles)
+
+        shared[f"positions{buffer}"][:count] = particles.positions[order]
+        shared[f"velocities{buffer}"][:count] = particles.velocities[order]
+        shared[f"types{buffer}"][:count] = particles.types[order]
+        shared[f"ids{buffer}"][:count] = particles.ids[order]
+        shared["starts"][buffer, 0] = 0
+        shared["starts"][buffer, 1:] = np.cumsum(np.bincount(strips, minlength=self.num_domains))
+        self._version = particles.version
+
+    def _start(self, config: tuple, capacity: int, rng: np.random.Generator):
+        """
+        Stops running workers and starts new ones with fresh shared buffers.
+        rng (numpy.random.Generator): Draws the seeds of the workers' generators.
+        """
+        self.close()
+        num_domains, num_types, mode, wall_width, wall_stiffness, subdivisions = config
+        self._shared = SharedArrays(_fields(capacity, num_domains, num_types))
+        self._shared["control"][:] = (STEP, 0)
+
+        # Spawned instead of forked workers, forking a process with running numba or autosave threads can deadlock
+        context = multiprocessing.get_context("spawn")
+        self._barrier = context.Barrier(num_domains + 1)
+        self._errors = context.Queue()
+        seeds = rng.integers(0, 2 ** 63, num_domains)  # The workers' random movement follows the simulation's seed
+        self._processes = [
+            context.Process(target=_worker, daemon=True, name=f"domain-{domain}",
+                            args=(domain, num_domains, self._shared.name, self._shared.fields, self._barrier,
+                                  self._errors, (mode, wall_width, wall_stiffness), subdivisions, int(seeds[domain])))
+            for domain in range(num_domains)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self.num_domains, self.capacity, self._config = num_domains, capacity, config
+        self._version = None
+
+    def _wait(self):
+        """
+        Waits for the workers at the next barrier and raises their error if one of them failed.
+        """
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            try:
+                message = self._errors.get(timeout=5)
+            except Exception:
+                message = "no error message"
+            self.close()
+            raise RuntimeError(f"A domain worker failed:\n{message}")
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory.
+        """
+        if self._processes:
+            try:
+                self._shared["control"][0] = STOP
+                self._barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:  # If a worker already failed, it cannot be asked to stop
+                pass
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            self._processes = []
+        if self._shared is not None:
+            self._shared.close(unlink=True)
+            self._shared = None
+        self._config = None
+
+def _worker(domain: int, num_domains: int, name: str, fields: dict, barrier, errors, boundary: tuple,
+            subdivisions: int, seed: int):
+    """
+    Main loop of a worker process owning strip `domain`, see the module docstring for the steps.
+    """
+    rng = np.random.default_rng(seed)
+    shared = SharedArrays(fields, name)
+    boundaries = Boundaries(*boundary)
+    periodic = boundaries.periodic
+    matrix = InteractionMatrix(0, 0.0, 0.0, 0.0)
+    grid = CellGrid(1.0, subdivisions, periodic)
+    # The neighbouring strips, which are the same one on both sides for two periodic strips
+    neighbors = sorted({(domain + offset) % num_domains if periodic else domain + offset for offset in (-1, 1)}
+                       - {domain, -1, num_domains})
+
+    try:
+        while True:
+            barrier.wait()  # Start
+            if shared["control"][0] == STOP:
+                break
+            _step(domain, num_domains, shared, neighbors, barrier, matrix, grid, boundaries, rng)
+    except Exception:
+        errors.put(traceback.format_exc())
+        barrier.abort()  # Releases the main process and the other workers from the barrier
+    finally:
+        matrix.interactions = None  # Releases the last view onto the shared memory before unmapping it
+        shared.close()
+
+def _step(domain: int, num_domains: int, shared: SharedArrays, neighbors: list, barrier, matrix, grid, boundaries, rng):
+    """
+    Performs one update of the particles of strip `domain`, waiting for the other workers between the phases.
+    All views onto the shared memory are local, so none outlives the step.
+    """
+    periodic = boundaries.periodic
+    parameters = dict(zip(PARAMETERS, shared["parameters"]))
+    matrix.interactions = shared["interactions"]
+    matrix.max_radius, matrix.min_radius = parameters["max_radius"], parameters["min_radius"]
+    matrix.global_repulsion = parameters["global_repulsion"]
+    source, target = shared["control"][1], 1 - shared["control"][1]
+
+    # Integrates the own particles, as ParticleStore.integrate does
+    start, end = shared["starts"][source, domain], shared["starts"][source, domain + 1]
+    positions = shared[f"positions{source}"][start:end]
+    velocities = shared[f"velocities{source}"][start:end]
+    types = shared[f"types{source}"][start:end]
+    ids = shared[f"ids{source}"][start:end]
+    type_friction, type_force_scaling = shared["type_factors"]
+    integrate_particles(positions, velocities, types, parameters["friction"], type_friction,
+                        parameters["dt"] * parameters["time_factor"])
+    if parameters["random_movement"]:
+        movement = parameters["random_movement"]
+        positions += rng.uniform(-movement, movement, positions.shape) * parameters["time_factor"]
+
+    strips = strip_of(positions[:, 0], num_domains, periodic)
+    shared["counts"][domain] = np.bincount(strips, minlength=num_domains)
+    barrier.wait()  # Counted
+
+    # Copies every particle to its strip in the other buffer, behind the ones of the lower workers
+    counts = shared["counts"]
+    starts = np.concatenate(([0], np.cumsum(counts.sum(axis=0))))
+    order = np.argsort(strips, kind="stable")
+    first = 0
+    for strip in range(num_domains):
+        moving = order[first:first + counts[domain, strip]]
+        offset = starts[strip] + counts[:domain, strip].sum()
+        shared[f"positions{target}"][offset:offset + len(moving)] = positions[moving]
+        shared[f"velocities{target}"][offset:offset + len(moving)] = velocities[moving]
+        shared[f"types{target}"][offset:offset + len(moving)] = types[moving]
+        shared[f"ids{target}"][offset:offset + len(moving)] = ids[moving]
+        first += len(moving)
+    if domain == 0:
+        shared["starts"][target] = starts
+    barrier.wait()  # Migrated
+
+    # Copies the halo out of the neighbouring strips before their owners move them on
+    start, end = starts[domain], starts[domain + 1]
+    local_positions = [shared[f"positions{target}"][start:end]]
+    local_types = [shared[f"types{target}"][start:end]]
+    for neighbor in neighbors:
+        neighbor_positions = shared[f"positions{target}"][starts[neighbor]:starts[neighbor + 1]]
+        near = halo_mask(neighbor_positions[:, 0], domain, num_domains, parameters["max_radius"], periodic)
+        local_positions.append(neighbor_positions[near])
+        local_types.append(shared[f"types{target}"][starts[neighbor]:starts[neighbor + 1]][near])
+    local_positions, local_types = np.concatenate(local_positions), np.concatenate(local_types)
+    barrier.wait()  # Halo copied
+
+    # Forces on the halo particles are calculated by their owners, only the own ones are applied
+    positions = shared[f"positions{target}"][start:end]
+    velocities = shared[f"velocities{target}"][start:end]
+    forces = grid.accumulate_forces(local_positions, local_types, matrix)
+    apply_scaled_forces(velocities, forces, shared[f"types{target}"][start:end], parameters["force_scaling"], type_force_scaling)
+    boundaries.apply(positions, velocities)
+    barrier.wait()  # Done
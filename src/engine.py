@@ -0,0 +1,404 @@
+import numba
+from numba import njit, prange
+import numpy as np
+from interactions import calculate_pair_forces, tabulated_pair_forces, minimum_image
+
+ENGINES = ("serial", "parallel", "domains")  # Available force pass implementations, "domains" runs on worker processes (see domains.py)
+BLOCKS_PER_THREAD = 16  # Blocks of cells handed out per thread for load balancing
+MAX_GRID_SIZE = 1024  # Upper limit of cells per axis, coarser cells remain correct but visit more pairs
+NO_TABLE = np.zeros((0, 0, 2))  # Passed to the force kernels when forces are calculated instead of looked up
+
+def set_threads(threads: int = None):
+    """
+    Sets the number of threads used by the parallel engine and returns the number actually in use.
+    threads (int): Requested number of threads, all available cores if None.
+    """
+    available = numba.config.NUMBA_NUM_THREADS
+    numba.set_num_threads(min(threads or available, available))
+    return numba.get_num_threads()
+
+class CellGrid:
+    """
+    Spatial grid over the unit square, stored as flat arrays produced by a counting sort.
+    The cells are sized so that all partners of a particle within max_radius lie in the cells at most
+    `reach` cells away from its own.
+    max_radius (float): Interaction radius the grid is fitted to.
+    subdivisions (int): Number of cells each max_radius is split into.
+    periodic (bool): Whether the grid wraps around the edges of the unit square.
+    reach (int): Number of neighbouring cells searched in each direction.
+    grid_size (int): Number of cells along each axis.
+    cell_start (numpy.ndarray): Index into cell_particles of the first particle of each cell.
+    cell_count (numpy.ndarray): Number of particles in each cell.
+    cell_particles (numpy.ndarray): Particle indices ordered by cell.
+    Cell (x, y) has the flat index x * grid_size + y.
+    """
+    def __init__(self, max_radius: float, subdivisions: int = 1, periodic: bool = False):
+        """
+        Initializes an empty grid fitted to the given interaction radius.
+        max_radius (float): The maximum distance at which particles interact.
+        subdivisions (int): Splits every max_radius into this many cells. Smaller cells skip
+            more pairs beyond max_radius, but more cells have to be visited per particle.
+        periodic (bool): Whether neighboring cells and distances wrap around the edges.
+        """
+        self.subdivisions = max(int(subdivisions), 1)
+        self.periodic = periodic
+        self.cell_particles = np.zeros(0, dtype=np.int64)
+        self.fit(max_radius)
+
+    def fit(self, max_radius: float):
+        """
+        Resizes the grid for a new interaction radius.
+        Returns True if the grid changed and has to be rebuilt before the next use.
+        """
+        if getattr(self, "max_radius", None) == max_radius:  # If the grid already fits the radius ...
+            return False  # ... keep it
+
+        self.max_radius = max_radius
+        self.reach = self.subdivisions
+
+        # Cells are at least max_radius / subdivisions wide, the grid is limited to MAX_GRID_SIZE cells per axis
+        cells_per_axis = self.subdivisions / max_radius if max_radius > 0 else MAX_GRID_SIZE
+        self.grid_size = max(min(int(cells_per_axis), MAX_GRID_SIZE), 1)
+
+        # A wrapped neighbourhood must not reach around to the same cell twice, otherwise a single cell holds everyone
+        if self.periodic and self.grid_size < 2 * self.reach + 1:
+            self.grid_size, self.reach = 1, 0
+
+        self.cell_start = np.zeros(self.grid_size ** 2, dtype=np.int64)
+        self.cell_count = np.zeros(self.grid_size ** 2, dtype=np.int64)
+        return True
+
+    def rebuild(self, positions):
+        """
+        Sorts the particles into the cells corresponding to their positions.
+        positions (numpy.ndarray): (N, 2) array of particle positions.
+        """
+        self.cell_start, self.cell_count, self.cell_particles = bin_particles(positions, self.grid_size, self.periodic)
+
+    def members(self, grid_x: int, grid_y: int):
+        """
+        Returns the indices of the particles in cell (grid_x, grid_y).
+        """
+        cell = grid_x * self.grid_size + grid_y
+        start = self.cell_start[cell]
+        return self.cell_particles[start:start + self.cell_count[cell]]
+
+    def count_pairs(self, positions, max_radius: float):
+        """
+        Bins the particles and returns the number of particle pairs within max_radius of each other.
+        max_radius must not exceed the radius the grid is fitted to.
+        """
+        self.rebuild(positions)
+        return count_cell_pairs(positions, self.grid_size, self.reach, self.periodic,
+                                self.cell_start, self.cell_count, self.cell_particles, max_radius)
+
+    def accumulate_forces(self, positions, types, interaction_matrix, parallel: bool = False, force_table=None):
+        """
+        Bins the particles and returns the (N, 2) array of forces acting on them in a single compiled call.
+        The grid is refitted first if the interaction radius changed since the last call.
+        positions (numpy.ndarray): (N, 2) array of particle positions.
+        types (numpy.ndarray): (N,) array of particle types.
+        interaction_matrix (InteractionMatrix): Provides the interaction forces and radii.
+        parallel (bool): Whether to distribute the force pass across all configured threads.
+        force_table (ForceTable): Looks the forces up in tables instead of calculating them (optional).
+        """
+        self.fit(interaction_matrix.max_radius)
+
+        arguments = (positions, types, self.grid_size, self.reach, self.periodic,
+                     *force_arguments(interaction_matrix, force_table, positions.dtype))
+
+        if parallel:  # If the parallel engine is selected ...
+            # ... hand out many small blocks so idle threads can pick up work from crowded regions
+            num_blocks = numba.get_num_threads() * BLOCKS_PER_THREAD
+            with numba.parallel_chunksize(1):  # Restores the previous chunk size even if the kernel raises
+                forces, self.cell_start, self.cell_count, self.cell_particles = step_forces_parallel(*arguments, num_blocks)
+        else:
+            forces, self.cell_start, self.cell_count, self.cell_particles = step_forces(*arguments)
+        return forces
+
+def force_arguments(interaction_matrix, force_table, dtype):
+    """
+    Returns the interactions, global_repulsion, max_radius, min_radius, force_table and table_scale arguments
+    of the force kernels in the float type of the particle state. The table is empty if forces are calculated.
+    """
+    float_type = np.dtype(dtype).type
+    table, scale = force_table.lookup(interaction_matrix) if force_table is not None else (NO_TABLE, 0.0)
+    return (np.asarray(interaction_matrix.interactions, dtype=dtype),
+            float_type(interaction_matrix.global_repulsion),
+            float_type(interaction_matrix.max_radius),
+            float_type(interaction_matrix.min_radius),
+            np.asarray(table, dtype=dtype), float_type(scale))
+
+@njit
+def _cell_coordinate(position, grid_size, periodic):
+    """
+    Converts a position into a cell coordinate.
+    Particles slightly outside the unit square are wrapped to the opposite side in a periodic grid
+    and clamped to the edge cells otherwise.
+    """
+    coordinate = int(np.floor(position * grid_size))
+    if periodic:
+        return coordinate % grid_size
+    return min(max(coordinate, 0), grid_size - 1)
+
+@njit(inline='always')
+def neighbor_cell(neighbor_x, neighbor_y, grid_size, periodic):
+    """
+    Returns the flat index of cell (neighbor_x, neighbor_y), wrapped around the edges in a periodic grid.
+    Returns -1 if the cell lies outside a non-periodic grid.
+    """
+    if periodic:
+        neighbor_x, neighbor_y = neighbor_x % grid_size, neighbor_y % grid_size
+    elif neighbor_x < 0 or neighbor_x >= grid_size or neighbor_y < 0 or neighbor_y >= grid_size:
+        return -1
+    return neighbor_x * grid_size + neighbor_y
+
+@njit(nogil=True)
+def bin_particles(positions, grid_size, periodic=False):
+    """
+    Sorts particle indices by cell with a counting sort.
+    Returns the cell_start, cell_count and cell_particles arrays.
+    """
+    num_particles = positions.shape[0]
+    particle_cell = np.empty(num_particles, dtype=np.int64)
+    cell_count = np.zeros(grid_size * grid_size, dtype=np.int64)
+
+    # Count how many particles fall into each cell
+    for i in range(num_particles):
+        cell = (_cell_coordinate(positions[i, 0], grid_size, periodic) * grid_size
+                + _cell_coordinate(positions[i, 1], grid_size, periodic))
+        particle_cell[i] = cell
+        cell_count[cell] += 1
+
+    # Exclusive prefix sum gives the first slot of each cell
+    cell_start = np.empty(grid_size * grid_size, dtype=np.int64)
+    total = 0
+    for cell in range(grid_size * grid_size):
+        cell_start[cell] = total
+        total += cell_count[cell]
+
+    # Scatter the particle indices into their cell's slots, keeping their original order within each cell
+    fill = cell_start.copy()
+    cell_particles = np.empty(num_particles, dtype=np.int64)
+    for i in range(num_particles):
+        cell = particle_cell[i]
+        cell_particles[fill[cell]] = i
+        fill[cell] += 1
+
+    return cell_start, cell_count, cell_particles
+
+@njit
+def accumulate_cell_forces(positions, types, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                           interactions, global_repulsion, max_radius, min_radius, force_table, table_scale):
+    """
+    Sums the forces acting on every particle from all particles within max_radius.
+    Uses a half-shell traversal: every cell only visits the later particles of its own cell and the
+    neighbouring cells ahead of it in (x, y) order, so each unordered pair is evaluated exactly once
+    and the force is applied to both particles.
+    If force_table is not empty, the forces are looked up in it instead of being calculated (see force_table.py).
+    """
+    forces = np.zeros_like(positions)
+    max_radius_squared = max_radius * max_radius
+    tabulated = force_table.shape[0] > 0
+
+    for cell in range(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        end = cell_start[cell] + cell_count[cell]
+
+        for a in range(cell_start[cell], end):
+            i = cell_particles[a]
+            px, py, particle_type = positions[i, 0], positions[i, 1], types[i]
+            force_x, force_y = 0.0, 0.0
+
+            # Later particles of the same cell, then the cells ahead of this one
+            for offset_x in range(reach + 1):
+                for offset_y in range(-reach if offset_x else 0, reach + 1):
+                    neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+                    if neighbor < 0:  # If the neighbour does not exist in the grid
+                        continue
+                    first = a + 1 if neighbor == cell else cell_start[neighbor]
+
+                    for b in range(first, cell_start[neighbor] + cell_count[neighbor]):
+                        j = cell_particles[b]
+                        delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+                        if periodic:
+                            delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+                        distance_squared = delta_x * delta_x + delta_y * delta_y
+                        if distance_squared > max_radius_squared:  # Out of interaction range
+                            continue
+
+                        if tabulated:
+                            pair_x, pair_y, forces_j_x, forces_j_y = tabulated_pair_forces(
+                                delta_x, delta_y, distance_squared, particle_type, types[j], force_table, table_scale
+                            )
+                        else:
+                            pair_x, pair_y, forces_j_x, forces_j_y = calculate_pair_forces(
+                                px, py, particle_type, positions[j, 0], positions[j, 1], types[j],
+                                interactions, global_repulsion, max_radius, min_radius, 5.0, periodic
+                            )
+                        force_x += pair_x
+                        force_y += pair_y
+                        forces[j, 0] += forces_j_x
+                        forces[j, 1] += forces_j_y
+
+            forces[i, 0] += force_x
+            forces[i, 1] += force_y
+
+    return forces
+
+@njit(nogil=True)
+def count_cell_pairs(positions, grid_size, reach, periodic, cell_start, cell_count, cell_particles, max_radius):
+    """
+    Counts the pairs within max_radius with the same half-shell traversal as accumulate_cell_forces.
+    """
+    pairs = 0
+    max_radius_squared = max_radius * max_radius
+
+    for cell in range(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+            px, py = positions[cell_particles[a], 0], positions[cell_particles[a], 1]
+
+            for offset_x in range(reach + 1):
+                for offset_y in range(-reach if offset_x else 0, reach + 1):
+                    neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+                    if neighbor < 0:  # If the neighbour does not exist in the grid
+                        continue
+                    first = a + 1 if neighbor == cell else cell_start[neighbor]
+
+                    for b in range(first, cell_start[neighbor] + cell_count[neighbor]):
+                        delta_x = positions[cell_particles[b], 0] - px
+                        delta_y = positions[cell_particles[b], 1] - py
+                        if periodic:
+                            delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+                        if delta_x * delta_x + delta_y * delta_y <= max_radius_squared:
+                            pairs += 1
+
+    return pairs
+
+@njit
+def _particle_force(i, grid_x, grid_y, positions, types, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                    interactions, global_repulsion, max_radius, min_radius, force_table, table_scale):
+    """
+    Sums the forces acting on particle i in cell (grid_x, grid_y) from all particles within max_radius.
+    The neighbours are always visited in the same order, so the sum does not depend on which thread computes it.
+    """
+    force_x, force_y = 0.0, 0.0
+    px, py, particle_type = positions[i, 0], positions[i, 1], types[i]
+    max_radius_squared = max_radius * max_radius
+    tabulated = force_table.shape[0] > 0
+
+    for offset_x in range(-reach, reach + 1):
+        for offset_y in range(-reach, reach + 1):
+            neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+            if neighbor < 0:  # If the neighbour does not exist in the grid
+                continue
+
+            for b in range(cell_start[neighbor], cell_start[neighbor] + cell_count[neighbor]):
+                j = cell_particles[b]
+                delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+                if periodic:
+                    delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+                distance_squared = delta_x * delta_x + delta_y * delta_y
+                # Avoids self-interaction and particles out of interaction range
+                if i == j or distance_squared > max_radius_squared:
+                    continue
+
+                if tabulated:
+                    pair_x, pair_y, _, _ = tabulated_pair_forces(
+                        delta_x, delta_y, distance_squared, particle_type, types[j], force_table, table_scale
+                    )
+                else:
+                    pair_x, pair_y, _, _ = calculate_pair_forces(
+                        px, py, particle_type, positions[j, 0], positions[j, 1], types[j],
+                        interactions, global_repulsion, max_radius, min_radius, 5.0, periodic
+                    )
+                force_x += pair_x
+                force_y += pair_y
+
+    return force_x, force_y
+
+@njit
+def balanced_blocks(grid_size, reach, periodic, cell_count, num_blocks):
+    """
+    Splits the cells into at most num_blocks runs of consecutive cells with roughly equal work.
+    The work of a cell is estimated as its particle count times the particle count of its neighbourhood,
+    so densely clustered cells end up in small blocks of their own.
+    Returns the (num_blocks + 1,) array of block boundaries in cell indices.
+    """
+    num_cells = grid_size * grid_size
+    work = np.empty(num_cells, dtype=np.float64)
+    total = 0.0
+
+    for cell in range(num_cells):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        neighborhood = 0
+        for offset_x in range(-reach, reach + 1):
+            for offset_y in range(-reach, reach + 1):
+                neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+                if neighbor >= 0:
+                    neighborhood += cell_count[neighbor]
+        work[cell] = cell_count[cell] * neighborhood + 1.0  # Empty cells still cost a little to visit
+        total += work[cell]
+
+    # Close a block every time the accumulated work passes the next equal share
+    boundaries = np.empty(num_blocks + 1, dtype=np.int64)
+    boundaries[0] = 0
+    block, accumulated = 1, 0.0
+    for cell in range(num_cells):
+        accumulated += work[cell]
+        if block < num_blocks and accumulated >= total * block / num_blocks:
+            boundaries[block] = cell + 1
+            block += 1
+    boundaries[block] = num_cells
+
+    return boundaries[:block + 1]
+
+@njit(parallel=True)
+def accumulate_cell_forces_parallel(positions, types, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                                    interactions, global_repulsion, max_radius, min_radius, force_table, table_scale, blocks):
+    """
+    Parallel force pass distributing blocks of cells across threads.
+    Unlike the serial half-shell pass, every particle gathers the forces of all its neighbours itself,
+    so no two threads write to the same particle. Each sum is computed by a single thread in a fixed
+    neighbour order, so the result is bit-identical for any number of threads. It is not bit-identical to the
+    serial pass, which sums the forces in a different order, and drifts from it in the last digits over many steps.
+    """
+    forces = np.zeros_like(positions)
+
+    for block in prange(len(blocks) - 1):
+        for cell in range(blocks[block], blocks[block + 1]):
+            grid_x, grid_y = cell // grid_size, cell % grid_size
+
+            for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+                i = cell_particles[a]
+                forces[i, 0], forces[i, 1] = _particle_force(i, grid_x, grid_y, positions, types, grid_size, reach, periodic,
+                                                             cell_start, cell_count, cell_particles,
+                                                             interactions, global_repulsion, max_radius, min_radius,
+                                                             force_table, table_scale)
+
+    return forces
+
+@njit(nogil=True)
+def step_forces(positions, types, grid_size, reach, periodic, interactions, global_repulsion, max_radius, min_radius,
+                force_table, table_scale):
+    """
+    Bins the particles into cells and accumulates all pairwise forces without leaving compiled code.
+    Returns the forces followed by the cell_start, cell_count and cell_particles arrays.
+    """
+    cell_start, cell_count, cell_particles = bin_particles(positions, grid_size, periodic)
+    forces = accumulate_cell_forces(positions, types, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                                    interactions, global_repulsion, max_radius, min_radius, force_table, table_scale)
+    return forces, cell_start, cell_count, cell_particles
+
+@njit(nogil=True)
+def step_forces_parallel(positions, types, grid_size, reach, periodic, interactions, global_repulsion, max_radius, min_radius,
+                         force_table, table_scale, num_blocks):
+    """
+    Like step_forces, but accumulates the forces on all threads over load balanced blocks of cells.
+    """
+    cell_start, cell_count, cell_particles = bin_particles(positions, grid_size, periodic)
+    blocks = balanced_blocks(grid_size, reach, periodic, cell_count, num_blocks)
+    forces = accumulate_cell_forces_parallel(positions, types, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                                             interactions, global_repulsion, max_radius, min_radius, force_table, table_scale, blocks)
+    return forces, cell_start, cell_count, cell_particles
@@ -0,0 +1,86 @@
+"""
+Tabulated pair forces.
+The force between two particles only depends on their distance, their types and the parameters of the
+InteractionMatrix, so it can be sampled once per type pair instead of being calculated for every pair.
+The tables hold the force divided by the distance, sampled uniformly over the squared distance: the force
+kernels multiply the vector between two particles by the interpolated sample, without any square root or division.
+Any force curve can be tabulated at the same cost per pair.
+"""
+import numpy as np
+
+DEFAULT_SAMPLES = 2048  # Samples per type pair between distance 0 and max_radius
+
+def default_curve(distance, interactions, interaction_matrix, max_repulsion: float = 5.0):
+    """
+    The force model of calculate_pair_forces: the interaction falls off linearly from min_radius to max_radius
+    and the global repulsion grows with decreasing distance up to max_repulsion.
+    distance (numpy.ndarray): (S,) distances to sample at, all within max_radius.
+    interactions (numpy.ndarray): (T, T) interaction strengths.
+    interaction_matrix (InteractionMatrix): Provides the radii and the global repulsion.
+    Returns the (T, T, S) force pulling a particle of the row type towards one of the column type, negative values repel.
+    """
+    max_radius, min_radius = interaction_matrix.max_radius, interaction_matrix.min_radius
+    force_scale = (max_radius - distance) / (max_radius - min_radius)
+    repulsion = np.minimum(interaction_matrix.global_repulsion / (distance + 1e-12), max_repulsion)
+    return interactions[:, :, None] * force_scale - repulsion
+
+class ForceTable:
+    """
+    Force lookup tables for all type pairs, rebuilt lazily whenever the InteractionMatrix changes (see its version).
+    samples (int): Samples per type pair, more samples reduce the interpolation error of strongly curved forces.
+    curve (callable): Force curve with the signature of default_curve.
+    table (numpy.ndarray): (T, T, samples + 1) force divided by distance at squared distances 0 to max_radius ** 2.
+    scale (float): Samples per unit of squared distance.
+    build_count (int): Number of times the tables have been built.
+    dtype (numpy.dtype): Float type of the table, matching the particle state avoids a conversion on every lookup.
+    """
+    def __init__(self, samples: int = DEFAULT_SAMPLES, curve=default_curve, dtype=np.float64):
+        """
+        Initializes the tables, which are built on the first lookup.
+        """
+        self.samples = samples
+        self.curve = curve
+        self.dtype = np.dtype(dtype)
+        self.table, self.scale = None, 0.0
+        self.build_count = 0
+        self._source = None  # Matrix and version the tables were built for
+
+    def lookup(self, interaction_matrix):
+        """
+        Returns the table and its scale for the matrix, rebuilding them first if the matrix changed since the last build.
+        """
+        if self._source != (id(interaction_matrix), interaction_matrix.version):
+            self.build(interaction_matrix)
+        return self.table, self.scale
+
+    def build(self, interaction_matrix):
+        """
+        Samples the force curve of every type pair over the squared distance.
+        """
+        max_radius = interaction_matrix.max_radius
+        squared_distance = np.linspace(0.0, max_radius * max_radius, self.samples + 1)
+        distance = np.sqrt(squared_distance)
+        distance[0] = distance[1]  # Particles on top of each other have no direction, any finite value will do
+
+        forces = self.curve(distance, np.asarray(interaction_matrix.interactions, dtype=np.float64), interaction_matrix)
+        self.table = np.ascontiguousarray(forces / distance, dtype=self.dtype)
+        self.scale = self.samples / (max_radius * max_radius)
+        self._source = (id(interaction_matrix), interaction_matrix.version)
+        self.build_count += 1
+
+    def max_error(self, interaction_matrix, samples: int = 100000, min_distance: float = None, seed: int = 0):
+        """
+        Compares looked up forces with the curve at random distances and returns the largest error relative to the largest force.
+        Distances below min_distance (min_radius by default) are left out, the repulsion grows too steeply there.
+        """
+        table, scale = self.lookup(interaction_matrix)
+        min_distance = interaction_matrix.min_radius if min_distance is None else min_distance
+        rng = np.random.default_rng(seed)
+        distance = rng.uniform(min_distance, interaction_matrix.max_radius, samples)
+
+        position = distance * distance * scale
+        index = np.minimum(position.astype(np.int64), table.shape[2] - 2)
+        weight = position - index
+        looked_up = (table[:, :, index] + weight * (table[:, :, index + 1] - table[:, :, index])) * distance
+        exact = self.curve(distance, np.asarray(interaction_matrix.interactions, dtype=np.float64), interaction_matrix)
+        return float(np.max(np.abs(looked_up - exact)) / np.max(np.abs(exact)))
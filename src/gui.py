@@ -1,7 +1,9 @@
 import os
 from typing import Tuple
 import time
+import numpy as np
 import pygame
+from numba import njit
 from interactions_interface import InteractionsInterface
 
 class Text:
@@ -46,6 +48,7 @@ class Text:
         Updates the text that is displayed, and re-renders it with the current font color.
         text (str): The new text to display.
         """
+        self.text = text
         self.rendered_text = self.font.render(text, True, self.font_color)
         # Optionally, you can update the text rectangle if its position needs to be adjusted.
         #self.rect = self.rendered_text.get_rect(center=self.rect.center)
@@ -55,6 +58,7 @@ class Text:
         Updates the text to display the latest value if a getter function is provided.
         The displayed value is rounded to 4 decimal places. It can also ensure the text 
         length is fixed if the 'length' attribute is set.
+        The text is only rendered again if the value changed.
         """
         if self.get_value:
             text = str(round(self.get_value(), 4))  # Get the value from the getter and round it
@@ -66,7 +70,14 @@ class Text:
                 if len(text) > self.length:
                     text = text[:self.length]  # Truncate if the length exceeds
                 
-            self.set_text(text)  # Update the text to the new value
+            if text != self.text:  # If the value changed ...
+                self.set_text(text)  # ... update the text to the new value
+
+    def area(self):
+        """
+        Returns the rectangle covered by the rendered text, which can be wider than rect after the text changed.
+        """
+        return self.rect.union(self.rendered_text.get_rect(topleft=self.rect.topleft))
 
 class Button():
     def __init__(self, pos: Tuple[int, int], size: Tuple[int, int], text: str, color: Tuple[int, int, int], action: callable = None, font_size = 36, image_name = None):
@@ -89,6 +100,10 @@ class Button():
         self.is_clicked = False
         self.clicked_time = 0
         self.size_factor = 1
+
+        # The label never changes, so it is rendered only once
+        text_color = (0, 0, 0) if self.text in ["Start", "Stop", "Reset", "Exit"] else (255, 255, 255)
+        self.text_surface = self.font.render(self.text, True, text_color)
         
         self.image = None
         if image_name:
@@ -120,15 +135,23 @@ class Button():
         """
         return tuple(max(int(c * factor), 0) for c in color)  # Iterates over the color components and applies the factor
 
+    def state(self, mouse_pos):
+        """
+        Returns what the look of the button depends on: whether the mouse is over it and its size factor.
+        Ends the click effect 0.3 seconds after a click.
+        """
+        if self.is_clicked and time.time() - self.clicked_time > 0.3:  # If the button is clicked ...
+            self.is_clicked = False  # ... reset the clicked  ...
+            self.size_factor = 1  # ... and reset the size factor
+        return self.rect.collidepoint(mouse_pos), self.size_factor
+
     def draw(self, screen, mouse_pos):
         """
         Draws the button on the given Pygame screen.
         screen: Pygame screen to draw on.
         mouse_pos: Mouse position.
         """
-        if self.is_clicked and time.time() - self.clicked_time > 0.3:  # If the button is clicked ...
-            self.is_clicked = False  # ... reset the clicked  ...
-            self.size_factor = 1  # ... and reset the size factor
+        self.state(mouse_pos)
 
         if self.rect.collidepoint(mouse_pos):  # If the mouse is over the button ...
             current_color = self.hover_color  # ... set the hover color
@@ -147,10 +170,8 @@ class Button():
             pos = self.rect.topleft
             screen.blit(self.image, (pos[0] + 5, pos[1] + 5))
         else:
-            text_color = (0, 0, 0) if self.text in ["Start", "Stop", "Reset", "Exit"] else (255, 255, 255)
-            text_surface = self.font.render(self.text, True, text_color)
-            text_rect = text_surface.get_rect(center=rect.center)
-            screen.blit(text_surface, text_rect)
+            text_rect = self.text_surface.get_rect(center=rect.center)
+            screen.blit(self.text_surface, text_rect)
 
     def trigger(self, event):
         """
@@ -210,6 +231,78 @@ class Slider:
         pygame.draw.circle(surface, (160, 160, 160), (self.slider_pos, self.y), 4)
 
     
+class ParticleRenderer:
+    """
+    Draws all particles into the simulation area in a single compiled pass instead of one draw call per particle.
+    The area is a 32 bit surface whose pixels are written through pygame.surfarray and blitted onto the screen.
+    Every particle is stamped with the pixels pygame.draw.circle covers for its radius, so it looks the same as before.
+    size (int): Width and height of the simulation area in pixels.
+    background (tuple): Color the area is cleared with.
+    colors (list): Color of every particle type, types beyond the list reuse its colors.
+    """
+    def __init__(self, size: int, background, colors):
+        """
+        Creates the area surface and maps the colors onto its pixel format.
+        """
+        self.size = size
+        self.surface = pygame.Surface((size, size), depth=32)
+        self.background = self.surface.map_rgb(background)
+        self.set_colors(colors)
+        self._stamps = {}  # Radius -> pixel offsets covered by a particle
+
+    def set_colors(self, colors):
+        """
+        Sets the colors of the particle types.
+        """
+        self.colors = np.array([self.surface.map_rgb(color) for color in colors], dtype=np.int64)
+
+    def stamp(self, radius: int):
+        """
+        Returns the (x, y) pixel offsets pygame.draw.circle fills for a circle of the given radius around its center.
+        """
+        if radius not in self._stamps:
+            extent = 2 * radius + 3
+            scratch = pygame.Surface((extent, extent), depth=32)
+            pygame.draw.circle(scratch, (255, 255, 255), (radius + 1, radius + 1), radius)
+            x, y = np.nonzero(pygame.surfarray.array2d(scratch))
+            self._stamps[radius] = (x - radius - 1, y - radius - 1)
+        return self._stamps[radius]
+
+    def draw(self, screen, particles, scale: float, threshold: float = 0.001):
+        """
+        Clears the area, draws the particles and blits the area onto the top left corner of the screen.
+        particles (ParticleStore): The particles to draw, their render positions are updated on the way.
+        scale (float): Pixels per unit of the simulation area.
+        threshold (float): Minimum movement before a particle's rendered position is updated.
+        """
+        pixels = pygame.surfarray.pixels2d(self.surface)  # Locks the surface until the view is released
+        pixels[:] = self.background
+        offset_x, offset_y = self.stamp(particles.size)
+        stamp_particles(pixels, particles.positions, particles.render_positions, particles.types, self.colors,
+                        offset_x, offset_y, scale, threshold)
+        del pixels
+        screen.blit(self.surface, (0, 0))
+
+@njit(nogil=True)
+def stamp_particles(pixels, positions, render_positions, types, colors, offset_x, offset_y, scale, threshold):
+    """
+    Updates the render position of every particle that moved more than the threshold and writes the color of
+    its type into the pixels of its stamp around it, skipping pixels outside the area.
+    Later particles are drawn over earlier ones, as with one draw call per particle.
+    """
+    width, height = pixels.shape
+    for i in range(positions.shape[0]):
+        if abs(positions[i, 0] - render_positions[i, 0]) > threshold or abs(positions[i, 1] - render_positions[i, 1]) > threshold:
+            render_positions[i, 0], render_positions[i, 1] = positions[i, 0], positions[i, 1]
+
+        # Conversion to screen coordinates
+        draw_x, draw_y = int(np.rint(render_positions[i, 0] * scale)), int(np.rint(render_positions[i, 1] * scale))
+        color = colors[types[i] % colors.shape[0]]
+        for k in range(offset_x.shape[0]):
+            x, y = draw_x + offset_x[k], draw_y + offset_y[k]
+            if 0 <= x < width and 0 <= y < height:
+                pixels[x, y] = color
+
 class GUI:
     """
     Provides the visual representation of InteractionMatrix and the ability to alter the strength of force between particle types.
@@ -250,6 +343,8 @@ class GUI:
         self.padding = padding  # distance between panel elementens and panel boundaries/borders
         
         self.particle_colors = [self.colors[key] for key in ['easter-green','easter-red','easter-yellow','easter-lilac','easter-pink']]
+        # Draws the particles of a ParticleStore in a single compiled pass, the area includes the pixels at the far edges
+        self.particle_renderer = ParticleRenderer(screen_height + 1, self.colors['simulation-background'], self.particle_colors)
         self.interaction_matrix = interaction_matrix
         
         self.text_fields = []
@@ -260,7 +355,8 @@ class GUI:
         
         self.interactions_interface = InteractionsInterface(interaction_matrix, self.particle_colors,
                                                             top_left = (screen_width - self.control_panel_width//2, self.buttons[-1].rect.bottom),
-                                                            right = self.screen_width - self.padding)
+                                                            right = self.screen_width - self.padding,
+                                                            adjust_interaction = simulation_controlls['adjust_interaction'])
 
         if self.interactions_interface.fields:
             last_field_bottom = list(self.interactions_interface.fields.values())[-1].bottom
@@ -272,21 +368,64 @@ class GUI:
         
         self.initiate_secondary_buttons(simulation_controlls)
 
-    def draw_instruction(self):
+        # Fonts are loaded once instead of on every frame
+        self.instruction_font = pygame.font.Font(None, 18)
+        self.instruction_header_font = pygame.font.Font(None, 23)
+        self.instruction_header_font.set_bold(True)
+        self.instruction_header_font.set_italic(True)
+        self.overlay_font = pygame.font.Font(None, 22)
+        self.status_font = pygame.font.Font(None, 24)
+        self.instruction_surface = self.render_instruction()  # Also moves instruction_rect to its final place
+
+        # The control panel is kept drawn on its own surface, only widgets whose look changed are drawn again
+        self.panel_rect = pygame.Rect(screen_width - self.control_panel_width, 0, self.control_panel_width, screen_height)
+        self.panel_surface = pygame.Surface(screen.get_size())  # Screen sized, so widgets keep their coordinates
+        self.widget_states = {}
+        self.dirty_rects = []  # Parts of the screen changed since the last display update
+        self.invalidate()
+
+        self.inspection = None  # Particle under the mouse as returned by Simulation.inspect, None if there is none
+
+    def invalidate(self):
+        """
+        Draws the whole control panel again on its next draw and updates the whole display,
+        e.g. after the window was covered.
+        """
+        self.widget_states = {}
+        self.dirty_rects.append(self.screen.get_rect())
+
+    def take_dirty_rects(self):
+        """
+        Returns the parts of the screen drawn since the last call, for pygame.display.update.
         """
-        Draws the instruction panel and the instructions on it onto the Pygame screen.
+        rects, self.dirty_rects = self.dirty_rects, []
+        return rects
+
+    def draw_instruction(self, surface=None):
+        """
+        Draws the instruction panel onto the given surface, the screen by default.
+        The panel is rendered only once and then blitted from its cached surface.
+        """
+        if self.instruction_surface is None:
+            self.instruction_surface = self.render_instruction()
+        (surface if surface is not None else self.screen).blit(self.instruction_surface, self.instruction_rect)
+
+    def render_instruction(self):
+        """
+        Renders the instruction panel and the instructions on it into a new surface.
         Defines the design and layout of the instruction panel, including the header, 
         instruction text, and the color-specific word rendering.
+        The panel height is fitted to the text and the panel is moved to the bottom of the screen.
         """
-        pygame.draw.rect(self.screen, self.colors['christmas-grey'], self.instruction_rect)  # Draw instruction panel
-        pygame.draw.rect(self.screen, (250, 5, 80), self.instruction_rect, 3)  # Draw instruction panel border
+        # The text is laid out on a surface taller than needed, which is cut to the text height at the end
+        rect = pygame.Rect(0, 0, self.instruction_rect.width, self.screen_height)
+        surface = pygame.Surface(rect.size)
+        surface.fill(self.colors['christmas-grey'])  # Draw instruction panel
 
-        font = pygame.font.Font(None, 18)
-        header_font = pygame.font.Font(None, 23)
-        header_font.set_bold(True)
-        header_font.set_italic(True)
+        font = self.instruction_font
+        header_font = self.instruction_header_font
 
-        y_offset = self.instruction_rect.top + 10
+        y_offset = rect.top + 10
 
 
         header_parts = ["Welcome to the easter", "Particle", "Life", "Simulator", "!"]  # Define header parts
@@ -299,18 +438,18 @@ class GUI:
             self.colors['christmas-white']
         ]
 
-        x_offset = self.instruction_rect.centerx - sum(header_font.size(word)[0] for word in header_parts) / 2
+        x_offset = rect.centerx - sum(header_font.size(word)[0] for word in header_parts) / 2
 
         for idx, part in enumerate(header_parts):  # Iterate over each part in the header_parts list
             # Render the shadow of the header part with a black color (offset by 1 pixel for the shadow effect)
             shadow_surface = header_font.render(part, True, (0, 0, 0))  
             shadow_rect = shadow_surface.get_rect(topleft=(x_offset + 1, y_offset + 1))  # Set the shadow's position slightly offset from the original part
-            self.screen.blit(shadow_surface, shadow_rect)  # Draw the shadow on the screen
+            surface.blit(shadow_surface, shadow_rect)  # Draw the shadow on the screen
 
             # Render the header part itself using its specific color from segment_colors
             part_surface = header_font.render(part, True, segment_colors[idx])  
             part_rect = part_surface.get_rect(topleft=(x_offset, y_offset))  # Set the position of the header part (without shadow offset)
-            self.screen.blit(part_surface, part_rect)  # Draw the header part on the screen
+            surface.blit(part_surface, part_rect)  # Draw the header part on the screen
 
             # Update the x_offset to position the next header part correctly
             x_offset += part_surface.get_width()  # Add the width of the current part to x_offset
@@ -336,17 +475,18 @@ class GUI:
             "",
             "_____ Matrix Controls _____",
             "Increase attraction - left mouse button / scroll upwards",
-            "Increase repulsion - right mouse button / scroll downwards"
+            "Increase repulsion - right mouse button / scroll downwards",
+            "Inspect particles - press I and hover over them"
         ]
 
-        y_offset = self.instruction_rect.top + 30
+        y_offset = rect.top + 30
 
-        x_offset = self.instruction_rect.left - 20  # Move x_offset left by 20 pixels
+        x_offset = rect.left - 20  # Move x_offset left by 20 pixels
 
         for line in instruction_parts:  # Iterate over each line in the instruction_parts list (each instruction line)
             words = line.split(" ")  # Split the current line into individual words
             # Calculate the centered x_offset by taking into account the total width of the words and centering them within the instruction rectangle
-            centered_x_offset = x_offset + (self.instruction_rect.width - sum(font.size(word)[0] for word in words)) / 2
+            centered_x_offset = x_offset + (rect.width - sum(font.size(word)[0] for word in words)) / 2
 
             for word in words:  # Iterate over each word in the line
                 if word.strip("'") in color_words:  # Check if the word is listed in the color_words dictionary (removing any surrounding quotes)
@@ -358,13 +498,13 @@ class GUI:
                 shadow_surface = font.render(word, True, (0, 0, 0))
                 # Position the shadow slightly offset from the word's original position (1 pixel down and right)
                 shadow_rect = shadow_surface.get_rect(topleft=(centered_x_offset + 1, y_offset + 1))
-                self.screen.blit(shadow_surface, shadow_rect)  # Draw the shadow on the screen
+                surface.blit(shadow_surface, shadow_rect)  # Draw the shadow on the screen
 
                 # Render the word itself with the appropriate color
                 word_surface = font.render(word, True, color)
                 # Set the position of the word to be centered horizontally and positioned at the current y_offset
                 word_rect = word_surface.get_rect(topleft=(centered_x_offset, y_offset))
-                self.screen.blit(word_surface, word_rect)  # Draw the word on the screen
+                surface.blit(word_surface, word_rect)  # Draw the word on the screen
 
                 # Update the x_offset to position the next word after the current one, including space width between words
                 centered_x_offset += word_surface.get_width() + font.size(" ")[0]
@@ -372,9 +512,14 @@ class GUI:
             y_offset += font.get_height() + 5
             
         # Set the height so the text fits inside
-        self.instruction_rect.height = y_offset - self.instruction_rect.top + 10
+        rect.height = y_offset - rect.top + 10
+        self.instruction_rect.height = rect.height
         self.instruction_rect.bottom = self.screen_height - 10
 
+        panel = surface.subsurface(rect).copy()
+        pygame.draw.rect(panel, (250, 5, 80), rect, 3)  # Draw instruction panel border
+        return panel
+
     def initiate_main_buttons(self, simulation_controlls, h_padding = 60):
         # setup parameters for button initiation
         button_width = self.control_panel_width - 2 * h_padding
@@ -444,24 +589,24 @@ class GUI:
         # ----- global repulsion -----
         self.text_fields.append(Text("Global Repulsion", 18, center=(relative_x + section_width*3//4 - 7, y)))
         self.sliders.append(Slider(relative_x + section_width//2, relative_x + section_width - 20, self.text_fields[-1].rect.bottom + 10, 0.0001, 0.01,
-                                   self.interaction_matrix.set_global_repulsion, self.interaction_matrix.get_global_repulsion))
+                                   simulation_controls['set_global_repulsion'], simulation_controls['get_global_repulsion']))
         
         # ----- min radius -----
         y = self.sliders[-1].rect.bottom + 20
         self.text_fields.append(Text("Min Radius", 18, center=(relative_x + section_width//4 - 7, y)))
         self.sliders.append(Slider(relative_x, relative_x + section_width//2 - 20, self.text_fields[-1].rect.bottom + 10, 0.00001, 0.049,
-                                   self.interaction_matrix.set_min_radius, self.interaction_matrix.get_min_radius))
+                                   simulation_controls['set_min_radius'], simulation_controls['get_min_radius']))
         
         # ----- max radius -----
         self.text_fields.append(Text("Max Radius", 20, center=(relative_x + section_width*3//4 - 7, y)))
         self.sliders.append(Slider(relative_x + section_width//2, relative_x + section_width - 20, self.text_fields[-1].rect.bottom + 10, 0.05, 0.3,
-                                   self.interaction_matrix.set_max_radius, self.interaction_matrix.get_max_radius))
+                                   simulation_controls['set_max_radius'], simulation_controls['get_max_radius']))
         
         # ----- randomize matrix fields -----
         pos = self.interactions_interface.relative_position
         first_field_rect = self.interactions_interface.fields[0, 0]
         
-        self.buttons.append(Button((0, 0), (30, 30), "", self.colors['normal-button'], self.interaction_matrix.randomize_fields, image_name="refresh.png"))
+        self.buttons.append(Button((0, 0), (30, 30), "", self.colors['normal-button'], simulation_controls['randomize_fields'], image_name="refresh.png"))
         self.buttons[-1].rect.bottomright = first_field_rect.topleft
         
         # ----- particle count -----
@@ -494,6 +639,31 @@ class GUI:
         
         self.interactions_interface.handle_click(event)
                 
+    def panel_widgets(self, mouse_pos):
+        """
+        Returns every element of the control panel in drawing order as (widget, state, area, draw) tuples.
+        state: Everything the look of the widget depends on, it is drawn again when this changes.
+        area: Rectangle of the screen the widget draws into.
+        draw: Draws the widget onto the given surface.
+        """
+        widgets = []
+        for text in self.text_fields:
+            text.update()
+            widgets.append((text, text.text, text.area(), text.draw))
+
+        for button in self.buttons:
+            widgets.append((button, button.state(mouse_pos), button.rect,
+                            lambda surface, button=button: button.draw(surface, mouse_pos)))
+
+        for slider in self.sliders:
+            widgets.append((slider, slider.slider_pos, slider.rect.inflate(2, 2), slider.draw))  # The knob reaches one pixel beyond rect
+
+        interface = self.interactions_interface
+        widgets.append((interface, interface.state(mouse_pos), interface.area(),
+                        lambda surface: interface.draw(surface, mouse_pos)))
+        widgets.append(("instruction", None, self.instruction_rect, self.draw_instruction))
+        return widgets
+
     def draw_control_panel(self, mouse_pos):
         """
         Renders all elements that make up the control panel section of the simulation interface:
@@ -501,34 +671,123 @@ class GUI:
         2. The interactive buttons that allow users to control the simulation (e.g. start, stop, reset).
         3. The interactions interface that shows different simulation parameters and controls.
         4. The instruction that provides guidance to the user on how to interact with the simulation.
+        The panel is drawn on the panel surface once. Afterwards only the areas of widgets whose state changed
+        are cleared and drawn again, together with the parts of other widgets overlapping them, and copied to the screen.
+        Returns the rectangles of the screen that changed.
         """
-        pygame.draw.rect(self.screen, self.colors['panel-background'],
-                         pygame.Rect(self.screen_width-self.control_panel_width, 0,
-                                     self.control_panel_width, self.screen_height))
-        
-        for text in self.text_fields:
-            text.update()
-            text.draw(self.screen)
-        
-        for button in self.buttons:
-            button.draw(self.screen, mouse_pos)
-            
-        for slider in self.sliders:
-            slider.draw(self.screen)
-            
-        self.interactions_interface.draw(self.screen, mouse_pos)
+        widgets = self.panel_widgets(mouse_pos)
 
-        self.draw_instruction()  # Draw the instruction
+        if not self.widget_states:  # If nothing was drawn yet, the whole panel is drawn
+            dirty_rects = [self.panel_rect]
+        else:
+            dirty_rects = []
+            for widget, state, area, _ in widgets:
+                previous_state, previous_area = self.widget_states[widget]
+                if state != previous_state or area != previous_area:  # Clears where it was and draws where it is
+                    dirty_rects.append(area.union(previous_area))
+        self.widget_states = {widget: (state, area) for widget, state, area, _ in widgets}
+
+        panel = self.panel_surface
+        for rect in dirty_rects:
+            panel.set_clip(rect)  # Overlapping widgets only draw their part inside the dirty area
+            panel.fill(self.colors['panel-background'], rect)
+            for _, _, area, draw in widgets:
+                if area.colliderect(rect):
+                    draw(panel)
+            self.screen.blit(panel, rect, rect)
+        panel.set_clip(None)
+
+        self.dirty_rects.extend(dirty_rects)
+        return dirty_rects
             
-    def draw_particles(self, particles):
+    def draw_particles(self, particles, threshold=0.001):
         """
         Renders the particles on the simulation area.
-        Clears the simulation area by drawing the background and then iterates over the provided list of particles.
-        For each particle, it retrieves the appropriate color based on its type and draws it onto the screen with its current properties.
+        A ParticleStore is drawn by the batched ParticleRenderer, which also clears the simulation area.
+        For an iterable of Particle objects, the area is cleared by drawing the background and each particle
+        is drawn onto the screen with the color of its type.
+        particles: ParticleStore or iterable of Particle objects.
+        threshold: Minimum movement before a particle's rendered position is updated.
         """
+        if hasattr(particles, "positions"):  # If a ParticleStore is given, draw directly from its arrays
+            self.particle_renderer.draw(self.screen, particles, self.screen_height, threshold)
+            self.dirty_rects.append(pygame.Rect(0, 0, self.screen_height + 1, self.screen_height + 1))
+            return
+
         # Reset canvas of simulation area
         pygame.draw.rect(self.screen, self.colors['simulation-background'], pygame.Rect(0, 0, self.screen_height + 1, self.screen_height + 1))
-        
+
         for p in particles:  # Iterate over the particles
             color = self.particle_colors[p.type]  # Retrieve the color based on the particle type
             p.draw(self.screen, self.screen_height, self.screen_height, color)  # Draw the particle with the properties
+        self.dirty_rects.append(pygame.Rect(0, 0, self.screen_height + 1, self.screen_height + 1))
+
+    def draw_perf_overlay(self, stats: dict):
+        """
+        Draws the rolling phase timings as a semi-transparent table in the top left corner of the simulation area.
+        stats: Dict mapping phase names to the statistics of PhaseTimer.get_stats, in milliseconds.
+        """
+        font = self.overlay_font
+        columns = ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+        rows = [("phase [ms]", "mean", "p50", "p95", "p99")]
+        rows += [(phase, *(f"{phase_stats[column]:.2f}" for column in columns)) for phase, phase_stats in stats.items()]
+
+        line_height = font.get_linesize()
+        name_width, column_width = 140, 60
+        background = pygame.Surface((name_width + column_width * len(columns) + 20, line_height * len(rows) + 10), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        self.dirty_rects.append(self.screen.blit(background, (5, 5)))
+
+        for index, row in enumerate(rows):
+            y = 10 + index * line_height
+            self.screen.blit(font.render(row[0], True, self.colors['christmas-white']), (10, y))
+            for column, value in enumerate(row[1:]):  # Numbers are right aligned in their column
+                rendered = font.render(value, True, self.colors['christmas-white'])
+                self.screen.blit(rendered, rendered.get_rect(topright=(10 + name_width + (column + 1) * column_width, y)))
+
+    def simulation_position(self, mouse_pos):
+        """
+        Converts a screen position into a position in the unit square of the simulation, None outside the simulation area.
+        """
+        x, y = mouse_pos
+        if not (0 <= x <= self.screen_height and 0 <= y <= self.screen_height):
+            return None
+        return x / self.screen_height, y / self.screen_height
+
+    def draw_inspection(self):
+        """
+        Marks the inspected particle and shows its id, type, velocity and number of neighbours next to it.
+        """
+        inspection = self.inspection
+        if inspection is None:
+            return
+        center = (round(inspection["position"][0] * self.screen_height), round(inspection["position"][1] * self.screen_height))
+        self.dirty_rects.append(pygame.draw.circle(self.screen, self.colors['christmas-white'], center, 8, 1))
+
+        font = self.overlay_font
+        vx, vy = inspection["velocity"]
+        rows = [f"particle {inspection['id']}", f"type {inspection['type']}", f"velocity {vx:.4f}, {vy:.4f}",
+                f"neighbours {inspection['neighbors']}"]
+        rendered = [font.render(row, True, self.colors['christmas-white']) for row in rows]
+        line_height = font.get_linesize()
+        background = pygame.Surface((max(text.get_width() for text in rendered) + 10, line_height * len(rows) + 10), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        # Placed below right of the particle, or on the other side if it would leave the simulation area
+        rect = background.get_rect(topleft=(center[0] + 12, center[1] + 12))
+        if rect.right > self.screen_height:
+            rect.right = center[0] - 12
+        if rect.bottom > self.screen_height:
+            rect.bottom = center[1] - 12
+        self.dirty_rects.append(self.screen.blit(background, rect))
+        for index, text in enumerate(rendered):
+            self.screen.blit(text, (rect.left + 5, rect.top + 5 + index * line_height))
+
+    def draw_replay_status(self, frame: int, frame_count: int, speed: float):
+        """
+        Draws the current frame, the number of recorded frames and the playback speed
+        in the bottom left corner of the simulation area.
+        """
+        font = self.status_font
+        text = f"Replay  frame {frame + 1}/{frame_count}  speed {speed:g}x"
+        rendered = font.render(text, True, self.colors['christmas-white'])
+        self.dirty_rects.append(self.screen.blit(rendered, rendered.get_rect(bottomleft=(10, self.screen_height - 10))))
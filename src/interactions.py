@@ -1,4 +1,3 @@
-import random
 from math import sqrt
 from numba import njit
 import numpy as np
@@ -11,39 +10,56 @@ class InteractionMatrix:
     max_radius (float): The farthest distance at which particles interact.
     global_repulsion (float): The global repulsive force between all particles to prevent overlap.
     interactions (numpy.ndarray): A matrix storing the interaction forces between particle types.
+    rng (numpy.random.Generator): Generator the random forces are drawn from.
+    version (int): Incremented whenever the forces or radii change, so tables derived from them can be rebuilt.
     """
-    def __init__(self, num_types: int, min_radius: float, max_radius: float, global_repulsion: float):
+    def __init__(self, num_types: int, min_radius: float, max_radius: float, global_repulsion: float, rng: np.random.Generator = None):
         """
         Initializes the InteractionMatrix object with the given parameters.
         num_types (int): The number of different particle types.
         min_radius (float): The minimum distance for interaction.
         max_radius (float): The maximum distance for interaction.
         global_repulsion (float): The repulsive force between all particles to prevent overlap.
+        rng (numpy.random.Generator): Generator the random forces are drawn from, a new unseeded one if None.
         """
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.number_of_types = num_types  # Number of particle types
         self.min_radius = min_radius  # Minimum distance for interaction
         self.max_radius = max_radius  # Maximum distance for interaction
         self.global_repulsion = global_repulsion  # Global repulsion factor
+        self.version = 0
         
-        # Numpy array to store the interaction forces between particle types
-        # Initialize with zeros, where interactions[i, j] represents the force between type i and type j
+        # Numpy array to store the interaction forces between particle types,
+        # where interactions[i, j] represents the force between type i and type j
         self.interactions = np.zeros((num_types, num_types), dtype=np.float64)
-        
-        # Randomly populate the interaction matrix with forces
-        for i in range(num_types):
-            for j in range(num_types):
-                # Randomly assign a force of either positive or negative, scaled by a random factor
-                self.interactions[i, j] = random.choice((1, -1)) * random.choice((0, 0.2, 0.4, 0.6, 0.8, 1))
-    
+        self.randomize_fields()  # Randomly populate the interaction matrix with forces
+
     def randomize_fields(self):
         """
         Randomizes the interaction matrix, reassigning random forces between particle types.
         This can be used to change interactions at any point in time.
         """
-        for i in range(self.number_of_types):
-            for j in range(self.number_of_types):
-                # Randomly assign a force value for each pair of particle types
-                self.interactions[i, j] = random.choice((1, -1)) * random.choice((0, 0.2, 0.4, 0.6, 0.8, 1))
+        # Every force is positive or negative, scaled by a random factor, all drawn in one batch
+        shape = (self.number_of_types, self.number_of_types)
+        self.interactions[:] = self.rng.choice((1, -1), shape) * self.rng.choice((0, 0.2, 0.4, 0.6, 0.8, 1), shape)
+        self.mark_changed()
+
+    def adjust_interaction(self, row: int, column: int, by: float):
+        """
+        Changes the force type `row` feels from type `column` by `by`, rounded to 2 decimal places.
+        The force is only increased while it is below 1 and only decreased while it is above -1.
+        """
+        value = self.interactions[row, column]
+        if (by > 0 and value < 1) or (by < 0 and value > -1):
+            self.interactions[row, column] = round(value + by, 2)
+            self.mark_changed()
+
+    def mark_changed(self):
+        """
+        Records that the forces or radii changed. Needed after writing to interactions or the radii directly,
+        the setters and randomize_fields call it themselves.
+        """
+        self.version += 1
     
     def set_min_radius(self, min_radius: float):
         """
@@ -51,6 +67,7 @@ class InteractionMatrix:
         min_radius (float): The new minimum interaction radius.
         """
         self.min_radius = min_radius
+        self.mark_changed()
         
     def get_min_radius(self):
         """
@@ -65,6 +82,7 @@ class InteractionMatrix:
         max_radius (float): The new maximum interaction radius.
         """
         self.max_radius = max_radius
+        self.mark_changed()
         
     def get_max_radius(self):
         """
@@ -78,6 +96,7 @@ class InteractionMatrix:
         global_repulsion (float): The new global repulsion force value.
         """
         self.global_repulsion = global_repulsion
+        self.mark_changed()
         
     def get_global_repulsion(self):
         """
@@ -90,7 +109,11 @@ def calculate_force(px1: float, py1: float, type1: int,
                      px2: float, py2: float, type2: int, 
                      interactions: np.ndarray, global_repulsion: float, 
                      max_radius: float, min_radius: float,
-                     max_repulsion: float = 5.0):
+                     max_repulsion: float = 5.0, periodic: bool = False):
+
+    if periodic:  # In a periodic world the nearest image of the other particle may lie across an edge
+        px2 = px1 + minimum_image(px2 - px1)
+        py2 = py1 + minimum_image(py2 - py1)
 
     force_strength = interactions[type1, type2]
     distance = _distance(px1, py1, px2, py2)
@@ -110,9 +133,9 @@ def calculate_force(px1: float, py1: float, type1: int,
     x_repulsion = -direction_x * repulsion_strength
     y_repulsion = -direction_y * repulsion_strength
 
-    # Beyond the max_radius only global_repulsion, but no interaction force is applied
+    # Beyond the max_radius no force acts at all, the engines skip those pairs
     if distance > max_radius:  # If the distance is greater than the maximum interaction radius...
-        return x_repulsion, y_repulsion  # ... only return the repulsion force (no interaction force applied)
+        return 0.0, 0.0  # ... neither repulsion nor interaction force is applied
     
     # Within interaction radius range interaction forces increase & decrease with proximity
     force_scale = (max_radius - distance) / (max_radius - min_radius)  
@@ -122,7 +145,71 @@ def calculate_force(px1: float, py1: float, type1: int,
     x_force = direction_x * net_force + x_repulsion
     y_force = direction_y * net_force + y_repulsion
     return x_force, y_force  # Returns the components of the force vector
-        
+
+@njit(inline='always')
+def calculate_pair_forces(px1: float, py1: float, type1: int,
+                          px2: float, py2: float, type2: int,
+                          interactions: np.ndarray, global_repulsion: float,
+                          max_radius: float, min_radius: float,
+                          max_repulsion: float = 5.0, periodic: bool = False):
+    """
+    Calculates the forces two particles exert on each other while computing their distance and direction only once.
+    Since the interaction matrix is asymmetric, particle 1 is pulled by interactions[type1, type2]
+    and particle 2 by interactions[type2, type1].
+    Each force matches calculate_force for that particle up to rounding, but a single reciprocal
+    of the distance replaces its divisions.
+    Only valid for particles within max_radius of each other, the engines skip all other pairs.
+    Returns (x_force_1, y_force_1, x_force_2, y_force_2).
+    """
+    delta_x, delta_y = px2 - px1, py2 - py1
+    if periodic:  # In a periodic world the nearest image of the other particle may lie across an edge
+        delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+    distance = sqrt(delta_x * delta_x + delta_y * delta_y)
+    inverse_distance = 1.0 / (distance + 1e-12)  # Small value to prevent division by zero
+
+    # Direction from particle 1 to particle 2, the opposite direction applies to particle 2
+    direction_x = delta_x * inverse_distance
+    direction_y = delta_y * inverse_distance
+
+    # Repulsion applies at all distances, but increases with smaller distance
+    repulsion_strength = min(global_repulsion * inverse_distance, max_repulsion)
+
+    # Within interaction radius range interaction forces increase & decrease with proximity
+    force_scale = (max_radius - distance) / (max_radius - min_radius)
+    net_force_1 = interactions[type1, type2] * force_scale - repulsion_strength
+    net_force_2 = interactions[type2, type1] * force_scale - repulsion_strength
+
+    return (direction_x * net_force_1, direction_y * net_force_1,
+            -direction_x * net_force_2, -direction_y * net_force_2)
+
+@njit(inline='always')
+def tabulated_pair_forces(delta_x: float, delta_y: float, distance_squared: float, type1: int, type2: int,
+                          force_table: np.ndarray, table_scale: float):
+    """
+    Looks up the forces two particles exert on each other in a table of ForceTable, without any square root or division.
+    delta_x, delta_y: Vector from particle 1 to particle 2.
+    distance_squared: Squared length of the vector, at most the max_radius the table was built for.
+    force_table: (types, types, samples) force divided by distance, sampled uniformly over the squared distance.
+    table_scale: Samples per unit of squared distance.
+    Returns (x_force_1, y_force_1, x_force_2, y_force_2) like calculate_pair_forces.
+    """
+    position = distance_squared * table_scale
+    index = min(int(position), force_table.shape[2] - 2)
+    weight = position - index  # Linear interpolation between the two nearest samples
+
+    samples_1 = force_table[type1, type2]
+    samples_2 = force_table[type2, type1]
+    scale_1 = samples_1[index] + weight * (samples_1[index + 1] - samples_1[index])
+    scale_2 = samples_2[index] + weight * (samples_2[index + 1] - samples_2[index])
+    return delta_x * scale_1, delta_y * scale_1, -delta_x * scale_2, -delta_y * scale_2
+
+@njit(inline='always')
+def minimum_image(delta):
+    """
+    Maps a coordinate difference in the periodic unit square onto its shortest equivalent in [-0.5, 0.5].
+    """
+    return delta - np.floor(delta + 0.5)
+
 @njit
 # Calculates distance between two particles
 def _distance(px1, py1, px2, py2):
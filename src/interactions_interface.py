@@ -5,7 +5,8 @@ class InteractionsInterface:
     def __init__(self, interaction_matrix,
                  type_colors: List[Tuple[int, int, int]],
                  top_left: Tuple[int, int],
-                 right: int):
+                 right: int,
+                 adjust_interaction: callable = None):
         """
         Serves as an interface between GUI and InteractionMatrix class.
         Provides the visual representation of InteractionMatrix and the ability to alter the strength of force between particle types.
@@ -13,8 +14,10 @@ class InteractionsInterface:
         type_colors: list containing the colors of each type.
         top_left (x, y): relative position/coordinate the matrix is drawn to.
         right: x-coordinate to which the matrix extends (determining width and height of matrix).
+        adjust_interaction: changes a field, called with its row, column and the change (defaults to InteractionMatrix.adjust_interaction).
         """
         self.interaction_matrix = interaction_matrix
+        self.adjust_interaction = adjust_interaction or interaction_matrix.adjust_interaction
         self.relative_position = top_left
         self.type_colors = type_colors
         
@@ -30,6 +33,24 @@ class InteractionsInterface:
             (i, j): pygame.Rect((rel_x + (j+1)*self.field_size, rel_y + (i+1)*self.field_size), (self.field_size, self.field_size))
             for i in range(num_types) for j in range(num_types)  # i = row; j = col
         }
+        self.font = pygame.font.Font(None, 36)  # Font of the value shown on hover
+
+    def hovered_field(self, mouse_pos):
+        """Returns the key of the field the mouse hovers over, or None."""
+        for field_index, field_rect in self.fields.items():
+            if field_rect.collidepoint(mouse_pos):
+                return field_index
+        return None
+
+    def state(self, mouse_pos):
+        """Returns what the look of the interface depends on: the interaction values and the hovered field."""
+        return self.interaction_matrix.interactions.tobytes(), self.hovered_field(mouse_pos)
+
+    def area(self):
+        """Returns the rectangle the interface draws into, including the hover text reaching beyond the outer fields."""
+        rel_x, rel_y = self.relative_position
+        size = (self.interaction_matrix.number_of_types + 1) * self.field_size
+        return pygame.Rect(rel_x, rel_y, size, size).inflate(self.field_size, 0)
 
     def draw(self, surface, mouse_pos):
         """Draws the whole InteractionsInterface including type-indicators and current state of InteractionMatrix
@@ -54,7 +75,7 @@ class InteractionsInterface:
             
             # show value when mouse hovers field
             if field_rect.collidepoint(mouse_pos):
-                text_surface = pygame.font.Font(None, 36).render(str(interaction_value), True, (255, 255, 255))
+                text_surface = self.font.render(str(interaction_value), True, (255, 255, 255))
                 text_rect = text_surface.get_rect(center=field_rect.center)
                 surface.blit(text_surface, text_rect)
 
@@ -67,7 +88,6 @@ class InteractionsInterface:
         # Create a small pygame.Rect at mouse position to receive dict item with corresponding InteractionMatrix key
         if result := pygame.Rect(event.pos, (1, 1)).collidedict(self.fields, values=True):  # If a field is clicked ...
             key = result[0]  # ... get the key of the clicked field
-            interaction_value = self.interaction_matrix.interactions[key]  # Retrieve the current interaction value from the InteractionMatrix
             
             # Determine which mouse button was pressed (event.button values):
             # 1 = left mouse button click
@@ -76,11 +96,13 @@ class InteractionsInterface:
             # 4 = mouse wheel scroll up
             # 5 = mouse wheel scroll down
 
-            if event.button == 4 and interaction_value < 1:  # If the mouse wheel was scrolled up and the interaction value is less than 1 ...
-                self.interaction_matrix.interactions[key] = round(interaction_value + adjust_by, 2)  # ... increase the interaction value by `adjust_by`, rounded to 2 decimal places
-                
-            if event.button == 5 and interaction_value > -1:  # If the mouse wheel was scrolled down and the interaction value is greater than -1 ...
-                self.interaction_matrix.interactions[key] = round(interaction_value - adjust_by, 2)  # ... decrease the interaction value by `adjust_by`, rounded to 2 decimal places
+            # The change is made by adjust_interaction, which only increases values below 1 and decreases values above -1,
+            # so a simulation running on its own thread can apply it between two steps
+            if event.button == 4:  # If the mouse wheel was scrolled up ...
+                self.adjust_interaction(*key, adjust_by)  # ... increase the interaction value by `adjust_by`
+
+            if event.button == 5:  # If the mouse wheel was scrolled down ...
+                self.adjust_interaction(*key, -adjust_by)  # ... decrease the interaction value by `adjust_by`
 
     def __draw_type_indicators(self, surface):
         """Indicating the rows and columns of InteractionMatix with corresponding colors of particle types.
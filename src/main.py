@@ -1,32 +1,38 @@
 import sys
+import argparse
 import cProfile
 import pstats
 import pygame
 import time
 
 from gui import GUI
+from config import simulation_parameters, build_simulation
 from interactions import InteractionMatrix
-from simulation import Simulation
-
-# Centralizes adjustment of all relevant parameters
-simulation_parameters = {
-    "n_particles": 2000,        # Number of particles 
-    "n_types": 5,               # Number of particle types
-    "time_factor": 0.1,         # Controls simulation speed
-    "force_scaling": 0.2,       # Scales force acting on particles velocity
-    "min_radius": 0.01,         # Distance at which interaction starts and its force is strongest
-    "max_radius": 0.15,         # Distance at which interactions force is weakest and after which it stops
-    "global_repulsion": 0.004,  # Repulsive force acting on all particles
-    "friction": 0.5,            # Slows particles down over time
-    "random_movement": 0        # Adds random movement to particles position
-}
+from profiling import PhaseTimer
+from particle import ParticleStore
+from trajectory import open_trajectory, ReplayPlayer
+from simulation_thread import SimulationThread
 
+INSPECT_PIXELS = 10  # Distance in pixels from the mouse within which a particle is inspected
+SEEK_FRAMES = 30  # Recorded frames the arrow keys seek by while replaying
 
 class Main:
     
-    def __init__(self):
-
+    def __init__(self, perf_overlay: bool = False, profile_frames: int = 0, profile_output: str = "profile.prof", replay: str = None):
+        """
+        perf_overlay: Whether the phase timings are shown on top of the simulation (toggle with F3).
+        profile_frames: Number of frames to run under cProfile before dumping the statistics (0 disables profiling).
+        profile_output: File the cProfile statistics are written to.
+        replay: Trajectory directory or compressed .ptz file to play back instead of simulating (optional).
+        """
         pygame.init()
+
+        # Measures how long the phases of every frame take
+        self.timer = PhaseTimer()
+        self.perf_overlay = perf_overlay
+        self.inspect_tool = False  # Whether the particle under the mouse is inspected (toggle with I)
+        self.profile_frames = profile_frames
+        self.profile_output = profile_output
         
         # Set up the clock to control the frame rate of the simulation
         self.clock = pygame.time.Clock()
@@ -36,58 +42,186 @@ class Main:
         self.height = pygame.display.Info().current_h
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.SCALED)
 
-        self.interaction_matrix = InteractionMatrix(
-            simulation_parameters["n_types"],
-            simulation_parameters["min_radius"],
-            simulation_parameters["max_radius"],
-            simulation_parameters["global_repulsion"]
-        )
-
-        self.simulation = Simulation(
-            self.width, self.height,
-            self.interaction_matrix,
-            simulation_parameters["n_particles"],
-            simulation_parameters["n_types"],
-            simulation_parameters["time_factor"],
-            simulation_parameters["force_scaling"],
-            simulation_parameters["friction"],
-            simulation_parameters["random_movement"]
-        )
-
-        simulation_controlls = {
-            'start': self.simulation.start_simulation,
-            'stop': self.simulation.stop_simulation,
-            'reset': self.simulation.reset_simulation,
-            'exit': lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)),
-            'set_sim_speed': self.simulation.adjust_time_factor,
-            'get_sim_speed': self.simulation.get_time_factor,
-            'set_force_scaling': self.simulation.set_force_scaling,
-            'get_force_scaling': self.simulation.get_force_scaling,
-            'set_particle_count': self.simulation.modify_particle_count,
-            'get_particle_count': self.simulation.get_particle_count,
-            'set_friction': self.simulation.set_friction,
-            'get_friction': self.simulation.get_friction,
-            'set_random_movement': self.simulation.set_random_movement,
-            'get_random_movement': self.simulation.get_random_movement,
-            'particle_count': lambda: len(self.simulation.particles),
-            'add_particles': self.simulation.add_particles,
-            'remove_particles': self.simulation.remove_particles
-        }
+        if replay:  # In replay mode recorded frames are only read and drawn, Start and Stop play and pause them
+            # No simulation is built, so nothing is simulated, recorded or autosaved over the replayed trajectory
+            self.simulation, self.simulation_thread = None, None
+            self.player = ReplayPlayer(open_trajectory(replay), ParticleStore())
+            # The matrix of the parameters is only shown, the recorded frames do not depend on it
+            self.interaction_matrix = InteractionMatrix(simulation_parameters["n_types"], simulation_parameters["min_radius"],
+                                                        simulation_parameters["max_radius"], simulation_parameters["global_repulsion"])
+            simulation_controlls = self.replay_controlls()
+        else:
+            self.simulation = build_simulation(simulation_parameters, self.width, self.height)
+            self.interaction_matrix = self.simulation.interaction_matrix
+
+            # If a physics rate is set, the simulation steps at that rate on its own thread and the frames draw its latest state
+            physics_rate = simulation_parameters["physics_rate"]
+            self.simulation_thread = SimulationThread(self.simulation, physics_rate) if physics_rate else None
+            self.player = None
+
+            if self.simulation.engine == "parallel":  # Report what the extra cores buy over a single one
+                speedup = self.simulation.measure_speedup()
+                print(f"Parallel engine: {speedup['threads']} threads, "
+                      f"{speedup['speedup']:.2f}x faster than the serial force pass")
+
+            simulation_controlls = {
+                'start': self.simulation.start_simulation,
+                'stop': self.simulation.stop_simulation,
+                'reset': self.simulation.reset_simulation,
+                'exit': lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)),
+                'set_sim_speed': self.simulation.adjust_time_factor,
+                'get_sim_speed': self.simulation.get_time_factor,
+                'set_force_scaling': self.simulation.set_force_scaling,
+                'get_force_scaling': self.simulation.get_force_scaling,
+                'set_particle_count': self.simulation.modify_particle_count,
+                'get_particle_count': self.simulation.get_particle_count,
+                'set_friction': self.simulation.set_friction,
+                'get_friction': self.simulation.get_friction,
+                'set_random_movement': self.simulation.set_random_movement,
+                'get_random_movement': self.simulation.get_random_movement,
+                'particle_count': lambda: len(self.simulation.particles),
+                'add_particles': self.simulation.add_particles,
+                'remove_particles': self.simulation.remove_particles,
+                'set_global_repulsion': self.interaction_matrix.set_global_repulsion,
+                'get_global_repulsion': self.interaction_matrix.get_global_repulsion,
+                'set_min_radius': self.interaction_matrix.set_min_radius,
+                'get_min_radius': self.interaction_matrix.get_min_radius,
+                'set_max_radius': self.interaction_matrix.set_max_radius,
+                'get_max_radius': self.interaction_matrix.get_max_radius,
+                'randomize_fields': self.interaction_matrix.randomize_fields,
+                'adjust_interaction': self.interaction_matrix.adjust_interaction
+            }
+
+        if self.simulation_thread is not None:  # Changes reach the simulation thread through its command queue
+            for name in ('start', 'stop', 'reset', 'set_sim_speed', 'set_force_scaling', 'set_particle_count',
+                         'set_friction', 'set_random_movement', 'add_particles', 'remove_particles',
+                         'set_global_repulsion', 'set_min_radius', 'set_max_radius', 'randomize_fields', 'adjust_interaction'):
+                simulation_controlls[name] = lambda *args, action=simulation_controlls[name]: self.simulation_thread.submit(action, *args)
         
         # Create the GUI, passing in the necessary details such as screen dimensions, the interaction matrix, and the simulation controls
         self.gui = GUI(self.screen, self.width, self.height, self.interaction_matrix, simulation_controlls)
 
+    def replay_controlls(self):
+        """
+        Returns the controls of the GUI in replay mode: Start, Stop and Reset play, pause and rewind the replay and
+        the simulation speed buttons change the playback speed. The other settings show the parameters and change nothing.
+        """
+        player = self.player
+
+        def set_playing(playing: bool):
+            player.paused = not playing
+
+        controls = {
+            'start': lambda: set_playing(True),
+            'stop': lambda: set_playing(False),
+            'reset': lambda: player.seek(0),
+            'exit': lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)),
+            'set_sim_speed': lambda by_percent: setattr(player, "speed", player.speed * (1 + by_percent)),
+            'get_sim_speed': lambda: player.speed,
+            'set_particle_count': lambda by: None,
+            'get_particle_count': lambda: len(player.store),
+            'particle_count': lambda: len(player.store),
+            'add_particles': lambda: None,
+            'remove_particles': lambda: None,
+            'randomize_fields': lambda: None,
+            'adjust_interaction': lambda row, column, by: None
+        }
+        for name in ('force_scaling', 'friction', 'random_movement', 'global_repulsion', 'min_radius', 'max_radius'):
+            controls['set_' + name] = lambda value: None
+            controls['get_' + name] = lambda name=name: simulation_parameters[name]
+        return controls
+
     def handle_events(self):
         # Loop through all the events in the pygame event queue
         for event in pygame.event.get():
             if event.type == pygame.QUIT:  # If the user closes the window ...
                 self.running = False  # ... set running to False to stop the game loop and ...
+                if self.simulation_thread is not None:
+                    self.simulation_thread.stop()
+                if self.player is not None:
+                    self.player.close()
+                else:
+                    self.simulation.close()  # ... finish recordings and autosaves and ...
                 pygame.quit()  # ... quit pygame and ...
                 sys.exit()  # ... exit the program
 
             elif event.type == pygame.MOUSEBUTTONDOWN:  # If a mouse button is pressed ...
                 self.gui.button_click(event)  # ... handle button click event in the GUI
 
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # If the window has to be shown again ...
+                self.gui.invalidate()  # ... redraw the whole control panel and update the whole display
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:  # If F3 is pressed ...
+                self.perf_overlay = not self.perf_overlay  # ... show or hide the performance overlay
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_i and self.player is None:  # If I is pressed ...
+                self.inspect_tool = not self.inspect_tool  # ... start or stop inspecting the particle under the mouse
+                self.gui.inspection = None
+
+            elif event.type == pygame.KEYDOWN and self.player is not None:  # If a key is pressed while replaying ...
+                self.handle_replay_key(event.key)  # ... seek or change the playback speed
+
+    def handle_replay_key(self, key):
+        """
+        Arrow keys left/right seek by SEEK_FRAMES recorded frames, up/down double or halve the speed,
+        backspace reverses the playback direction and home/end jump to the first/last frame.
+        """
+        player = self.player
+        if key == pygame.K_LEFT:
+            player.seek(player.position - SEEK_FRAMES)
+        elif key == pygame.K_RIGHT:
+            player.seek(player.position + SEEK_FRAMES)
+        elif key == pygame.K_UP:
+            player.speed *= 2
+        elif key == pygame.K_DOWN:
+            player.speed /= 2
+        elif key == pygame.K_BACKSPACE:
+            player.speed = -player.speed
+        elif key == pygame.K_HOME:
+            player.seek(0)
+        elif key == pygame.K_END:
+            player.seek(len(player.reader) - 1)
+
+    def update_inspection(self, mouse_pos):
+        """
+        Looks up the particle under the mouse in the simulation's cell grid for the GUI to show.
+        With a simulation thread, the lookup runs between two steps and is shown from the next frame on.
+        """
+        position = self.gui.simulation_position(mouse_pos)
+        if position is None:
+            self.gui.inspection = None
+            return
+        radius = INSPECT_PIXELS / self.height
+        if self.simulation_thread is not None:
+            self.simulation_thread.submit(lambda: setattr(self.gui, "inspection", self.simulation.inspect(*position, radius)))
+        else:
+            self.gui.inspection = self.simulation.inspect(*position, radius)
+
+    def get_perf_stats(self):
+        """
+        Returns the rolling timings in milliseconds of the frame phases and, nested under "update",
+        of the simulation update phases.
+        """
+        return {"frame": self.timer.get_stats(), "update": self.get_update_stats()}
+
+    def get_update_stats(self):
+        """
+        Returns the timings of the simulation update phases, as last collected by the simulation thread if there is one.
+        """
+        if self.simulation_thread is not None:
+            return self.simulation_thread.perf_stats
+        if self.simulation is None:  # A replay has no updates
+            return {}
+        return self.simulation.get_perf_stats()
+
+    def dump_profile(self, profiler):
+        """
+        Writes the collected cProfile statistics to profile_output and prints the most expensive calls.
+        """
+        profiler.dump_stats(self.profile_output)
+        print(f"Profile of {self.profile_frames} frames written to {self.profile_output}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
     def run(self, fps: int):  # Define the main game loop
         """
         Runs the main game loop, continuously updating and rendering the simulation.
@@ -96,20 +230,74 @@ class Main:
         It also refreshes the display to show the latest frame.
         """
         self.running = True
+        timer = self.timer
+        frame = 0
+
+        # If profiling is requested, the first profile_frames frames run under cProfile
+        profiler = cProfile.Profile() if self.profile_frames else None
+        if profiler:
+            profiler.enable()
+
+        if self.simulation_thread is not None:
+            self.simulation_thread.start()
         
         while self.running:  # While the game is running
             self.handle_events()  # Handle user input
             dt = self.clock.tick(fps) / 1000  # Time passed since last call in ms
+            timer.start()  # Waiting for the next frame is not part of the frame's work
             
-            if not self.simulation.paused:  # If the simulation is not paused ...
+            if self.player is not None:  # If a trajectory is replayed, no forces are calculated
+                if not self.player.paused:  # If playing, move on to the next recorded frame
+                    self.player.advance()
+                timer.lap("replay")
+                self.gui.draw_particles(self.player.store)  # Drawn while paused too, so seeking is visible
+                self.gui.draw_replay_status(self.player.frame_index, len(self.player.reader), self.player.speed)
+                timer.lap("draw_particles")
+
+            elif self.simulation_thread is not None:  # If the simulation runs on its own thread, draw its latest state ...
+                alpha = self.simulation_thread.interpolation()  # ... placed between its last two steps
+                with self.simulation_thread.snapshots.read(alpha) as particles:
+                    self.gui.draw_particles(particles, threshold=0)
+                timer.lap("draw_particles")
+
+            elif not self.simulation.paused:  # If the simulation is not paused ...
                 self.simulation.update(dt)  # ... update the simulation and ...
+                timer.lap("update")
                 self.gui.draw_particles(self.simulation.particles)  # ... draw the particles
+                timer.lap("draw_particles")
+
+            elif self.inspect_tool:  # If paused while inspecting, the particles are drawn again so the inspection follows the mouse
+                self.gui.draw_particles(self.simulation.particles)
+                timer.lap("draw_particles")
             
             mouse_pos = pygame.mouse.get_pos()  # Get the current mouse position
+            if self.inspect_tool:  # If inspecting, look up and mark the particle under the mouse
+                self.update_inspection(mouse_pos)
+                self.gui.draw_inspection()
+                timer.lap("inspect")
             self.gui.draw_control_panel(mouse_pos)  # Draw the control panel with the current mouse position
+            timer.lap("control_panel")
+
+            if self.perf_overlay:  # If enabled, show the frame and update phases on top of the particles
+                self.gui.draw_perf_overlay({**self.timer.get_stats(), **self.get_update_stats()})
+                timer.lap("overlay")
 
-            pygame.display.flip()  # Updates the entire screen to show the latest drawing changes (Refresh)
+            pygame.display.update(self.gui.take_dirty_rects())  # Refreshes only the parts of the screen drawn this frame
+            timer.lap("display_update")
+
+            frame += 1
+            if profiler and frame == self.profile_frames:  # If enough frames are profiled, report them
+                profiler.disable()
+                self.dump_profile(profiler)
+                profiler = None
 
 if __name__ == "__main__":  # Ensures the script runs directly, not imported
-    app = Main()  # Initializes the Main app
+    parser = argparse.ArgumentParser(description="Run the particle life simulation.")
+    parser.add_argument("--overlay", action="store_true", help="show the performance overlay (toggle with F3)")
+    parser.add_argument("--profile", type=int, default=0, metavar="FRAMES", help="profile this many frames with cProfile")
+    parser.add_argument("--profile-output", default="profile.prof", help="file the cProfile statistics are written to")
+    parser.add_argument("--replay", help="trajectory (directory or .ptz file) to play back instead of simulating")
+    args = parser.parse_args()
+
+    app = Main(args.overlay, args.profile, args.profile_output, args.replay)  # Initializes the Main app
     app.run(fps=30)  # Runs the app with 30 FPS
@@ -0,0 +1,312 @@
+from numba import njit, prange
+import numpy as np
+from engine import neighbor_cell, force_arguments
+from interactions import calculate_pair_forces, tabulated_pair_forces, minimum_image
+
+class VerletList:
+    """
+    Per-particle neighbor lists holding all particles within max_radius + skin.
+    The lists stay valid until some particle has moved more than skin / 2 since they were built,
+    so slowly moving particles only need an occasional rebuild instead of a grid search every step.
+    skin (float): Extra distance beyond max_radius that is kept in the lists.
+    rebuild_count (int): Number of times the lists have been rebuilt.
+    step_count (int): Number of force passes computed from the lists.
+    """
+    def __init__(self, skin: float = 0.02):
+        """
+        Initializes empty neighbor lists.
+        skin (float): Extra distance beyond max_radius kept in the lists. A larger skin means fewer
+            rebuilds, but more pairs beyond max_radius that have to be checked every step.
+        """
+        self.skin = skin
+        self.rebuild_count = 0
+        self.step_count = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces a rebuild before the next force pass.
+        """
+        self.reference_positions = None  # Positions at the time of the last rebuild
+        self.radius = None  # List radius used for the last rebuild
+        self.source = None  # ParticleStore and version the lists were built for
+        self.parallel = None  # Whether the lists hold every pair twice (parallel) or once (serial)
+        self.periodic = False  # Whether the lists were built with distances wrapping around the edges
+        self.neighbor_start = np.zeros(1, dtype=np.int64)
+        self.neighbors = np.zeros(0, dtype=np.int64)
+
+    def needs_rebuild(self, particles, radius: float, parallel: bool):
+        """
+        Checks whether the lists are outdated for the given particles and list radius.
+        """
+        if self.reference_positions is None or self.radius != radius or self.parallel != parallel:
+            return True
+        if self.source != (particles, particles.version):  # If particles were added, removed or replaced
+            return True
+        # Two particles each moving skin / 2 towards each other could enter max_radius unnoticed
+        return max_displacement_squared(particles.positions, self.reference_positions, self.periodic) > (self.skin / 2) ** 2
+
+    def rebuild(self, grid, particles, radius: float, parallel: bool):
+        """
+        Bins the particles into the grid fitted to the list radius and rebuilds the lists from it.
+        grid (CellGrid): Grid that is refitted and rebuilt for the list radius.
+        """
+        grid.fit(radius)
+        grid.rebuild(particles.positions)
+
+        build = build_full_lists if parallel else build_half_lists
+        self.neighbor_start, self.neighbors = build(particles.positions, grid.grid_size, grid.reach, grid.periodic,
+                                                    grid.cell_start, grid.cell_count, grid.cell_particles, radius)
+
+        self.reference_positions = particles.positions.copy()
+        self.radius, self.parallel, self.periodic = radius, parallel, grid.periodic
+        self.source = (particles, particles.version)
+        self.rebuild_count += 1
+
+    def accumulate_forces(self, grid, particles, interaction_matrix, parallel: bool = False, force_table=None):
+        """
+        Returns the (N, 2) array of forces acting on the particles, rebuilding the lists first if needed.
+        grid (CellGrid): Grid used to find the neighbors when the lists are rebuilt.
+        particles (ParticleStore): The particles the forces are calculated for.
+        interaction_matrix (InteractionMatrix): Provides the interaction forces and radii.
+        parallel (bool): Whether to distribute the force pass across all configured threads.
+        force_table (ForceTable): Looks the forces up in tables instead of calculating them (optional).
+        """
+        radius = interaction_matrix.max_radius + self.skin
+        if self.needs_rebuild(particles, radius, parallel) or self.periodic != grid.periodic:
+            self.rebuild(grid, particles, radius, parallel)
+
+        arguments = (particles.positions, particles.types, self.neighbor_start, self.neighbors, self.periodic,
+                     *force_arguments(interaction_matrix, force_table, particles.positions.dtype))
+
+        self.step_count += 1
+        return list_forces_parallel(*arguments) if parallel else list_forces(*arguments)
+
+    def get_stats(self):
+        """
+        Returns the rebuild statistics used to tune the skin.
+        """
+        return {
+            "skin": self.skin,
+            "rebuilds": self.rebuild_count,
+            "steps": self.step_count,
+            "steps_per_rebuild": self.step_count / self.rebuild_count if self.rebuild_count else 0.0,
+            "pairs": len(self.neighbors)
+        }
+
+@njit(nogil=True)
+def max_displacement_squared(positions, reference_positions, periodic=False):
+    """
+    Returns the largest squared distance any particle has moved from its reference position.
+    In a periodic world a particle that wrapped around an edge has only moved the short way.
+    """
+    largest = 0.0
+    for i in range(positions.shape[0]):
+        delta_x = positions[i, 0] - reference_positions[i, 0]
+        delta_y = positions[i, 1] - reference_positions[i, 1]
+        if periodic:
+            delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+        largest = max(largest, delta_x * delta_x + delta_y * delta_y)
+    return largest
+
+@njit
+def _visit_half_shell(i, a, cell, grid_x, grid_y, positions, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                      radius_squared, neighbors, fill):
+    """
+    Visits the later particles of i's own cell and the cells ahead of it, counting the partners within
+    the list radius and storing them in neighbors from index fill on if neighbors is not empty.
+    Returns the next free index.
+    """
+    px, py = positions[i, 0], positions[i, 1]
+    for offset_x in range(reach + 1):
+        for offset_y in range(-reach if offset_x else 0, reach + 1):
+            neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+            if neighbor < 0:  # If the neighbour does not exist in the grid
+                continue
+            first = a + 1 if neighbor == cell else cell_start[neighbor]
+
+            for b in range(first, cell_start[neighbor] + cell_count[neighbor]):
+                j = cell_particles[b]
+                delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+                if periodic:
+                    delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+                if delta_x * delta_x + delta_y * delta_y <= radius_squared:
+                    if len(neighbors):
+                        neighbors[fill] = j
+                    fill += 1
+    return fill
+
+@njit(nogil=True)
+def build_half_lists(positions, grid_size, reach, periodic, cell_start, cell_count, cell_particles, radius):
+    """
+    Builds compressed lists in which every pair within the radius is stored once, under one of its particles.
+    Returns neighbor_start (N + 1,) and neighbors, the partners of particle i being
+    neighbors[neighbor_start[i]:neighbor_start[i + 1]].
+    """
+    num_particles = positions.shape[0]
+    radius_squared = radius * radius
+    counts = np.zeros(num_particles, dtype=np.int64)
+    empty = np.zeros(0, dtype=np.int64)
+
+    # First pass counts the partners of every particle ...
+    for cell in range(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+            i = cell_particles[a]
+            counts[i] = _visit_half_shell(i, a, cell, grid_x, grid_y, positions, grid_size, reach, periodic,
+                                          cell_start, cell_count, cell_particles, radius_squared, empty, 0)
+
+    neighbor_start = np.zeros(num_particles + 1, dtype=np.int64)
+    neighbor_start[1:] = np.cumsum(counts)
+    neighbors = np.empty(neighbor_start[-1], dtype=np.int64)
+
+    # ... the second pass stores them
+    for cell in range(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+            i = cell_particles[a]
+            if counts[i]:
+                _visit_half_shell(i, a, cell, grid_x, grid_y, positions, grid_size, reach, periodic,
+                                  cell_start, cell_count, cell_particles, radius_squared, neighbors, neighbor_start[i])
+
+    return neighbor_start, neighbors
+
+@njit
+def _visit_full_shell(i, grid_x, grid_y, positions, grid_size, reach, periodic, cell_start, cell_count, cell_particles,
+                      radius_squared, neighbors, fill):
+    """
+    Visits all neighboring cells of particle i, counting or storing its partners like _visit_half_shell.
+    """
+    px, py = positions[i, 0], positions[i, 1]
+    for offset_x in range(-reach, reach + 1):
+        for offset_y in range(-reach, reach + 1):
+            neighbor = neighbor_cell(grid_x + offset_x, grid_y + offset_y, grid_size, periodic)
+            if neighbor < 0:  # If the neighbour does not exist in the grid
+                continue
+            for b in range(cell_start[neighbor], cell_start[neighbor] + cell_count[neighbor]):
+                j = cell_particles[b]
+                delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+                if periodic:
+                    delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+                if i != j and delta_x * delta_x + delta_y * delta_y <= radius_squared:
+                    if len(neighbors):
+                        neighbors[fill] = j
+                    fill += 1
+    return fill
+
+@njit(parallel=True, nogil=True)
+def build_full_lists(positions, grid_size, reach, periodic, cell_start, cell_count, cell_particles, radius):
+    """
+    Builds compressed lists in which every particle holds all its partners within the radius,
+    so the force pass can gather them without two threads writing to the same particle.
+    Returns neighbor_start and neighbors like build_half_lists.
+    """
+    num_particles = positions.shape[0]
+    radius_squared = radius * radius
+    counts = np.zeros(num_particles, dtype=np.int64)
+    empty = np.zeros(0, dtype=np.int64)
+
+    for cell in prange(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+            i = cell_particles[a]
+            counts[i] = _visit_full_shell(i, grid_x, grid_y, positions, grid_size, reach, periodic,
+                                          cell_start, cell_count, cell_particles, radius_squared, empty, 0)
+
+    neighbor_start = np.zeros(num_particles + 1, dtype=np.int64)
+    neighbor_start[1:] = np.cumsum(counts)
+    neighbors = np.empty(neighbor_start[-1], dtype=np.int64)
+
+    for cell in prange(grid_size * grid_size):
+        grid_x, grid_y = cell // grid_size, cell % grid_size
+        for a in range(cell_start[cell], cell_start[cell] + cell_count[cell]):
+            i = cell_particles[a]
+            if counts[i]:
+                _visit_full_shell(i, grid_x, grid_y, positions, grid_size, reach, periodic,
+                                  cell_start, cell_count, cell_particles, radius_squared, neighbors, neighbor_start[i])
+
+    return neighbor_start, neighbors
+
+@njit(nogil=True)
+def list_forces(positions, types, neighbor_start, neighbors, periodic, interactions, global_repulsion, max_radius, min_radius,
+                force_table, table_scale):
+    """
+    Sums the forces of all pairs in half lists, applying each pair's forces to both of its particles.
+    Pairs that are in the lists but beyond max_radius are skipped.
+    """
+    forces = np.zeros_like(positions)
+    max_radius_squared = max_radius * max_radius
+    tabulated = force_table.shape[0] > 0
+
+    for i in range(positions.shape[0]):
+        px, py, particle_type = positions[i, 0], positions[i, 1], types[i]
+        force_x, force_y = 0.0, 0.0
+
+        for k in range(neighbor_start[i], neighbor_start[i + 1]):
+            j = neighbors[k]
+            delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+            if periodic:
+                delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+            distance_squared = delta_x * delta_x + delta_y * delta_y
+            if distance_squared > max_radius_squared:  # Out of interaction range
+                continue
+
+            if tabulated:
+                pair_x, pair_y, forces_j_x, forces_j_y = tabulated_pair_forces(
+                    delta_x, delta_y, distance_squared, particle_type, types[j], force_table, table_scale
+                )
+            else:
+                pair_x, pair_y, forces_j_x, forces_j_y = calculate_pair_forces(
+                    px, py, particle_type, positions[j, 0], positions[j, 1], types[j],
+                    interactions, global_repulsion, max_radius, min_radius, 5.0, periodic
+                )
+            force_x += pair_x
+            force_y += pair_y
+            forces[j, 0] += forces_j_x
+            forces[j, 1] += forces_j_y
+
+        forces[i, 0] += force_x
+        forces[i, 1] += force_y
+
+    return forces
+
+@njit(parallel=True, nogil=True)
+def list_forces_parallel(positions, types, neighbor_start, neighbors, periodic, interactions, global_repulsion, max_radius, min_radius,
+                         force_table, table_scale):
+    """
+    Sums the forces acting on every particle from its full list, one particle per iteration across all threads.
+    Every sum is computed in list order by a single thread, so the result does not depend on the thread count.
+    """
+    forces = np.zeros_like(positions)
+    max_radius_squared = max_radius * max_radius
+    tabulated = force_table.shape[0] > 0
+
+    for i in prange(positions.shape[0]):
+        px, py, particle_type = positions[i, 0], positions[i, 1], types[i]
+        force_x, force_y = 0.0, 0.0
+
+        for k in range(neighbor_start[i], neighbor_start[i + 1]):
+            j = neighbors[k]
+            delta_x, delta_y = positions[j, 0] - px, positions[j, 1] - py
+            if periodic:
+                delta_x, delta_y = minimum_image(delta_x), minimum_image(delta_y)
+            distance_squared = delta_x * delta_x + delta_y * delta_y
+            if distance_squared > max_radius_squared:  # Out of interaction range
+                continue
+
+            if tabulated:
+                pair_x, pair_y, _, _ = tabulated_pair_forces(
+                    delta_x, delta_y, distance_squared, particle_type, types[j], force_table, table_scale
+                )
+            else:
+                pair_x, pair_y, _, _ = calculate_pair_forces(
+                    px, py, particle_type, positions[j, 0], positions[j, 1], types[j],
+                    interactions, global_repulsion, max_radius, min_radius, 5.0, periodic
+                )
+            force_x += pair_x
+            force_y += pair_y
+
+        forces[i, 0] = force_x
+        forces[i, 1] = force_y
+
+    return forces
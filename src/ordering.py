@@ -0,0 +1,88 @@
+"""
+Space-filling-curve ordering of the particles.
+The force pass visits the particles cell by cell, reading the positions and types of all particles of the
+neighbouring cells. Right after spawning, or after the particles have moved around for a while, the particles
+of a cell lie scattered across the arrays, so almost every read misses the cache. Sorting the particles along
+a Morton (Z-order) or Hilbert curve over the grid cells stores the particles of a cell next to each other and
+neighbouring cells mostly close by. Particles keep their ids (see ParticleStore.ids) when they are rearranged.
+"""
+import numpy as np
+from numba import njit
+from engine import _cell_coordinate
+
+CURVES = ("morton", "hilbert")  # Available space-filling curves
+
+@njit(nogil=True)
+def morton_key(x, y):
+    """
+    Returns the position of cell (x, y) along the Morton curve by interleaving the bits of both coordinates.
+    """
+    key, bit = 0, 0
+    while x >> bit or y >> bit:
+        key |= ((x >> bit) & 1) << (2 * bit + 1) | ((y >> bit) & 1) << (2 * bit)
+        bit += 1
+    return key
+
+@njit(nogil=True)
+def hilbert_key(x, y, n):
+    """
+    Returns the position of cell (x, y) along the Hilbert curve through an n x n grid, n a power of two.
+    Consecutive positions along the curve are always neighbouring cells.
+    """
+    key = 0
+    s = n // 2
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        key += s * s * ((3 * rx) ^ ry)
+        if ry == 0:  # Rotates the quadrant, so the curve enters and leaves it where the neighbouring quadrants do
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s //= 2
+    return key
+
+@njit(nogil=True)
+def curve_keys(positions, grid_size, periodic, hilbert):
+    """
+    Returns the position along the curve of the cell every particle lies in.
+    """
+    n = 1
+    while n < grid_size:  # The Hilbert curve fills a power of two grid, the cells beyond grid_size stay empty
+        n *= 2
+    keys = np.empty(positions.shape[0], dtype=np.int64)
+    for i in range(positions.shape[0]):
+        x = _cell_coordinate(positions[i, 0], grid_size, periodic)
+        y = _cell_coordinate(positions[i, 1], grid_size, periodic)
+        keys[i] = hilbert_key(x, y, n) if hilbert else morton_key(x, y)
+    return keys
+
+def curve_order(positions, grid_size: int, periodic: bool = False, curve: str = "hilbert"):
+    """
+    Returns the permutation sorting the particles along the curve, see ParticleStore.reorder.
+    The particles of every cell end up next to each other in their previous order.
+    positions (numpy.ndarray): (N, 2) array of particle positions.
+    grid_size (int): Number of cells along each axis, the grid of the force pass keeps every cell contiguous.
+    periodic (bool): Whether positions outside the unit square wrap around.
+    curve (str): "morton" or "hilbert".
+    """
+    if curve not in CURVES:
+        raise ValueError(f"Unknown curve '{curve}', expected one of {CURVES}")
+    keys = curve_keys(positions, grid_size, periodic, curve == "hilbert")
+    return np.argsort(keys, kind="stable")
+
+@njit(nogil=True)
+def disorder(cell_start, cell_count, cell_particles):
+    """
+    Returns how scattered the particles of the cells are across the arrays: the fraction of particles that do not
+    directly follow the previous particle of their cell in memory. 0 right after ordering, close to 1 for random order.
+    Takes the arrays of a binned CellGrid.
+    """
+    scattered, pairs = 0, 0
+    for cell in range(len(cell_start)):
+        start = cell_start[cell]
+        for k in range(start + 1, start + cell_count[cell]):
+            pairs += 1
+            if cell_particles[k] != cell_particles[k - 1] + 1:
+                scattered += 1
+    return scattered / pairs if pairs else 0.0
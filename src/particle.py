@@ -1,8 +1,315 @@
-import random
-import pygame
+import numpy as np
+from numba import njit
+
+NO_TYPE_FACTORS = np.ones(0)  # Passed to the kernels when all types share the global value
+PRECISIONS = {"float64": np.float64, "float32": np.float32}  # Available float types of the particle state
+# Per-particle arrays: shape of a row and dtype, None for the float type of the store
+FIELDS = {"positions": ((2,), None), "velocities": ((2,), None), "types": ((), np.int64), "render_positions": ((2,), None),
+          "ids": ((), np.int64)}
+
+def _field(name: str):
+    """
+    Returns a property exposing the filled part of the buffer of a per-particle field.
+    Assigning an array of the same length overwrites the field, ParticleStore.replace changes the particle count.
+    """
+    def get(self):
+        return self._buffers[name][:self._count]
+
+    def set(self, value):
+        if len(value) != self._count:
+            raise ValueError(f"Expected {self._count} {name}, got {len(value)}, use replace to change the particle count")
+        self._buffers[name][:self._count] = value
+        if name == "ids":  # The particles stay the same, only their order by id changes
+            self._id_order = None
+
+    return property(get, set)
+
+class ParticleStore:
+    """
+    Structure-of-arrays container holding the state of all particles in contiguous numpy arrays.
+    The arrays are views onto buffers with room for more particles, which double their capacity when full,
+    so appending particles takes amortized constant time per particle.
+    positions (numpy.ndarray): (N, 2) array of particle positions in the unit square.
+    velocities (numpy.ndarray): (N, 2) array of particle velocities.
+    types (numpy.ndarray): (N,) array of particle type identifiers.
+    render_positions (numpy.ndarray): (N, 2) array of the positions the particles were last rendered at.
+    ids (numpy.ndarray): (N,) array of particle identifiers, which stay with a particle when the particles are reordered.
+    next_id (int): Identifier the next appended particle gets.
+    size (int): Radius the particles are drawn with.
+    version (int): Incremented whenever particles are added, removed, replaced or reordered, so cached per-particle data can be invalidated.
+    friction (float): Friction coefficient shared by all particles.
+    force_scaling (float): Scaling factor applied to forces acting on the particles.
+    random_movement (float): Magnitude of the random movement of the particles.
+    type_friction (numpy.ndarray): Factor the friction of every particle type is multiplied by, None if all types share it.
+    type_force_scaling (numpy.ndarray): Factor the force scaling of every particle type is multiplied by, None if all types share it.
+    rng (numpy.random.Generator): Generator the random movement is drawn from.
+    dtype (numpy.dtype): Float type of positions and velocities, float32 halves the memory the force pass reads.
+    """
+    def __init__(self, num_particles: int = 0, size: int = 1, friction: float = 0.0, force_scaling: float = 1.0, random_movement: float = 0.0,
+                 rng: np.random.Generator = None, dtype=np.float64):
+        """
+        Initializes a store for the given number of particles with all fields set to zero.
+        Without a generator, the store gets a new unseeded one.
+        """
+        self.dtype = np.dtype(dtype)
+        self._buffers = {name: np.zeros((num_particles, *shape), dtype=field_dtype or self.dtype)
+                         for name, (shape, field_dtype) in FIELDS.items()}
+        self._count = num_particles
+        self._buffers["ids"][:] = np.arange(num_particles)
+        self.next_id = num_particles
+        self._id_order = None  # Version and order of the particles sorted by id
+
+        self.size = size
+        self.version = 0
+        self.friction = friction
+        self.force_scaling = force_scaling
+        self.random_movement = random_movement
+        self.type_friction = None
+        self.type_force_scaling = None
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    @classmethod
+    def from_particles(cls, particles, like=None):
+        """
+        Builds a store from an iterable of Particle objects and rebinds them as views onto the new store.
+        particles: Iterable of Particle objects.
+        like (ParticleStore): Store whose shared parameters are copied (optional, defaults to the first particle's).
+        """
+        particles = list(particles)
+        template = like if like is not None else (particles[0]._store if particles else cls())
+        store = cls(len(particles), template.size, template.friction, template.force_scaling, template.random_movement, template.rng,
+                    template.dtype)
+        store.type_friction, store.type_force_scaling = template.type_friction, template.type_force_scaling
+
+        for index, particle in enumerate(particles):
+            store.positions[index] = particle.position
+            store.velocities[index] = particle.velocity
+            store.types[index] = particle.type
+            store.render_positions[index] = particle.last_render_position
+            particle._store, particle._index = store, index  # The particle now reads and writes the new store
+
+        return store
+
+    positions = _field("positions")
+    velocities = _field("velocities")
+    types = _field("types")
+    render_positions = _field("render_positions")
+    ids = _field("ids")
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        """
+        Number of particles the store holds without reallocating its buffers.
+        """
+        return min(len(buffer) for buffer in self._buffers.values())
+
+    def reserve(self, capacity: int):
+        """
+        Grows the buffers to hold at least `capacity` particles, keeping the current ones.
+        """
+        for name, buffer in self._buffers.items():
+            if len(buffer) < capacity:
+                grown = np.zeros((capacity, *buffer.shape[1:]), dtype=buffer.dtype)
+                grown[:self._count] = buffer[:self._count]
+                self._buffers[name] = grown
+
+    def __getitem__(self, index):
+        """
+        Returns a Particle view onto the particle at the given index.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("particle index out of range")
+        return Particle.view(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Particle.view(self, index)
+
+    def append(self, positions, velocities, types):
+        """
+        Appends new particles to the end of the store.
+        positions: (M, 2) array-like of positions.
+        velocities: (M, 2) array-like of velocities.
+        types: (M,) array-like of particle types.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        start, end = self._count, self._count + len(positions)
+        if end > self.capacity:  # Grows at least by doubling, so every particle is copied a constant number of times on average
+            self.reserve(max(end, 2 * self.capacity))
+
+        buffers = self._buffers
+        buffers["positions"][start:end] = positions
+        buffers["velocities"][start:end] = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+        buffers["types"][start:end] = np.asarray(types, dtype=np.int64).reshape(-1)
+        buffers["render_positions"][start:end] = positions
+        buffers["ids"][start:end] = np.arange(self.next_id, self.next_id + end - start)
+        self.next_id += end - start
+        self._count = end
+        self.version += 1
+
+    def replace(self, positions, types, velocities=None, render_positions=None, ids=None):
+        """
+        Replaces all particles at once. If the particle count is unchanged, the values are copied into the
+        current buffers, otherwise the buffers are reallocated to fit exactly.
+        positions: (N, 2) array-like of positions.
+        types: (N,) array-like of particle types.
+        velocities: (N, 2) array-like of velocities, zero by default.
+        render_positions: (N, 2) array-like of render positions, the positions by default.
+        ids: (N,) array-like of particle ids, numbered from 0 by default.
+        """
+        positions = np.asarray(positions).reshape(-1, 2)
+        count = len(positions)
+        values = {"positions": positions, "velocities": np.zeros((count, 2)) if velocities is None else velocities, "types": types,
+                  "render_positions": positions if render_positions is None else render_positions,
+                  "ids": np.arange(count) if ids is None else ids}
+        buffers = self._buffers
+        if count != self._count:  # If the count changed, new buffers are allocated, otherwise every replay frame would allocate
+            buffers = {name: np.empty((count, *shape), dtype=field_dtype or self.dtype) for name, (shape, field_dtype) in FIELDS.items()}
+        for name, (shape, _) in FIELDS.items():
+            buffers[name][:count] = np.asarray(values[name]).reshape(-1, *shape)
+        self._buffers, self._count = buffers, count
+        self.next_id = int(buffers["ids"][:count].max()) + 1 if count else 0
+        self.version += 1
+
+    def truncate(self, count: int):
+        """
+        Keeps only the first `count` particles. The buffers keep their capacity.
+        """
+        self._count = min(max(count, 0), self._count)
+        self.version += 1
+
+    def swap_remove(self, indices):
+        """
+        Removes the particles at the given indices by moving the last particles into their places,
+        which takes time proportional to the number of removed particles. The order of the remaining particles changes.
+        indices: Array-like of indices of the particles to remove.
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.int64))  # Sorted, every particle removed only once
+        if len(indices) and (indices[0] < 0 or indices[-1] >= self._count):
+            raise IndexError("particle index out of range")
+
+        remaining = self._count - len(indices)
+        holes = indices[indices < remaining]  # Removed particles in the part that stays
+        removed_from_tail = np.zeros(len(indices), dtype=bool)
+        removed_from_tail[indices[indices >= remaining] - remaining] = True
+        fillers = remaining + np.flatnonzero(~removed_from_tail)  # Kept particles behind the part that stays
+
+        for buffer in self._buffers.values():
+            buffer[holes] = buffer[fillers]
+        self._count = remaining
+        self.version += 1
+
+    def clear(self):
+        """
+        Removes all particles while keeping the shared parameters.
+        """
+        self.truncate(0)
+
+    def reorder(self, order):
+        """
+        Rearranges the particles in memory, particle `order[k]` becomes particle k. Their ids move with them.
+        order: Permutation of the particle indices.
+        """
+        order = np.asarray(order, dtype=np.int64)
+        for buffer in self._buffers.values():
+            buffer[:self._count] = buffer[:self._count][order]
+        self.version += 1
+
+    def id_order(self):
+        """
+        Returns the indices that sort the particles by id, so data recorded in this order stays consistent
+        however the particles are rearranged. Cached until the particles change.
+        """
+        if self._id_order is None or self._id_order[0] != self.version:
+            self._id_order = (self.version, np.argsort(self.ids, kind="stable"))
+        return self._id_order[1]
+
+    def index_of(self, ids):
+        """
+        Returns the current indices of the particles with the given ids.
+        """
+        order = self.id_order()
+        return order[np.searchsorted(self.ids[order], ids)]
+
+    def friction_of(self, particle_type: int):
+        """
+        Returns the friction of particles of the given type.
+        """
+        if self.type_friction is None:
+            return self.friction
+        return self.friction * self.type_friction[particle_type]
+
+    def force_scaling_of(self, particle_type: int):
+        """
+        Returns the force scaling of particles of the given type.
+        """
+        if self.type_force_scaling is None:
+            return self.force_scaling
+        return self.force_scaling * self.type_force_scaling[particle_type]
+
+    def integrate(self, dt, time_factor):
+        """
+        Applies friction to all velocities and moves all particles by their velocity and random movement.
+        dt: Time since the last update.
+        time_factor: Scaling factor to adjust the speed of the simulation.
+        """
+        # Reduces velocities based on friction and updates positions based on velocities in one compiled pass
+        integrate_particles(self.positions, self.velocities, self.types, self.friction,
+                            type_factors(self.type_friction), dt * time_factor)
+
+        if self.random_movement:  # If random movement is enabled ...
+            # ... displace every particle by a random offset drawn in one batch
+            self.positions += self.rng.uniform(-self.random_movement, self.random_movement, self.positions.shape) * time_factor
+
+    def apply_forces(self, forces):
+        """
+        Adds the forces, scaled by the force scaling of each particle's type, to the velocities.
+        forces: (N, 2) array of the forces acting on the particles.
+        """
+        apply_scaled_forces(self.velocities, forces, self.types, self.force_scaling, type_factors(self.type_force_scaling))
+
+def type_factors(factors):
+    """
+    Returns per-type factors as the float array the kernels expect.
+    """
+    return NO_TYPE_FACTORS if factors is None else np.asarray(factors, dtype=np.float64)
+
+@njit(nogil=True)
+def integrate_particles(positions, velocities, types, friction, type_friction, step):
+    """
+    Applies friction and moves every particle by its velocity times step.
+    The friction of a particle is friction times the factor of its type, or friction if type_friction is empty.
+    """
+    per_type = len(type_friction) > 0
+    for i in range(len(positions)):
+        particle_friction = friction * type_friction[types[i]] if per_type else friction
+        for axis in range(2):
+            velocities[i, axis] *= 1 - particle_friction
+            positions[i, axis] += velocities[i, axis] * step
+
+@njit(nogil=True)
+def apply_scaled_forces(velocities, forces, types, force_scaling, type_force_scaling):
+    """
+    Adds every force, scaled by force_scaling times the factor of the particle's type, to its velocity.
+    """
+    per_type = len(type_force_scaling) > 0
+    for i in range(len(velocities)):
+        scaling = force_scaling * type_force_scaling[types[i]] if per_type else force_scaling
+        for axis in range(2):
+            velocities[i, axis] += forces[i, axis] * scaling
 
 class Particle:
-    def __init__(self, type: int, size: int, position: tuple, velocity: tuple, friction: float, force_scaling: float, random_movement: float):
+    """
+    Thin view onto a single row of a ParticleStore.
+    A Particle created directly owns a private store of size one, particles obtained from a simulation read
+    and write the simulation's arrays.
+    """
+    def __init__(self, type: int, size: int, position: tuple, velocity: tuple = (0.0, 0.0), friction: float = 0.0, force_scaling: float = 1.0, random_movement: float = 0.0):
         """
         Initializes a particle with given properties.
         type: Identifier for the particle type.
@@ -12,23 +319,97 @@ class Particle:
         friction: Friction coefficient for the particle.
         random_movement: Magnitude of random movement for the particle.
         """
+        self._store = ParticleStore(1, size, friction, force_scaling, random_movement)
+        self._index = 0
+
         self.type = type
-        self.size = size
         self.position = position
         self.velocity = velocity
-        self.friction = friction
-        self.force_scaling = force_scaling          
-        self.random_movement = random_movement
-        self.last_render_position = tuple(position) # Tracks particles last rendered position
+        self.last_render_position = position  # Tracks particles last rendered position
+
+    @classmethod
+    def view(cls, store: ParticleStore, index: int):
+        """
+        Creates a particle that reads and writes row `index` of `store` without copying any data.
+        """
+        particle = cls.__new__(cls)
+        particle._store, particle._index = store, index
+        return particle
+
+    @property
+    def type(self):
+        return int(self._store.types[self._index])
+
+    @type.setter
+    def type(self, value):
+        self._store.types[self._index] = value
+
+    @property
+    def position(self):
+        return self._store.positions[self._index].tolist()
+
+    @position.setter
+    def position(self, value):
+        self._store.positions[self._index] = value
+
+    @property
+    def velocity(self):
+        return self._store.velocities[self._index].tolist()
+
+    @velocity.setter
+    def velocity(self, value):
+        self._store.velocities[self._index] = value
+
+    @property
+    def last_render_position(self):
+        return tuple(self._store.render_positions[self._index].tolist())
+
+    @last_render_position.setter
+    def last_render_position(self, value):
+        self._store.render_positions[self._index] = value
+
+    @property
+    def size(self):
+        return self._store.size
+
+    @size.setter
+    def size(self, value):
+        self._store.size = value
+
+    @property
+    def friction(self):
+        return self._store.friction
+
+    @friction.setter
+    def friction(self, value):
+        self._store.friction = value
+
+    @property
+    def force_scaling(self):
+        return self._store.force_scaling
+
+    @force_scaling.setter
+    def force_scaling(self, value):
+        self._store.force_scaling = value
+
+    @property
+    def random_movement(self):
+        return self._store.random_movement
+
+    @random_movement.setter
+    def random_movement(self, value):
+        self._store.random_movement = value
 
     def apply_force(self, force_x, force_y):
         """
         Applies a force to the particle, adjusting its velocity accordingly.
         force_x: Force applied in the x-direction.
         force_y: Force applied in the y-direction.
-        scaling: Scaling factor to regulate the impact of the force.
         """
-        self.velocity = [self.velocity[0] + force_x*self.force_scaling, self.velocity[1] + force_y*self.force_scaling]
+        velocity = self._store.velocities[self._index]
+        force_scaling = self._store.force_scaling_of(self.type)
+        velocity[0] += force_x * force_scaling
+        velocity[1] += force_y * force_scaling
 
     def update_position(self, dt, time_factor):
         """
@@ -37,19 +418,17 @@ class Particle:
         dt: Time since the last update.
         time_factor: Scaling factor to adjust the speed of the simulation.
         """
-        self.velocity = [self.velocity[0] * (1 - self.friction),  # Reduce velocity in x direction based on friction
-                        self.velocity[1] * (1 - self.friction)]  # Reduce velocity in y direction based on friction
+        velocity = self._store.velocities[self._index]
+        position = self._store.positions[self._index]
+
+        velocity *= 1 - self._store.friction_of(self.type)  # Reduce velocity based on friction
+        position += velocity * dt * time_factor  # Update position based on velocity
 
-        self.position = [self.position[0] + self.velocity[0] * dt * time_factor,  # Update position in x direction
-                        self.position[1] + self.velocity[1] * dt * time_factor]  # Update position in y direction
-        
         # Update position based on random movement
-        if self.random_movement:  # If random movement is enabled...
-            rand_x = random.uniform(-self.random_movement, self.random_movement) * time_factor  # Random velocity in the x-direction
-            rand_y = random.uniform(-self.random_movement, self.random_movement) * time_factor  # Random velocity in the y-direction
-            self.position = [self.position[0] + rand_x, self.position[1] + rand_y]
+        if self._store.random_movement:  # If random movement is enabled...
+            position += self._store.rng.uniform(-self._store.random_movement, self._store.random_movement, 2) * time_factor
 
-    def draw(self, screen, screen_width, screen_height, color, threshold=0.001):  
+    def draw(self, screen, screen_width, screen_height, color, threshold=0.001):
         """
         Draws the particle as a circle on the given Pygame screen.
         screen: Pygame screen to draw on.
@@ -57,16 +436,19 @@ class Particle:
         screen_height: Height of the Pygame screen.
         color: Color of the particle.
         """
-        dx = abs(self.position[0] - self.last_render_position[0])
-        dy = abs(self.position[1] - self.last_render_position[1])
+        position = self.position
+        last_render_position = self.last_render_position
+        dx = abs(position[0] - last_render_position[0])
+        dy = abs(position[1] - last_render_position[1])
 
         # Only updates rendered position if above threshold
         if dx > threshold or dy > threshold:
-            self.last_render_position = self.position
+            self.last_render_position = last_render_position = position
 
         # Conversion to screen coordinates
-        draw_x = round(self.last_render_position[0] * screen_width)
-        draw_y = round(self.last_render_position[1] * screen_height)
+        draw_x = round(last_render_position[0] * screen_width)
+        draw_y = round(last_render_position[1] * screen_height)
 
-        # Draws the particle
+        # Draws the particle, pygame is only imported here so headless runs never load it
+        import pygame
         pygame.draw.circle(screen, color, (draw_x, draw_y), self.size)
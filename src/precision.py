@@ -0,0 +1,100 @@
+"""
+Accuracy report of the float32 precision mode.
+Runs the same simulation, from the same seed, once with float64 and once with float32 particle state and
+compares the trajectories over a fixed number of steps. Particle life is chaotic, so the trajectories drift
+apart after a while however small the rounding errors are; beyond that horizon only the summary metrics
+of the two runs are comparable.
+Usage: python -m src.precision [config.json|config.toml] --steps 300 --seed 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # The modules import each other by name
+
+import numpy as np
+from config import simulation_parameters, load_config, build_simulation
+from interactions import minimum_image
+from sweep import summarize
+
+def deviation(reference, particles, periodic: bool):
+    """
+    Returns the root mean square and the largest distance between the positions of the same particles in two stores.
+    Particles are matched by id, so both stores may be ordered differently.
+    """
+    delta = particles.positions[particles.id_order()].astype(np.float64) - reference.positions[reference.id_order()]
+    if periodic:  # A particle that wrapped around an edge in only one run is still close to itself
+        delta = minimum_image(delta)
+    distance = np.sqrt((delta ** 2).sum(axis=1))
+    return float(np.sqrt(np.mean(distance ** 2))) if len(distance) else 0.0, float(distance.max(initial=0.0))
+
+def accuracy_report(parameters: dict, steps: int = 300, dt: float = 1 / 30, seed: int = 0, every: int = 10):
+    """
+    Runs the parameters with both precisions and compares the float32 trajectory with the float64 one.
+    steps (int): Number of update steps of both runs.
+    dt (float): Fixed time step.
+    seed (int): Seed of both runs, so they start from the same particles and forces.
+    every (int): The positions are compared every `every` steps.
+    Returns a dict with the rms and largest position deviation over time, the first compared step at which the rms
+    deviation exceeds min_radius (None if it never does), the summary metrics, steps per second and
+    bytes of particle state of both runs.
+    """
+    # Writing checkpoints or trajectories is not part of the comparison
+    parameters = {**parameters, "checkpoint": None, "autosave_path": None, "record_path": None}
+    simulations = {precision: build_simulation({**parameters, "precision": precision}, seed=seed)
+                   for precision in ("float64", "float32")}
+    reference, candidate = simulations["float64"], simulations["float32"]
+    periodic = reference.boundaries.periodic
+
+    deviations = []
+    seconds = {precision: 0.0 for precision in simulations}
+    for step in range(steps + 1):
+        if step % every == 0 or step == steps:
+            rms, largest = deviation(reference.particles, candidate.particles, periodic)
+            deviations.append({"step": step, "rms": rms, "max": largest})
+        if step == steps:
+            break
+        for precision, simulation in simulations.items():
+            start = time.perf_counter()
+            simulation.update(dt)
+            if step:  # The first step compiles the kernels for the float type
+                seconds[precision] += time.perf_counter() - start
+
+    min_radius = reference.interaction_matrix.min_radius
+    diverged = [entry["step"] for entry in deviations if entry["rms"] > min_radius]
+    report = {
+        "steps": steps,
+        "dt": dt,
+        "seed": seed,
+        "particles": len(reference.particles),
+        "deviation": deviations,
+        "diverged_at": diverged[0] if diverged else None,
+        "metrics": {precision: summarize(simulation) for precision, simulation in simulations.items()},
+        "steps_per_second": {precision: (steps - 1) / seconds[precision] if seconds[precision] > 0 else float("inf")
+                             for precision in simulations},
+        "state_bytes": {precision: sum(array.nbytes for array in (simulation.particles.positions, simulation.particles.velocities,
+                                                                  simulation.particles.types))
+                        for precision, simulation in simulations.items()}
+    }
+    for simulation in simulations.values():
+        simulation.close()
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare float32 with float64 simulations of the same parameters.")
+    parser.add_argument("config", nargs="?", help="JSON or TOML file overriding the default simulation parameters")
+    parser.add_argument("--steps", type=int, default=300, help="number of fixed time steps")
+    parser.add_argument("--dt", type=float, default=1 / 30, help="time step per update")
+    parser.add_argument("--seed", type=int, default=0, help="seed of both runs")
+    parser.add_argument("--every", type=int, default=10, help="compare the positions every this many steps")
+    args = parser.parse_args(argv)
+
+    parameters = load_config(args.config) if args.config else dict(simulation_parameters)
+    report = accuracy_report(parameters, args.steps, args.dt, args.seed, args.every)
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import time
+from collections import deque
+import numpy as np
+
+class PhaseTimer:
+    """
+    Lightweight timer splitting a repeated piece of work (a frame, an update step) into named phases.
+    Keeps the durations of the last `window` repetitions of every phase for rolling averages and percentiles.
+    window (int): Number of recent durations kept per phase.
+    enabled (bool): Whether laps are recorded. A disabled timer only costs one attribute check per lap.
+    """
+    def __init__(self, window: int = 120, enabled: bool = True):
+        """
+        Initializes a timer without any recorded phases.
+        """
+        self.window = window
+        self.enabled = enabled
+        self.durations = {}  # Phase name -> deque of the most recent durations in seconds
+        self._last = time.perf_counter()
+
+    def start(self):
+        """
+        Marks the beginning of the first phase.
+        """
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        """
+        Records the time since the last start() or lap() as a duration of the given phase.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if phase not in self.durations:
+            self.durations[phase] = deque(maxlen=self.window)
+        self.durations[phase].append(now - self._last)
+        self._last = now
+
+    def reset(self):
+        """
+        Forgets all recorded durations.
+        """
+        self.durations = {}
+
+    def get_stats(self):
+        """
+        Returns a dict mapping every phase to the mean, median, 95th and 99th percentile
+        and the latest of its recent durations in milliseconds.
+        """
+        stats = {}
+        for phase, durations in self.durations.items():
+            milliseconds = np.array(durations) * 1000
+            p50, p95, p99 = np.percentile(milliseconds, (50, 95, 99))
+            stats[phase] = {
+                "mean_ms": float(milliseconds.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "last_ms": float(milliseconds[-1]),
+                "samples": len(milliseconds)
+            }
+        return stats
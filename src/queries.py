@@ -0,0 +1,142 @@
+"""
+Spatial queries over the cell grid of the force pass.
+Finding the particles near a point only visits the cells around it instead of all particles, so picking with
+the mouse, analytics or external tools can look particles up every frame. All queries take a CellGrid binned at
+the given positions (see Simulation.spatial_grid) and return arrays of particle indices.
+"""
+import numpy as np
+from numba import njit
+from engine import _cell_coordinate
+
+INITIAL_ROOM = 64  # Indices a single query expects, more room is allocated if they do not fit
+
+@njit(inline='always')
+def _cell_range(center, reach, grid_size, periodic):
+    """
+    Returns the first and the last cell offset around `center` to visit and whether they wrap around the edges.
+    """
+    if periodic and 2 * reach + 1 >= grid_size:  # If the reach wraps around to the same cells, every cell is visited once
+        return 0, grid_size - 1, False
+    if periodic:
+        return center - reach, center + reach, True
+    return max(center - reach, 0), min(center + reach, grid_size - 1), False
+
+@njit(nogil=True)
+def search_radius(positions, grid_size, periodic, cell_start, cell_count, cell_particles, x, y, radius, found):
+    """
+    Writes the indices of the particles within radius of (x, y) into found, as far as it has room,
+    and returns how many there are. Distances wrap around the edges in a periodic grid.
+    """
+    reach = int(np.ceil(radius * grid_size))
+    first_x, last_x, wrap_x = _cell_range(_cell_coordinate(x, grid_size, periodic), reach, grid_size, periodic)
+    first_y, last_y, wrap_y = _cell_range(_cell_coordinate(y, grid_size, periodic), reach, grid_size, periodic)
+    count = 0
+    for cell_x in range(first_x, last_x + 1):
+        for cell_y in range(first_y, last_y + 1):
+            cell = (cell_x % grid_size if wrap_x else cell_x) * grid_size + (cell_y % grid_size if wrap_y else cell_y)
+            start = cell_start[cell]
+            for k in range(start, start + cell_count[cell]):
+                i = cell_particles[k]
+                dx, dy = positions[i, 0] - x, positions[i, 1] - y
+                if periodic:  # The nearest image of the particle counts
+                    dx -= np.round(dx)
+                    dy -= np.round(dy)
+                if dx * dx + dy * dy <= radius * radius:
+                    if count < len(found):
+                        found[count] = i
+                    count += 1
+    return count
+
+@njit(nogil=True)
+def search_rect(positions, grid_size, cell_start, cell_count, cell_particles, left, top, right, bottom, found):
+    """
+    Writes the indices of the particles with left <= x <= right and top <= y <= bottom into found,
+    as far as it has room, and returns how many there are.
+    """
+    count = 0
+    for cell_x in range(_cell_coordinate(left, grid_size, False), _cell_coordinate(right, grid_size, False) + 1):
+        for cell_y in range(_cell_coordinate(top, grid_size, False), _cell_coordinate(bottom, grid_size, False) + 1):
+            cell = cell_x * grid_size + cell_y
+            start = cell_start[cell]
+            for k in range(start, start + cell_count[cell]):
+                i = cell_particles[k]
+                if left <= positions[i, 0] <= right and top <= positions[i, 1] <= bottom:
+                    if count < len(found):
+                        found[count] = i
+                    count += 1
+    return count
+
+@njit(nogil=True)
+def search_radius_batch(positions, grid_size, periodic, cell_start, cell_count, cell_particles, points, radius):
+    """
+    Runs search_radius for every point. Returns the index of the first result of every point,
+    followed by the total, and the results of all points one after the other.
+    """
+    starts = np.zeros(len(points) + 1, dtype=np.int64)
+    nothing = np.empty(0, dtype=np.int64)
+    for p in range(len(points)):  # Counts first, so the results are written straight to their place
+        starts[p + 1] = starts[p] + search_radius(positions, grid_size, periodic, cell_start, cell_count, cell_particles,
+                                                  points[p, 0], points[p, 1], radius, nothing)
+    found = np.empty(starts[-1], dtype=np.int64)
+    for p in range(len(points)):
+        search_radius(positions, grid_size, periodic, cell_start, cell_count, cell_particles,
+                      points[p, 0], points[p, 1], radius, found[starts[p]:starts[p + 1]])
+    return starts, found
+
+def _collect(search, *arguments):
+    """
+    Runs a search with room for INITIAL_ROOM results and repeats it with enough room if more are found.
+    """
+    found = np.empty(INITIAL_ROOM, dtype=np.int64)
+    count = search(*arguments, found)
+    if count > len(found):
+        found = np.empty(count, dtype=np.int64)
+        search(*arguments, found)
+    return found[:count]
+
+def query_radius(grid, positions, x: float, y: float, radius: float):
+    """
+    Returns the indices of the particles within radius of (x, y).
+    grid (CellGrid): Grid binned at the positions.
+    positions (numpy.ndarray): (N, 2) array of particle positions.
+    """
+    return _collect(search_radius, positions, grid.grid_size, grid.periodic, grid.cell_start, grid.cell_count,
+                    grid.cell_particles, float(x), float(y), float(radius))
+
+def query_rect(grid, positions, left: float, top: float, right: float, bottom: float):
+    """
+    Returns the indices of the particles inside the rectangle, which does not wrap around the edges.
+    """
+    return _collect(search_rect, positions, grid.grid_size, grid.cell_start, grid.cell_count, grid.cell_particles,
+                    float(left), float(top), float(right), float(bottom))
+
+def query_knn(grid, positions, x: float, y: float, k: int):
+    """
+    Returns the indices of the k particles nearest to (x, y), nearest first, fewer if there are not as many.
+    The search radius starts at the distance expected to hold k particles and doubles until it holds at least k,
+    which then are the k nearest ones.
+    """
+    wanted = min(k, len(positions))
+    if wanted <= 0:
+        return np.zeros(0, dtype=np.int64)
+    radius = max(np.sqrt(wanted / (np.pi * len(positions))), 1.0 / grid.grid_size)
+    found = query_radius(grid, positions, x, y, radius)
+    while len(found) < wanted and radius < 4.0:  # Particles never leave the square by more than a few widths of it
+        radius *= 2
+        found = query_radius(grid, positions, x, y, radius)
+
+    delta = positions[found] - (x, y)
+    if grid.periodic:
+        delta -= np.round(delta)
+    order = np.argsort((delta ** 2).sum(axis=1), kind="stable")[:wanted]
+    return found[order]
+
+def query_radius_batch(grid, positions, points, radius: float):
+    """
+    Returns a list with the indices of the particles within radius of every point, in a single compiled call.
+    points: (P, 2) array-like of query points.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    starts, found = search_radius_batch(positions, grid.grid_size, grid.periodic, grid.cell_start, grid.cell_count,
+                                        grid.cell_particles, points, float(radius))
+    return np.split(found, starts[1:-1])
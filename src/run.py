@@ -0,0 +1,94 @@
+"""
+Runs a simulation without a display for a fixed number of steps and reports its throughput.
+Usage: python -m src.run [config.json|config.toml] --steps 1000 --seed 1 --output final.npz
+Never imports pygame, so it starts fast and can run on servers and in parallel batch jobs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # The modules import each other by name
+
+import numpy as np
+from config import simulation_parameters, load_config, build_simulation
+
+def run_headless(simulation, steps: int, dt: float = 1 / 30, pair_samples: int = 10):
+    """
+    Advances the simulation by `steps` fixed time steps as fast as possible.
+    simulation (Simulation): The simulation to run.
+    steps (int): Number of update steps.
+    dt (float): Fixed time step, defaults to one frame of the 30 FPS window.
+    pair_samples (int): Number of states the interacting pairs are counted in, outside the timed steps.
+    Returns a dict with the elapsed seconds, steps per second and interacting pairs per second.
+    Exactly `steps` updates are run. The first one compiles the kernels, so it is excluded from the timing
+    if there are more, and the rates refer to the timed steps.
+    """
+    particles = simulation.particles
+    sample_every = max(steps // max(pair_samples, 1), 1)
+    pair_counts = []
+    seconds = 0.0
+    timed_steps = 0
+
+    for step in range(steps):
+        if step % sample_every == 0:  # Counting pairs costs about as much as a step, so only some are counted
+            pair_counts.append(simulation.cells.count_pairs(particles.positions, simulation.interaction_matrix.max_radius))
+
+        start = time.perf_counter()
+        simulation.update(dt)
+        if step > 0 or steps == 1:  # If there is only one step, it is timed including the compilation
+            seconds += time.perf_counter() - start
+            timed_steps += 1
+
+    mean_pairs = float(np.mean(pair_counts)) if pair_counts else 0.0
+    return {
+        "steps": steps,
+        "timed_steps": timed_steps,
+        "particles": len(particles),
+        "seconds": seconds,
+        "steps_per_second": timed_steps / seconds if seconds > 0 else float("inf"),
+        "mean_pairs": mean_pairs,
+        "pairs_per_second": mean_pairs * timed_steps / seconds if seconds > 0 else float("inf")
+    }
+
+def save_state(simulation, path: str):
+    """
+    Writes the particle state and the interaction matrix to a .npz file.
+    """
+    particles = simulation.particles
+    np.savez(path, positions=particles.positions, velocities=particles.velocities, types=particles.types,
+             interactions=simulation.interaction_matrix.interactions)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the particle life simulation without a display.")
+    parser.add_argument("config", nargs="?", help="JSON or TOML file overriding the default simulation parameters")
+    parser.add_argument("--steps", type=int, default=1000, help="number of fixed time steps")
+    parser.add_argument("--dt", type=float, default=1 / 30, help="time step per update")
+    parser.add_argument("--seed", type=int, default=None, help="seed of all random numbers, overrides the seed of the config")
+    parser.add_argument("--output", help="write the final particle state to this .npz file")
+    parser.add_argument("--report", help="write the throughput report to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    parameters = load_config(args.config) if args.config else dict(simulation_parameters)
+    simulation = build_simulation(parameters, seed=args.seed)
+
+    report = run_headless(simulation, args.steps, args.dt)
+    simulation.close()  # Finishes the trajectory recording and autosave, if enabled
+    report["seed"] = args.seed if args.seed is not None else parameters["seed"]
+    report["parameters"] = parameters
+
+    if args.output:
+        save_state(simulation, args.output)
+        report["output"] = args.output
+
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return report
+
+if __name__ == "__main__":
+    main()
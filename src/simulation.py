@@ -1,135 +1,518 @@
-import random
 import time
+import numba
 import numpy as np
-from particle import Particle
-from interactions import InteractionMatrix, calculate_force
+from particle import ParticleStore, PRECISIONS
+from interactions import InteractionMatrix
+from engine import CellGrid, ENGINES, set_threads
+from neighbor_list import VerletList
+from boundaries import Boundaries
+from domains import DomainDecomposition
+from profiling import PhaseTimer
+from checkpoint import Autosaver, read_checkpoint, write_checkpoint
+from trajectory import open_recorder
+from codec import QUANTIZATION_STEPS
+from spawning import LAYOUTS
+from force_table import ForceTable
+from ordering import CURVES, curve_order, disorder
+from queries import query_radius, query_knn, query_rect, query_radius_batch
+
+NEIGHBOR_SEARCHES = ("cells", "verlet")  # Available ways to find interaction partners
+FORCE_MODELS = ("analytic", "table")  # Calculating every pair force or looking it up in tables (see force_table.py)
 
 class Simulation:
-    def __init__(self, width, height, interaction_matrix: InteractionMatrix, num_particles: int, num_types: int, time_factor: float, force_scaling: float, friction: float, random_movement: float):
+    def __init__(self, width, height, interaction_matrix: InteractionMatrix, num_particles: int, num_types: int, time_factor: float, force_scaling: float, friction: float, random_movement: float,
+                 engine: str = "serial", threads: int = None, workers: int = None, grid_subdivisions: int = 1,
+                 neighbor_search: str = "cells", verlet_skin: float = 0.02,
+                 boundary: str = "reflect", wall_width: float = 0.02, wall_stiffness: float = 0.05,
+                 layout: str = "uniform", force_model: str = "analytic", precision: str = "float64",
+                 reorder: str = None, reorder_interval: int = 100, reorder_threshold: float = None,
+                 rng: np.random.Generator = None):
             self.width, self.height = width, height
             """
             Handles the particle simulation, including particle generation, interaction logic and grid management.
             """
-            # Dynamically partitions simulation area into grid adjusted for screens aspect ratio
-            # Cells count & size scales with particle number (more particles = more & smaller cells)
-            self.grid_size = int((num_particles ** 0.5) * (width / height) ** 0.5)
-            self.cells = {(x, y): [] for x in range(self.grid_size) for y in range(self.grid_size)}
-            
             self.interaction_matrix = interaction_matrix
+
+            # All randomness of the simulation is drawn from this generator, so a seeded one makes runs reproducible
+            self.rng = rng if rng is not None else np.random.default_rng()
+            interaction_matrix.rng = self.rng  # Later randomizations of the forces follow the same generator
+
+            # Selects how particles are kept inside the unit square ("reflect", "clamp", "soft" or "periodic")
+            self.boundaries = Boundaries(boundary, wall_width, wall_stiffness)
+
+            # Partitions simulation area into a grid whose cells follow the interaction radius,
+            # so the neighbouring cells hold exactly the candidates for interaction
+            self.cells = CellGrid(interaction_matrix.max_radius, grid_subdivisions, periodic=self.boundaries.periodic)
+
             self.num_particles = num_particles
             self.num_types = num_types
             self.time_factor = time_factor
 
-            # Stores these values so particle can access the parameters set in main.py
-            self.friction = friction  
-            self.force_scaling = force_scaling 
-            self.random_movement = random_movement
+            # Selects how new particles are placed, see spawning.py
+            if layout not in LAYOUTS:
+                raise ValueError(f"Unknown layout '{layout}', expected one of {tuple(LAYOUTS)}")
+            self.layout = layout
+
+            # Selects the float type of the particle state and the force pass, see precision.py for its effect on accuracy
+            if precision not in PRECISIONS:
+                raise ValueError(f"Unknown precision '{precision}', expected one of {tuple(PRECISIONS)}")
+            self.precision = precision
+
+            # The particle store keeps these values so particles can access the parameters set in main.py
+            self._particles = ParticleStore(0, 1, friction, force_scaling, random_movement, self.rng, PRECISIONS[precision])
+
+            # Selects the force pass implementation ("serial" or "parallel") and its thread count
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+            self.engine = engine
+            self.threads = set_threads(threads) if engine == "parallel" else 1
+
+            # The "domains" engine splits the area into strips updated by `workers` processes, started on the first update
+            self.domains = DomainDecomposition(workers) if engine == "domains" else None
+
+            # Selects how interaction partners are found: a grid search every step ("cells")
+            # or neighbor lists that are only rebuilt after enough movement ("verlet")
+            if neighbor_search not in NEIGHBOR_SEARCHES:
+                raise ValueError(f"Unknown neighbor search '{neighbor_search}', expected one of {NEIGHBOR_SEARCHES}")
+            self.neighbor_search = neighbor_search
+            self.verlet_list = VerletList(verlet_skin)
+
+            # Selects whether pair forces are calculated or looked up in tables rebuilt whenever the matrix changes
+            if force_model not in FORCE_MODELS:
+                raise ValueError(f"Unknown force model '{force_model}', expected one of {FORCE_MODELS}")
+            if force_model == "table" and engine == "domains":
+                raise ValueError("The domains engine only supports the analytic force model")
+            self.force_table = ForceTable(dtype=PRECISIONS[precision]) if force_model == "table" else None
+
+            # Selects the space-filling curve the particles are periodically sorted along for cache locality (None disables it),
+            # every reorder_interval updates and whenever the disorder measured on the grid exceeds reorder_threshold
+            if reorder is not None and reorder not in CURVES:
+                raise ValueError(f"Unknown curve '{reorder}', expected one of {CURVES}")
+            self.reorder = reorder
+            self.reorder_interval = reorder_interval
+            self.reorder_threshold = reorder_threshold
+            self.reorder_count = 0
+            self._updates_since_reorder = 0
+
+            # Measures how long the phases of every update take
+            self.timer = PhaseTimer()
+
+            self._binned = None  # Store and version the grid was last binned at, None once the particles moved since
+
+            self.autosaver = None  # Writes checkpoints in the background once enabled with set_autosave
+            self.recorder = None  # Appends every update to a trajectory file once enabled with set_recorder
 
-            self.particles = self.generate_particles()  # Initialize particles
+            self.generate_particles()  # Initialize particles
 
             self.paused = True
 
+    @property
+    def particles(self):
+        """
+        The ParticleStore holding the state of all particles.
+        """
+        return self._particles
+
+    @particles.setter
+    def particles(self, particles):
+        """
+        Replaces the particles, either by another ParticleStore or by an iterable of Particle objects.
+        """
+        if hasattr(particles, "positions"):  # If a store is given ...
+            self._particles = particles  # ... use it directly, drawing its random movement from this simulation's generator
+            particles.rng = self.rng
+        else:  # Otherwise copy the particles into a new store sharing this simulation's parameters
+            self._particles = ParticleStore.from_particles(particles, like=self._particles)
+
     def generate_particles(self):
         """
-        Generates particles and adds them to the grid.
+        Generates num_particles particles in the simulation's layout, appends them to the particle store and adds them to the grid.
         """
-        particles = np.empty(0, dtype=object)  # Initialize particle array
+        return self.spawn(self.num_particles)
 
-        # Generates number of particles specified in main.py
-        for i in range(self.num_particles):
+    def spawn(self, amount: int, layout: str = None, **options):
+        """
+        Adds `amount` particles at once with random velocities and sorts all particles into the grid.
+        amount (int): Number of particles to add.
+        layout (str): Name of the initial condition in spawning.LAYOUTS, the simulation's layout by default.
+        options: Further arguments of the layout, e.g. the radius of "poisson_disk".
+        Returns the particle store.
+        """
+        start_type = len(self._particles)  # Continue the type sequence of existing particles
+        positions, types = LAYOUTS[layout or self.layout](self.rng, amount, self.num_types, start_type, **options)
 
-            particle = Particle(
-                position=(random.random(), random.random()),  # Random initial position
-                velocity=(1 - random.random() * 2, 1 - random.random() * 2),  # Random initial velocity
-                type=i % self.num_types,  # Random particle type
-                size=1,  
-                friction=self.friction,
-                force_scaling=self.force_scaling,
-                random_movement=self.random_movement
-            )
+        self._particles.append(
+            positions=positions,
+            velocities=1 - self.rng.random((amount, 2)) * 2,  # Random initial velocities
+            types=types
+        )
 
-            particles = np.concatenate((particles, np.array([particle])))
-            # Place particle in grid cell corresponding to initial position
-            self.add_to_grid(particle)
+        # Place particles in grid cells corresponding to initial positions
+        self.rebuild_grid()
 
-        return particles
+        return self._particles
 
-    def add_to_grid(self, particle):
+    def despawn(self, indices):
         """
-        Calculates cell coordinates by scaling position by the grid size and wraps around due to mod if applicable.
+        Removes the particles at the given indices at once, see ParticleStore.swap_remove.
         """
-        grid_x = int(particle.position[0] * self.grid_size) % self.grid_size
-        grid_y = int(particle.position[1] * self.grid_size) % self.grid_size
-
-        # Reashure that its always a numpy array (important for numba)
-        if isinstance(self.cells[(grid_x, grid_y)], list):  # If it's a list ...
-            self.cells[(grid_x, grid_y)] = np.array(self.cells[(grid_x, grid_y)], dtype=object)  # ... convert it to a numpy array
+        self._particles.swap_remove(indices)
+        self.num_particles = len(self._particles)
+        self.rebuild_grid()
 
-        if not isinstance(self.cells[(grid_x, grid_y)], np.ndarray):  # If it's not a numpy array ...
-            self.cells[(grid_x, grid_y)] = np.empty(0, dtype=object)  # ... initialize it
-        
-        # Adds particle to appropriate cell 
-        if self.cells[(grid_x, grid_y)].size == 0:  # If the cell is empty ...
-            self.cells[(grid_x, grid_y)] = np.array([particle], dtype=object)  # ... add the particle
+    def rebuild_grid(self):
+        """
+        Sorts all particles into the grid cells corresponding to their positions.
+        Refits the grid first if the search radius has changed.
+        """
+        self.cells.fit(self.get_search_radius())
+        self.cells.rebuild(self._particles.positions)
+        self._binned = (self._particles, self._particles.version)
 
-        else:  # If the cell is not empty ...
-            self.cells[(grid_x, grid_y)] = np.concatenate((self.cells[(grid_x, grid_y)], np.array([particle])))  # ... add the particle
+    def get_search_radius(self):
+        """
+        Returns the radius the grid is fitted to: max_radius, plus the skin when neighbor lists are used.
+        """
+        if self.neighbor_search == "verlet":
+            return self.interaction_matrix.max_radius + self.verlet_list.skin
+        return self.interaction_matrix.max_radius
 
+    def get_neighbor_stats(self):
+        """
+        Returns the rebuild statistics of the neighbor lists, used to tune the skin.
+        """
+        return self.verlet_list.get_stats()
 
     def update(self, dt):
         """
-        Clears grid for updating particle positions in one step.
-        Updates particle position and adds it to appropriate cell
-        """
- 
-
-        self.cells = {key: [] for key in self.cells}
-
-        for p in self.particles:  # Iterate over the particles
-            p.update_position(dt, self.time_factor)  # Update particle position
-            self.add_to_grid(p)  # Add particle to appropriate cell
-
-        # Iterates through all cells in the grid to calculate particle interactions
-        for (grid_x, grid_y), particles in self.cells.items():
-            for p1 in particles:
-                # Checks interactions within the current cell and its neighboring cells
-                for dx in (-1, 0, 1):  # Iterates over neighboring cells in the x-direction (left, center, right)
-                    for dy in (-1, 0, 1):  # Iterates over neighboring cells in the y-direction (top, center, bottom)
-                        neighbor_cell = (grid_x + dx, grid_y + dy)  # Identifies the neighboring cell
-                        
-                        # Checks if the neighboring cell exists in the grid
-                        if neighbor_cell in self.cells:
-                            for p2 in self.cells[neighbor_cell]:
-                                # Avoids self-interaction (a particle with itself)
-                                if p1 is not p2:
-                                    # Calculates the interaction force between the two particles
-                                    force_x, force_y = calculate_force(
-                                        p1.position[0], p1.position[1], p1.type,
-                                        p2.position[0], p2.position[1], p2.type,
-                                        self.interaction_matrix.interactions,
-                                        self.interaction_matrix.global_repulsion,
-                                        self.interaction_matrix.max_radius,
-                                        self.interaction_matrix.min_radius
-                                    )
-                                    # Applies the calculated force to particle p1
-                                    p1.apply_force(force_x, force_y)
+        Updates particle positions in one step, then bins the particles and accumulates
+        all interaction forces in a single compiled call.
+        With the domains engine the worker processes perform the whole step instead.
+        The duration of every phase is recorded by self.timer.
+        """
+        timer = self.timer
+        timer.start()
+
+        if self.reorder is not None:  # If reordering is enabled, sort the particles along the curve once it is due
+            self._maybe_reorder()
+            timer.lap("reorder")
+
+        self._binned = None  # The particles move, the grid has to be binned again before it is queried
+        if self.domains is not None:  # If the domains engine is selected, the workers perform the whole step
+            self.domains.step(self, dt)
+            timer.lap("domains")
+            self._after_update()
+            return
+
+        particles = self._particles
+        particles.integrate(dt, self.time_factor)  # Update particle positions
+        timer.lap("integrate")
+
+        # Calculates the interaction forces of all particles with their neighbors
+        if self.neighbor_search == "verlet":
+            forces = self.verlet_list.accumulate_forces(self.cells, particles, self.interaction_matrix,
+                                                        parallel=self.engine == "parallel", force_table=self.force_table)
+        else:
+            forces = self.cells.accumulate_forces(particles.positions, particles.types, self.interaction_matrix,
+                                                  parallel=self.engine == "parallel", force_table=self.force_table)
+        timer.lap("forces")  # Includes binning the particles into the grid, which happens in the same compiled call
+        if self.neighbor_search == "cells":  # The boundaries only move particles that left the square back into their edge cells
+            self._binned = (particles, particles.version)
+
+        # Applies the accumulated forces to the particles
+        particles.apply_forces(forces)
+        timer.lap("apply_forces")
 
         self.enforce_boundaries()
+        timer.lap("boundaries")
+
+        self._after_update()
+
+    def _maybe_reorder(self):
+        """
+        Reorders the particles if reorder_interval updates have passed since the last time or they are too scattered.
+        """
+        self._updates_since_reorder += 1
+        due = bool(self.reorder_interval) and self._updates_since_reorder >= self.reorder_interval
+        if not due and self.reorder_threshold is not None:
+            due = self.get_disorder() > self.reorder_threshold
+        if due:
+            self.reorder_particles()
+
+    def get_disorder(self):
+        """
+        Returns how scattered the particles of the grid cells are in memory, see ordering.disorder.
+        Measured on the grid of the last force pass, which the domains engine does not maintain, so it bins the particles first.
+        """
+        if self.domains is not None or len(self.cells.cell_particles) != len(self._particles):
+            self.rebuild_grid()
+        return disorder(self.cells.cell_start, self.cells.cell_count, self.cells.cell_particles)
+
+    def reorder_particles(self, curve: str = None):
+        """
+        Sorts the particles along a space-filling curve over the grid cells, so the particles of a cell are stored
+        next to each other, and rebuilds the grid. The particles keep their ids.
+        curve (str): "morton" or "hilbert", the simulation's curve by default.
+        """
+        self.cells.fit(self.get_search_radius())
+        order = curve_order(self._particles.positions, self.cells.grid_size, self.cells.periodic, curve or self.reorder or "hilbert")
+        self._particles.reorder(order)  # The new version makes the neighbor lists and the domains rebuild
+        self.rebuild_grid()
+        self.reorder_count += 1
+        self._updates_since_reorder = 0
+
+    def spatial_grid(self):
+        """
+        Returns the grid binned at the current positions for spatial queries.
+        The grid of the last force pass is reused, the particles are only binned again if they moved or changed since,
+        e.g. with neighbor lists or the domains engine, which do not bin them every update.
+        """
+        if self._binned != (self._particles, self._particles.version):
+            self.rebuild_grid()
+        return self.cells
+
+    def query_radius(self, x: float, y: float, radius: float):
+        """
+        Returns the indices of the particles within radius of (x, y), wrapped around the edges if they are periodic.
+        """
+        return query_radius(self.spatial_grid(), self._particles.positions, x, y, radius)
+
+    def query_knn(self, x: float, y: float, k: int):
+        """
+        Returns the indices of the k particles nearest to (x, y), nearest first.
+        """
+        return query_knn(self.spatial_grid(), self._particles.positions, x, y, k)
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float):
+        """
+        Returns the indices of the particles inside the rectangle from (left, top) to (right, bottom).
+        """
+        return query_rect(self.spatial_grid(), self._particles.positions, left, top, right, bottom)
+
+    def query_radius_batch(self, points, radius: float):
+        """
+        Returns a list with the indices of the particles within radius of every (P, 2) query point.
+        """
+        return query_radius_batch(self.spatial_grid(), self._particles.positions, points, radius)
+
+    def inspect(self, x: float, y: float, radius: float):
+        """
+        Returns the particle nearest to (x, y) as a dict with its index, id, type, position, velocity and the number of
+        particles within max_radius of it, or None if no particle lies within radius.
+        """
+        nearest = self.query_knn(x, y, 1)
+        particles = self._particles
+        if not len(nearest):
+            return None
+        index = int(nearest[0])
+        position = particles.positions[index]
+        delta = position - (x, y)
+        if self.boundaries.periodic:
+            delta -= np.round(delta)
+        if (delta ** 2).sum() > radius * radius:
+            return None
+        neighbors = self.query_radius(position[0], position[1], self.interaction_matrix.max_radius)
+        return {
+            "index": index,
+            "id": int(particles.ids[index]),
+            "type": int(particles.types[index]),
+            "position": tuple(float(value) for value in position),
+            "velocity": tuple(float(value) for value in particles.velocities[index]),
+            "neighbors": len(neighbors) - 1  # Without the particle itself
+        }
+
+    def _after_update(self):
+        """
+        Records and autosaves the state reached by an update, if enabled.
+        """
+        particles = self._particles
+        if self.recorder is not None:  # If recording is enabled, append the new positions to the trajectory
+            self.recorder.record(particles)
+
+        if self.autosaver is not None:  # If autosave is enabled, snapshot the state once the interval has passed
+            self.autosaver.maybe_save(self)
+
+    def get_perf_stats(self):
+        """
+        Returns the rolling timing statistics of the update phases in milliseconds, see PhaseTimer.get_stats.
+        """
+        return self.timer.get_stats()
+
+    def measure_speedup(self, repeats: int = 10):
+        """
+        Times the force pass of the current particles with the serial and the parallel engine.
+        With neighbor lists, only the force loop over the lists is timed, as in the steps between two rebuilds.
+        Particle states and the rebuild statistics are not changed.
+        repeats (int): Number of force passes timed per engine.
+        Returns a dict with the seconds per pass of both engines, the thread count and the speedup.
+        """
+        particles = self._particles
+        verlet = self.verlet_list
+        counts = (verlet.rebuild_count, verlet.step_count)
+        timings = {}
+
+        def force_pass(parallel: bool):
+            if self.neighbor_search == "verlet":  # The lists built by the untimed first call are reused by the timed ones
+                return verlet.accumulate_forces(self.cells, particles, self.interaction_matrix, parallel, self.force_table)
+            return self.cells.accumulate_forces(particles.positions, particles.types, self.interaction_matrix, parallel, self.force_table)
+
+        # The simulation's own engine goes last, so the lists left behind are the ones its next update uses
+        for parallel in sorted((False, True), key=lambda parallel: parallel == (self.engine == "parallel")):
+            # The first call compiles the kernel, builds the lists for this engine and is not timed
+            force_pass(parallel)
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                force_pass(parallel)
+            timings[parallel] = (time.perf_counter() - start) / repeats
+        verlet.rebuild_count, verlet.step_count = counts
+
+        return {
+            "serial_seconds": timings[False],
+            "parallel_seconds": timings[True],
+            "threads": numba.get_num_threads(),
+            "speedup": timings[False] / timings[True] if timings[True] > 0 else float("inf")
+        }
+
+    def get_state(self):
+        """
+        Returns copies of everything needed to continue the simulation later: a dict of arrays with the particle
+        state, the interaction forces and the random number generator state, and a dict of JSON serializable
+        parameters. Engine, threads and neighbor search are properties of the machine and are not included.
+        """
+        particles = self._particles
+
+        arrays = {
+            "positions": particles.positions.copy(),
+            "velocities": particles.velocities.copy(),
+            "types": particles.types.copy(),
+            "render_positions": particles.render_positions.copy(),
+            "ids": particles.ids.copy(),
+            "interactions": self.interaction_matrix.interactions.copy()
+        }
+        # Per-type factors are only stored if set
+        if particles.type_friction is not None:
+            arrays["type_friction"] = particles.type_friction.copy()
+        if particles.type_force_scaling is not None:
+            arrays["type_force_scaling"] = particles.type_force_scaling.copy()
+        metadata = {
+            "num_types": self.interaction_matrix.number_of_types,
+            "min_radius": self.interaction_matrix.min_radius,
+            "max_radius": self.interaction_matrix.max_radius,
+            "global_repulsion": self.interaction_matrix.global_repulsion,
+            "num_particles": self.num_particles,
+            "time_factor": self.time_factor,
+            "size": particles.size,
+            "friction": particles.friction,
+            "force_scaling": particles.force_scaling,
+            "random_movement": particles.random_movement,
+            "next_id": particles.next_id,
+            "boundary": self.boundaries.mode,
+            "wall_width": self.boundaries.wall_width,
+            "wall_stiffness": self.boundaries.wall_stiffness,
+            "rng": self.rng.bit_generator.state  # Plain ints, which JSON stores exactly
+        }
+        return arrays, metadata
+
+    def set_state(self, arrays: dict, metadata: dict):
+        """
+        Restores a state returned by get_state. The interaction matrix is updated in place,
+        so everything holding a reference to it sees the restored forces.
+        """
+        matrix = self.interaction_matrix
+        matrix.number_of_types = metadata["num_types"]
+        matrix.interactions = np.array(arrays["interactions"], dtype=np.float64)
+        matrix.min_radius, matrix.max_radius = metadata["min_radius"], metadata["max_radius"]
+        matrix.global_repulsion = metadata["global_repulsion"]
+        matrix.mark_changed()  # Force tables of the old matrix must not be reused
+        self.num_types = metadata["num_types"]
+        self.num_particles = metadata["num_particles"]
+        self.time_factor = metadata["time_factor"]
+
+        particles = ParticleStore(0, metadata["size"], metadata["friction"], metadata["force_scaling"], metadata["random_movement"],
+                                  self.rng, PRECISIONS[self.precision])
+        particles.append(arrays["positions"], arrays["velocities"], arrays["types"])
+        particles.render_positions[:] = arrays["render_positions"]
+        if "ids" in arrays:  # Checkpoints written before particles had ids number them in stored order
+            particles.ids[:] = arrays["ids"]
+            particles.next_id = metadata["next_id"]
+        particles.type_friction = np.array(arrays["type_friction"]) if "type_friction" in arrays else None
+        particles.type_force_scaling = np.array(arrays["type_force_scaling"]) if "type_force_scaling" in arrays else None
+        particles.version = self._particles.version + 1  # Cached neighbor lists of the old store must not be reused
+        self._particles = particles
+
+        # Restores the boundaries, the grid has to wrap around the edges exactly if they are periodic
+        self.boundaries = Boundaries(metadata["boundary"], metadata["wall_width"], metadata["wall_stiffness"])
+        self.cells = CellGrid(matrix.max_radius, self.cells.subdivisions, periodic=self.boundaries.periodic)
+        self.verlet_list.invalidate()
+        self.rebuild_grid()
+
+        self.rng.bit_generator.state = metadata["rng"]  # In place, the interaction matrix shares the generator
+
+    def save_checkpoint(self, path: str):
+        """
+        Saves the full simulation state to a .npz file, see get_state.
+        """
+        write_checkpoint(path, *self.get_state())
+
+    def load_checkpoint(self, path: str):
+        """
+        Continues from a checkpoint written by save_checkpoint or the autosave.
+        """
+        self.set_state(*read_checkpoint(path))
+
+    @classmethod
+    def from_checkpoint(cls, path: str, width, height, **options):
+        """
+        Creates a simulation continuing from a checkpoint.
+        options: Engine, threads, grid and neighbor search options passed on to the constructor.
+        The random number generator continues from its saved state, whatever generator is passed in options.
+        """
+        arrays, metadata = read_checkpoint(path)
+        interaction_matrix = InteractionMatrix(metadata["num_types"], metadata["min_radius"],
+                                               metadata["max_radius"], metadata["global_repulsion"])
+        simulation = cls(width, height, interaction_matrix, 0, metadata["num_types"], metadata["time_factor"],
+                         metadata["force_scaling"], metadata["friction"], metadata["random_movement"],
+                         boundary=metadata["boundary"], **options)
+        simulation.set_state(arrays, metadata)
+        return simulation
+
+    def set_autosave(self, path: str = None, interval: float = 60.0):
+        """
+        Enables writing a checkpoint to path every `interval` seconds during update, on a background thread.
+        Passing no path disables the autosave after finishing the write in progress.
+        """
+        if self.autosaver is not None:
+            self.autosaver.close()
+        self.autosaver = Autosaver(path, interval) if path else None
+
+    def set_recorder(self, path: str = None, every: int = 1, quantization_steps: int = QUANTIZATION_STEPS):
+        """
+        Enables recording the positions and types after every `every`-th update, which can be replayed without
+        calculating any forces. Paths ending in .ptz are compressed files (see codec.py) with positions quantized
+        onto `quantization_steps` steps, other paths are directories of memory-mapped files. Passing no path stops the recording.
+        Raises ValueError for a trajectory that is being replayed.
+        """
+        recorder = open_recorder(path, every, quantization_steps) if path else None  # Refuses a replayed path before the current recording ends
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = recorder
+
+    def close(self):
+        """
+        Finishes the trajectory recording and the autosave write in progress and stops the domain workers.
+        """
+        self.set_recorder(None)
+        self.set_autosave(None)
+        if self.domains is not None:
+            self.domains.close()
 
     def enforce_boundaries(self):
         """
         Ensures that particles stay within the defined boundaries of the simulation area (between 0 and 1).
-        If a particle goes out of bounds on either the x or y axis, its position and velocity are adjusted.
+        How positions and velocities of particles out of bounds are adjusted depends on the boundary mode.
         """
-        for p in self.particles:
-            # Check if the particle is outside the boundaries along the x-axis
-            if p.position[0] <= 0 or p.position[0] >= 1:  # If the particle is out of bounds over the x-axis ...
-                p.position[0] = round(p.position[0])  # ... round its position and ...
-                p.velocity[0] = -p.velocity[0]  # ... invert the particle's velocity
-
-            if p.position[1] <= 0 or p.position[1] >= 1:  # If the particle is out of bounds over the y-axis ...
-                p.position[1] = round(p.position[1])  # ... round its position and ...
-                p.velocity[1] = -p.velocity[1]  # ... invert the particle's velocity
+        self.boundaries.apply(self._particles.positions, self._particles.velocities)
 
     def start_simulation(self):
         """
@@ -137,7 +520,7 @@ class Simulation:
         """
         self.paused = False
         if len(self.particles) == 0:  # If there are no particles ...
-            self.particles = self.generate_particles()  # ... generate particles
+            self.generate_particles()  # ... generate particles
 
     def stop_simulation(self):
         """
@@ -147,18 +530,16 @@ class Simulation:
 
     def reset_simulation(self):
         """
-        Clears all particles by setting the particles array to an empty array
+        Clears all particles by emptying the particle store
         """
-        self.particles = np.array([], dtype=object)
+        self._particles.clear()
 
     def add_particles(self, amount=100):
         """
         Adds a specified number of new particles to the simulation.
         amount (int): The number of particles to add (default is 100).
         """
-        self.num_particles = amount  # Set the number of particles to add
-        new_particles = self.generate_particles()  # Generate new particles
-        self.particles = np.concatenate((self.particles, new_particles))  # Add new particles to the existing array
+        self.spawn(amount)  # Generate new particles and append them to the store
         self.num_particles = len(self.particles)  # Update the total particle count
     
     def remove_particles(self, amount=100):
@@ -166,7 +547,7 @@ class Simulation:
         Removes a specified number of particles from the simulation.
         amount (int): The number of particles to remove (default is 100).
         """
-        self.particles = self.particles[:self.num_particles - amount]  # Slice to remove particles
+        self._particles.truncate(len(self._particles) - amount)  # Drop the last particles
         self.num_particles = len(self.particles) if len(self.particles) > 0 else 0  # Update particle count, ensure it's not negative
     
     def adjust_time_factor(self, by_percent: float):
@@ -187,26 +568,47 @@ class Simulation:
         Sets the force scaling factor for all particles.
         force_scaling (float): The force scaling factor to set.
         """
-        for particle in self.particles:
-            particle.force_scaling = force_scaling  # Set force scaling for each particle
+        self._particles.force_scaling = force_scaling  # Shared by all particles in the store
     
     def get_force_scaling(self):
         """
-        Returns the force scaling of the last particle.
+        Returns the force scaling of the particles.
         """
-        return self.particles[-1].force_scaling
+        return self._particles.force_scaling
     
+    def set_type_force_scaling(self, factors=None):
+        """
+        Scales the force scaling of every particle type by its own factor.
+        factors: One factor per particle type, or None to use the same force scaling for all types.
+        """
+        self._particles.type_force_scaling = self._type_factors(factors)
+
+    def get_type_force_scaling(self):
+        """
+        Returns the force scaling factors of the particle types, None if all types share the force scaling.
+        """
+        return self._particles.type_force_scaling
+
+    def _type_factors(self, factors):
+        """
+        Checks that per-type factors match the number of particle types and returns them as an array.
+        """
+        if factors is None:
+            return None
+        factors = np.array(factors, dtype=np.float64)
+        if factors.shape != (self.interaction_matrix.number_of_types,):
+            raise ValueError(f"Expected one factor per particle type ({self.interaction_matrix.number_of_types}), got shape {factors.shape}")
+        return factors
+
     def modify_particle_count(self, by: int):
         """
         Modifies the number of particles by a given amount.
         by (int): The number of particles to add (positive) or remove (negative).
         """
         if by > 0:
-            self.num_types = by  # Set the number of particle types
-            self.particles.extend(self.generate_particles())  # Generate and add new particles
-            self.num_types = len(self.particles)  # Update the number of types to match the total number of particles
+            self.add_particles(by)  # Generate and add new particles
         else:
-            self.particles = self.particles[:len(self.particles) - abs(by)]  # Remove particles by the specified amount
+            self.remove_particles(-by)  # Remove particles by the specified amount
     
     def get_particle_count(self):
         """Returns the current number of particles.
@@ -218,25 +620,36 @@ class Simulation:
         Sets the friction factor for all particles.
         friction (float): Friction value between 0 and 1.
         """
-        for particle in self.particles:
-            particle.friction = friction  # Set friction for each particle
+        self._particles.friction = friction  # Shared by all particles in the store
     
     def get_friction(self):
         """
-        Returns the friction of the first particle.
+        Returns the friction of the particles.
         """
-        return self.particles[0].friction
+        return self._particles.friction
     
+    def set_type_friction(self, factors=None):
+        """
+        Scales the friction of every particle type by its own factor.
+        factors: One factor per particle type, or None to use the same friction for all types.
+        """
+        self._particles.type_friction = self._type_factors(factors)
+
+    def get_type_friction(self):
+        """
+        Returns the friction factors of the particle types, None if all types share the friction.
+        """
+        return self._particles.type_friction
+
     def set_random_movement(self, random_movement: float):
         """
         Sets the random movement factor for all particles.
         random_movement (float): The random movement factor, typically close to 0 or exactly 0.
         """
-        for particle in self.particles:
-            particle.random_movement = random_movement  # Set random movement for each particle
+        self._particles.random_movement = random_movement  # Shared by all particles in the store
     
     def get_random_movement(self):
         """
-        Returns the random movement of the first particle.
+        Returns the random movement of the particles.
         """
-        return self.particles[0].random_movement
+        return self._particles.random_movement
@@ -0,0 +1,209 @@
+"""
+Runs a simulation on its own thread at a fixed step rate, independent of the display frame rate.
+The thread publishes the particles after every step into a double-buffered SnapshotBuffer the renderer draws from,
+and executes the changes requested by the GUI through a command queue between two steps.
+The compiled kernels release the GIL, so the window stays responsive while the forces are calculated.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from particle import ParticleStore
+
+class SnapshotBuffer:
+    """
+    Two particle snapshots: the front one is read by the renderer while the simulation thread fills the back one.
+    Publishing swaps them under a lock, which the renderer holds while drawing, so neither side ever sees
+    a half written snapshot and the simulation only waits for a frame that is being drawn right now.
+    """
+    def __init__(self, size: int = 1):
+        """
+        size (int): Radius the particles are drawn with.
+        """
+        self._slots = [self._empty_slot(size), self._empty_slot(size)]
+        self._front = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _empty_slot(size: int):
+        # previous holds the positions one step earlier, None if they cannot be interpolated from
+        return {"store": ParticleStore(0, size), "current": np.zeros((0, 2)), "previous": None, "version": None,
+                "time": 0.0, "step": 0}
+
+    def publish(self, particles, step: int):
+        """
+        Copies the particles into the back snapshot and makes it the front one.
+        Only called from the simulation thread.
+        particles (ParticleStore): The particles after the step.
+        step (int): Number of steps simulated so far.
+        """
+        front, back = self._slots[self._front], self._slots[1 - self._front]
+        count = len(particles)
+        if len(back["current"]) != count:  # If the particle count changed, the arrays are reallocated
+            back["current"] = np.empty((count, 2))
+            back["store"] = ParticleStore(count, particles.size)
+        np.copyto(back["current"], particles.positions)
+        store = back["store"]
+        store.types[:] = particles.types
+        store.ids[:] = particles.ids
+        store.size = particles.size
+
+        # Particles can only be interpolated between two snapshots of the same particles in the same order
+        if front["version"] == particles.version and len(front["current"]) == count:
+            if back["previous"] is None or len(back["previous"]) != count:
+                back["previous"] = np.empty((count, 2))
+            np.copyto(back["previous"], front["current"])
+        else:
+            back["previous"] = None
+        back["version"], back["time"], back["step"] = particles.version, time.perf_counter(), step
+
+        with self.lock:
+            self._front = 1 - self._front
+
+    @contextmanager
+    def read(self, alpha: float = 1.0):
+        """
+        Holds the front snapshot while it is drawn and yields it as a ParticleStore.
+        alpha (float): Position between the previous step (0) and the latest one (1) the particles are placed at.
+        """
+        with self.lock:
+            slot = self._slots[self._front]
+            store = slot["store"]
+            if slot["previous"] is not None and alpha < 1:
+                # Particles that wrapped around a periodic edge jump to their new position instead of crossing the area
+                delta = slot["current"] - slot["previous"]
+                delta[np.abs(delta) > 0.5] = 0
+                np.add(slot["current"] - delta, delta * max(alpha, 0.0), out=store.positions)
+            else:
+                np.copyto(store.positions, slot["current"])
+            yield store
+
+    @property
+    def published_time(self):
+        """
+        perf_counter time the front snapshot was published at.
+        """
+        return self._slots[self._front]["time"]
+
+class SimulationThread:
+    """
+    Steps a simulation with a fixed time step on a background thread.
+    simulation (Simulation): The simulation to run, only touched by the thread once started.
+    rate (float): Steps per second, each advancing the simulation by dt = 1 / rate.
+    max_catch_up (int): Most steps taken at once after falling behind, the remaining time is dropped
+        so a slow machine runs the simulation slower instead of falling further and further behind.
+    snapshots (SnapshotBuffer): The particles after the latest step, for drawing.
+    steps (int): Number of steps simulated so far.
+    steps_per_second (float): Step rate actually reached over the last second.
+    error (Exception): The error that stopped the thread, None while it runs fine.
+    """
+    def __init__(self, simulation, rate: float = 60.0, max_catch_up: int = 4):
+        """
+        Prepares the thread without starting it.
+        """
+        self.simulation = simulation
+        self.rate = rate
+        self.max_catch_up = max_catch_up
+        self.snapshots = SnapshotBuffer(simulation.particles.size)
+        self.steps = 0
+        self.steps_per_second = 0.0
+        self.perf_stats = {}
+        self.error = None
+        self._commands = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshots.publish(simulation.particles, 0)
+
+    def start(self):
+        """
+        Starts stepping the simulation on the background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the thread after its current step and runs the commands still queued.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._run_commands()
+
+    def submit(self, function, *args):
+        """
+        Queues a call that changes the simulation, executed by the thread before its next step.
+        """
+        self.check()
+        self._commands.put((function, args))
+
+    def interpolation(self):
+        """
+        Returns how far the current time lies between the latest step and the next one, between 0 and 1.
+        Called every frame, so an error of the thread reaches the main loop within a frame.
+        """
+        self.check()
+        return min((time.perf_counter() - self.snapshots.published_time) * self.rate, 1.0)
+
+    def check(self):
+        """
+        Raises a RuntimeError if the thread was stopped by an error in a command or a step.
+        """
+        if self.error is not None:
+            raise RuntimeError(f"The simulation thread stopped: {self.error!r}") from self.error
+
+    def _run_commands(self):
+        while True:
+            try:
+                function, args = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            function(*args)
+
+    def _run(self):
+        """
+        Runs the loop of the thread. An error ends it and is kept in error, to be raised by check on the main thread.
+        """
+        try:
+            self._loop()
+        except Exception as error:
+            self.error = error
+
+    def _loop(self):
+        """
+        Main loop of the thread: runs the queued commands, then as many fixed steps as have become due.
+        """
+        simulation = self.simulation
+        dt = 1.0 / self.rate
+        next_step = time.perf_counter()
+        rate_start, rate_steps = next_step, 0
+
+        while not self._stop.is_set():
+            self._run_commands()
+            now = time.perf_counter()
+
+            if simulation.paused:  # If paused, wait for commands without building up steps to catch up on
+                next_step = now + dt
+                self.snapshots.publish(simulation.particles, self.steps)  # Shows changes made while paused
+                self._stop.wait(dt)
+                continue
+
+            if now < next_step:  # If the next step is not due yet, wait for it
+                self._stop.wait(next_step - now)
+                continue
+
+            due = min(int((now - next_step) / dt) + 1, self.max_catch_up)
+            for _ in range(due):
+                simulation.update(dt)
+                self.steps += 1
+            next_step = max(next_step + due * dt, now)  # Time that could not be caught up with is dropped
+            self.snapshots.publish(simulation.particles, self.steps)
+
+            rate_steps += due
+            if now - rate_start >= 1.0:  # Refreshes the statistics once a second
+                self.steps_per_second = rate_steps / (now - rate_start)
+                self.perf_stats = simulation.get_perf_stats()
+                rate_start, rate_steps = now, 0
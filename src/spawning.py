@@ -0,0 +1,85 @@
+"""
+Vectorized initial conditions for spawning many particles at once.
+Every layout takes the generator to draw from, the number of particles, the number of types and the type
+the round-robin type sequence starts with, and returns the (amount, 2) positions in the unit square and
+the (amount,) types of the new particles.
+"""
+import numpy as np
+from numba import njit
+
+def uniform(rng: np.random.Generator, amount: int, num_types: int, start_type: int = 0):
+    """
+    Spreads the particles uniformly over the square, with the types in turn.
+    """
+    positions = rng.random((amount, 2))
+    return positions, (np.arange(amount) + start_type) % num_types
+
+def regions(rng: np.random.Generator, amount: int, num_types: int, start_type: int = 0):
+    """
+    Places every type uniformly in its own vertical strip of the square, type 0 on the left.
+    """
+    types = (np.arange(amount) + start_type) % num_types
+    positions = rng.random((amount, 2))
+    positions[:, 0] = (types + positions[:, 0]) / num_types
+    return positions, types
+
+def rings(rng: np.random.Generator, amount: int, num_types: int, start_type: int = 0, width: float = 0.02):
+    """
+    Places every type on its own ring around the center, type 0 on the innermost one.
+    width (float): Standard deviation of the distance of the particles to the center line of their ring.
+    """
+    types = (np.arange(amount) + start_type) % num_types
+    angles = rng.uniform(0, 2 * np.pi, amount)
+    radii = (types + 1) / (num_types + 1) * 0.45 + rng.normal(0, width, amount)
+    positions = 0.5 + radii[:, None] * np.column_stack((np.cos(angles), np.sin(angles)))
+    return np.clip(positions, 0.0, 1.0), types
+
+def poisson_disk(rng: np.random.Generator, amount: int, num_types: int, start_type: int = 0, radius: float = None):
+    """
+    Spreads the particles uniformly, but no two of them closer than radius, so they start without clumps.
+    Uniform candidates are accepted in order if they keep the distance to all accepted ones (dart throwing).
+    radius (float): Minimum distance between two particles, by default about 70% of the largest
+        distance dart throwing reaches for this many particles.
+    """
+    if radius is None:
+        radius = 0.6 / np.sqrt(max(amount, 1))  # Dart throwing jams when the disks cover about 55% of the square
+    positions = np.empty((amount, 2))
+    accepted = 0
+    for _ in range(20):  # Draws batches of candidates until enough are accepted
+        candidates = rng.random((4 * amount, 2))
+        accepted = accept_distant(candidates, positions, accepted, radius)
+        if accepted == amount:
+            return positions, (np.arange(amount) + start_type) % num_types
+    raise ValueError(f"Only {accepted} of {amount} particles fit with a distance of {radius}")
+
+@njit(nogil=True)
+def accept_distant(candidates, positions, accepted, radius):
+    """
+    Appends the candidates farther than radius from every accepted position to positions,
+    until positions is full. Returns the number of accepted positions.
+    The accepted positions are binned into a grid of cells smaller than radius / sqrt(2),
+    so a cell holds at most one and only the 5 x 5 cells around a candidate have to be checked.
+    """
+    grid_size = int(np.sqrt(2) / radius) + 1
+    cells = np.full((grid_size, grid_size), -1, dtype=np.int64)
+    for i in range(accepted):
+        cells[int(positions[i, 0] * grid_size), int(positions[i, 1] * grid_size)] = i
+
+    for c in range(len(candidates)):
+        if accepted == len(positions):
+            break
+        x, y = candidates[c, 0], candidates[c, 1]
+        cell_x, cell_y = int(x * grid_size), int(y * grid_size)
+        distant = True
+        for neighbor_x in range(max(cell_x - 2, 0), min(cell_x + 3, grid_size)):
+            for neighbor_y in range(max(cell_y - 2, 0), min(cell_y + 3, grid_size)):
+                j = cells[neighbor_x, neighbor_y]
+                if j >= 0 and (positions[j, 0] - x) ** 2 + (positions[j, 1] - y) ** 2 < radius * radius:
+                    distant = False
+        if distant:
+            positions[accepted, 0], positions[accepted, 1] = x, y
+            cells[cell_x, cell_y] = accepted
+            accepted += 1
+    return accepted
+
+LAYOUTS = {"uniform": uniform, "regions": regions, "rings": rings, "poisson_disk": poisson_disk}
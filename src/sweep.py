@@ -0,0 +1,176 @@
+"""
+Runs headless simulations over a grid or random sample of parameters and seeds on a process pool.
+Usage: python -m src.sweep sweep.json --output results.jsonl [--workers N]
+
+The sweep file is a JSON object with these keys, all optional:
+    "base": parameters shared by all runs, overriding simulation_parameters.
+    "grid": parameter -> list of values, every combination is run.
+    "random": {"samples": n, "ranges": {parameter: [low, high]}} draws n uniform samples, combined with every grid point.
+    "sample_seed": seed of the random samples (default 0), so the sweep expands the same way every time.
+    "seeds": list of seeds, or a number n for seeds 0 to n - 1 (default 1), each seed draws another interaction matrix.
+    "steps": update steps per run (default 500).
+Every finished run is appended as one JSON line to the output file as soon as it finishes.
+Runs already in the output file are skipped, so an interrupted sweep continues where it stopped.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # The modules import each other by name
+
+import numpy as np
+from config import simulation_parameters, build_simulation
+from run import run_headless
+
+def expand_jobs(spec: dict):
+    """
+    Expands a sweep description into the list of runs.
+    Every run is a dict with a stable id, its complete parameters, the seed and the number of steps.
+    """
+    base = {**simulation_parameters, "engine": "serial", **spec.get("base", {})}  # The pool provides the parallelism
+    grid = spec.get("grid", {})
+    names = list(grid)
+    grid_points = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+    random_spec = spec.get("random")
+    if random_spec:  # If random samples are requested, combine every one with every grid point
+        rng = np.random.default_rng(spec.get("sample_seed", 0))
+        ranges = random_spec["ranges"]
+        samples = [{name: float(rng.uniform(*ranges[name])) for name in ranges} for _ in range(random_spec["samples"])]
+        grid_points = [{**point, **sample} for point in grid_points for sample in samples]
+
+    seeds = spec.get("seeds", 1)
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+
+    unknown = set(base) - set(simulation_parameters)
+    for point in grid_points:
+        unknown |= set(point) - set(simulation_parameters)
+    if unknown:  # If the sweep contains misspelled or unsupported parameters
+        raise ValueError(f"Unknown simulation parameters: {', '.join(sorted(unknown))}")
+
+    jobs = []
+    for point in grid_points:
+        for seed in seeds:
+            parameters = {**base, **point}
+            key = json.dumps([parameters, seed, spec.get("steps", 500)], sort_keys=True)
+            jobs.append({
+                "id": hashlib.sha1(key.encode()).hexdigest()[:16],
+                "parameters": parameters,
+                "seed": seed,
+                "steps": spec.get("steps", 500)
+            })
+    return jobs
+
+def summarize(simulation):
+    """
+    Returns summary metrics describing the state a simulation ended in:
+    mean_speed: mean particle speed.
+    neighbors: mean number of particles within max_radius of a particle.
+    clustering: coefficient of variation of the particle counts on a 16 x 16 grid, 0 for evenly spread particles.
+    """
+    particles = simulation.particles
+    if not len(particles):
+        return {"mean_speed": 0.0, "neighbors": 0.0, "clustering": 0.0}
+
+    pairs = simulation.cells.count_pairs(particles.positions, simulation.interaction_matrix.max_radius)
+    counts, _, _ = np.histogram2d(particles.positions[:, 0], particles.positions[:, 1], bins=16, range=((0, 1), (0, 1)))
+    return {
+        "mean_speed": float(np.linalg.norm(particles.velocities, axis=1).mean()),
+        "neighbors": 2 * pairs / len(particles),
+        "clustering": float(counts.std() / counts.mean())
+    }
+
+def run_job(job: dict):
+    """
+    Runs a single job of expand_jobs and returns it extended by its metrics and interaction matrix.
+    Executed in the worker processes.
+    """
+    simulation = build_simulation(job["parameters"], seed=job["seed"])
+    start = time.perf_counter()
+    report = run_headless(simulation, job["steps"], pair_samples=1)
+    simulation.close()
+
+    return {
+        **job,
+        "metrics": {**summarize(simulation), "steps_per_second": report["steps_per_second"]},
+        "interactions": simulation.interaction_matrix.interactions.tolist(),
+        "seconds": time.perf_counter() - start
+    }
+
+def finished_ids(path: str):
+    """
+    Returns the ids of the runs already written to an output file.
+    """
+    if not os.path.exists(path):
+        return set()
+    ids = set()
+    with open(path) as file:
+        for line in file:
+            try:
+                ids.add(json.loads(line)["id"])
+            except (ValueError, KeyError):  # A line cut off by an interruption is run again
+                continue
+    return ids
+
+def run_sweep(spec: dict, output: str, workers: int = None, progress=print):
+    """
+    Runs all jobs of a sweep that are not yet in the output file and appends their results as they finish.
+    workers (int): Number of worker processes, defaults to the number of cores. 0 runs the jobs in this process.
+    progress (callable): Called with a status line after every finished job.
+    Returns the number of jobs run.
+    """
+    jobs = expand_jobs(spec)
+    done = finished_ids(output)
+    pending = [job for job in jobs if job["id"] not in done]
+    progress(f"{len(jobs)} runs, {len(jobs) - len(pending)} already finished, {len(pending)} to go")
+
+    def results():
+        if workers == 0:  # Runs in this process, e.g. for debugging
+            for job in pending:
+                yield run_job(job)
+            return
+        # Spawned instead of forked workers, forking a process with running numba or autosave threads can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_job, job) for job in pending]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            except BaseException:  # If interrupted, drop the queued jobs, the finished ones are already saved
+                for future in futures:
+                    future.cancel()
+                raise
+
+    with open(output, "a+") as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell():  # If the last line was cut off by an interruption, the next result starts on a new line
+            file.seek(file.tell() - 1)
+            if file.read(1) != "\n":
+                file.write("\n")
+
+        for count, result in enumerate(results(), 1):
+            file.write(json.dumps(result) + "\n")
+            file.flush()  # Every finished run survives an interruption
+            metrics = ", ".join(f"{name} {value:.4g}" for name, value in result["metrics"].items())
+            progress(f"[{count}/{len(pending)}] {result['id']} seed {result['seed']}: {metrics}")
+
+    return len(pending)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of headless simulations on a process pool.")
+    parser.add_argument("sweep", help="JSON file describing the sweep")
+    parser.add_argument("--output", required=True, help="JSON lines file the results are appended to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores, 0: no pool)")
+    args = parser.parse_args(argv)
+
+    with open(args.sweep) as file:
+        spec = json.load(file)
+    return run_sweep(spec, args.output, args.workers)
+
+if __name__ == "__main__":
+    main()
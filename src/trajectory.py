@@ -0,0 +1,238 @@
+import json
+import os
+import numpy as np
+from codec import QUANTIZATION_STEPS, CompressedRecorder, CompressedTrajectoryReader
+
+TRAJECTORY_VERSION = 1  # Incremented whenever the file layout changes incompatibly
+CHUNK_BYTES = 64 * 1024 * 1024  # Files grow by at least this much, so remapping is rare
+_replaying = set()  # Real paths of the trajectories open in a ReplayPlayer, which no recorder may overwrite
+
+class _GrowableMap:
+    """
+    A one dimensional memory-mapped array backed by a file that grows in chunks as data is appended.
+    """
+    def __init__(self, path: str, dtype):
+        """
+        Creates an empty file at path.
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.size = 0  # Number of elements written
+        self.capacity = 0  # Number of elements the file currently holds
+        self.array = None
+        open(path, "wb").close()
+
+    def append(self, values):
+        """
+        Appends values, growing the file and remapping it if it is full.
+        Returns the offset the values were written at.
+        """
+        values = np.asarray(values, dtype=self.dtype).reshape(-1)
+        if self.size + len(values) > self.capacity:
+            # Grows at least by doubling, so the number of remaps stays logarithmic in the file size
+            minimum = max(CHUNK_BYTES // self.dtype.itemsize, 1)
+            self._resize(max(self.size + len(values), 2 * self.capacity, minimum))
+
+        offset = self.size
+        self.array[offset:offset + len(values)] = values
+        self.size += len(values)
+        return offset
+
+    def _resize(self, capacity: int):
+        """
+        Changes the file size to hold `capacity` elements and maps it again.
+        """
+        if self.array is not None:
+            self.array.flush()
+            self.array = None  # Releases the old mapping before the file changes size
+        with open(self.path, "r+b") as file:
+            file.truncate(capacity * self.dtype.itemsize)
+        self.capacity = capacity
+        if capacity:
+            self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(capacity,))
+
+    def flush(self):
+        if self.array is not None:
+            self.array.flush()
+
+    def close(self):
+        """
+        Flushes the data and trims the file to the written elements.
+        """
+        self._resize(self.size)
+
+class TrajectoryRecorder:
+    """
+    Records particle positions and types frame by frame into memory-mapped files in a directory.
+    Positions are stored as float32 and types as int16 to halve the size, every frame may hold
+    a different number of particles.
+    path (str): Directory the trajectory is written to, created if needed.
+    every (int): Only every `every`-th recorded update is stored.
+    """
+    def __init__(self, path: str, every: int = 1):
+        """
+        Creates an empty trajectory at path, replacing an existing one.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.every = max(int(every), 1)
+        self.updates = 0
+        self.positions = _GrowableMap(os.path.join(path, "positions.f32"), np.float32)
+        self.types = _GrowableMap(os.path.join(path, "types.i16"), np.int16)
+        self.frame_start = _GrowableMap(os.path.join(path, "frames.i64"), np.int64)  # First particle of every frame
+        self.num_types = 0
+        self._write_header()
+
+    @property
+    def frame_count(self):
+        return self.frame_start.size
+
+    def record(self, particles):
+        """
+        Appends the current particle positions and types as a new frame, if it is one of the recorded updates.
+        particles (ParticleStore): The particles to record.
+        """
+        self.updates += 1
+        if (self.updates - 1) % self.every:
+            return
+        order = particles.id_order()  # Every particle keeps its place in the frames however the store rearranges them
+        self.frame_start.append(self.types.append(particles.types[order]))
+        self.positions.append(particles.positions[order])
+        if len(particles.types):
+            self.num_types = max(self.num_types, int(particles.types.max()) + 1)
+
+        if self.frame_count % 100 == 0:  # Keeps the header reasonably current, so a crashed run stays readable
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all recorded frames to disk and updates the header.
+        """
+        for array in (self.positions, self.types, self.frame_start):
+            array.flush()
+        self._write_header()
+
+    def close(self):
+        """
+        Finishes the trajectory, trimming the files to the recorded frames.
+        """
+        for array in (self.positions, self.types, self.frame_start):
+            array.close()
+        self._write_header()
+
+    def _write_header(self):
+        header = {"version": TRAJECTORY_VERSION, "frames": self.frame_count, "particles": self.types.size,
+                  "every": self.every, "num_types": self.num_types}
+        with open(os.path.join(self.path, "header.json"), "w") as file:
+            json.dump(header, file)
+
+class TrajectoryReader:
+    """
+    Reads a trajectory written by TrajectoryRecorder through memory maps, so frames are only loaded
+    from disk when they are accessed and any frame can be reached without reading the ones before it.
+    path (str): Directory of the trajectory.
+    """
+    def __init__(self, path: str):
+        """
+        Maps the files of the trajectory at path.
+        """
+        with open(os.path.join(path, "header.json")) as file:
+            self.header = json.load(file)
+        if self.header.get("version") != TRAJECTORY_VERSION:
+            raise ValueError(f"Unsupported trajectory version {self.header.get('version')}, expected {TRAJECTORY_VERSION}")
+
+        frames, particles = self.header["frames"], self.header["particles"]
+        self.path = path
+        self.num_types = self.header["num_types"]
+        self.frame_start = np.append(self._map("frames.i64", np.int64, frames), particles)
+        self.types = self._map("types.i16", np.int16, particles)
+        self.positions = self._map("positions.f32", np.float32, 2 * particles).reshape(-1, 2)
+
+    def _map(self, name: str, dtype, count: int):
+        if count == 0:  # Empty files cannot be mapped
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=(count,))
+
+    def __len__(self):
+        return len(self.frame_start) - 1
+
+    def frame(self, index: int):
+        """
+        Returns the (N, 2) positions and (N,) types of frame `index` as read-only views.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        start, end = self.frame_start[index], self.frame_start[index + 1]
+        return self.positions[start:end], self.types[start:end]
+
+def open_recorder(path: str, every: int = 1, quantization_steps: int = QUANTIZATION_STEPS):
+    """
+    Returns a recorder for path: a compressed trajectory file if path ends in .ptz, memory-mapped files otherwise.
+    quantization_steps (int): Quantization of the compressed positions, memory-mapped files store them exactly.
+    Raises ValueError if the trajectory at path is being replayed, recording would replace it.
+    """
+    if os.path.realpath(path) in _replaying:
+        raise ValueError(f"Cannot record to '{path}', it is being replayed")
+    if path.endswith(".ptz"):
+        return CompressedRecorder(path, every, quantization_steps=quantization_steps)
+    return TrajectoryRecorder(path, every)
+
+def open_trajectory(path: str):
+    """
+    Returns a reader for a trajectory recorded by either recorder.
+    """
+    if os.path.isdir(path):
+        return TrajectoryReader(path)
+    return CompressedTrajectoryReader(path)
+
+class ReplayPlayer:
+    """
+    Plays a recorded trajectory at any speed, forwards or backwards, with seeking.
+    Only frames are read and drawn, no forces are calculated.
+    reader (TrajectoryReader): The trajectory to play.
+    position (float): Current frame, fractional so slow speeds advance over several calls.
+    speed (float): Recorded frames advanced per call of advance, negative values play backwards.
+    paused (bool): Whether the playback is paused, it starts paused.
+    """
+    def __init__(self, reader: TrajectoryReader, store):
+        """
+        reader (TrajectoryReader): The trajectory to play.
+        store (ParticleStore): Store that is filled with the current frame for drawing.
+        """
+        self.reader = reader
+        self.store = store
+        self.position = 0.0
+        self.speed = 1.0
+        self.paused = True
+        _replaying.add(os.path.realpath(reader.path))
+        self.seek(0)
+
+    def close(self):
+        """
+        Ends the replay, after which the trajectory may be recorded to again.
+        """
+        _replaying.discard(os.path.realpath(self.reader.path))
+
+    @property
+    def frame_index(self):
+        return int(self.position)
+
+    def seek(self, frame: float):
+        """
+        Jumps to the given frame, clamped to the recorded range, and loads it into the store.
+        """
+        self.position = min(max(float(frame), 0.0), max(len(self.reader) - 1, 0))
+        self._load()
+
+    def advance(self):
+        """
+        Moves on by `speed` frames and loads the frame reached.
+        """
+        self.seek(self.position + self.speed)
+
+    def _load(self):
+        if not len(self.reader):
+            return
+        positions, types = self.reader.frame(self.frame_index)
+        # Replayed frames are drawn exactly where they were recorded, in id order, without velocities
+        self.store.replace(positions, types)
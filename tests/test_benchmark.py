@@ -0,0 +1,31 @@
+import unittest
+import sys
+sys.path.insert(0, 'src')
+from benchmarks.benchmark import benchmark_cases, compare, run_case
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_cases(self):
+        # every particle count, type count and radius regime is covered, names are unique
+        names = [case["name"] for case in benchmark_cases()]
+        self.assertEqual(len(names), len(set(names)))
+        for name in ("update-n100000-t5-short", "update-n10000-t64-default", "draw-n100000"):
+            self.assertIn(name, names)
+        self.assertFalse(any("n100000" in case["name"] for case in benchmark_cases(max_particles=10_000)))
+
+    def test_run_case(self):
+        # a tiny update and draw case are timed at least the requested number of times
+        for kind in ("update", "draw"):
+            result = run_case({"name": kind, "kind": kind, "n_particles": 100, "n_types": 5}, repeats=2, min_seconds=0)
+            self.assertGreaterEqual(result["calls"], 2)
+            self.assertGreater(result["median"], 0)
+
+    def test_compare(self):
+        # slowdowns beyond the tolerance are flagged, cases missing in the baseline are skipped
+        baseline = {"cases": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+        results = {"cases": {"a": {"median": 1.1}, "b": {"median": 1.5}, "c": {"median": 1.0}}}
+        flags = {name: regressed for name, _, _, _, regressed in compare(results, baseline, tolerance=0.2)}
+        self.assertEqual(flags, {"a": False, "b": True})
+
+if __name__ == "__main__":
+    unittest.main()
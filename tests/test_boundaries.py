@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.boundaries import Boundaries
+
+class TestBoundaries(unittest.TestCase):
+
+    def setUp(self):
+        # one particle inside, one past the lower and one past the upper edge
+        self.positions = np.array([[0.5, 0.5], [-0.1, 0.5], [0.5, 1.2]])
+        self.velocities = np.array([[0.1, 0.1], [-0.2, 0.1], [0.1, 0.3]])
+
+    def test_reflect(self):
+        # particles out of bounds are put onto the edge and bounce back
+        Boundaries("reflect").apply(self.positions, self.velocities)
+        np.testing.assert_array_equal(self.positions, [[0.5, 0.5], [0.0, 0.5], [0.5, 1.0]])
+        np.testing.assert_array_equal(self.velocities, [[0.1, 0.1], [0.2, 0.1], [0.1, -0.3]])
+
+    def test_clamp(self):
+        # particles stop at the edge, only the outward velocity is removed
+        Boundaries("clamp").apply(self.positions, self.velocities)
+        np.testing.assert_array_equal(self.positions, [[0.5, 0.5], [0.0, 0.5], [0.5, 1.0]])
+        np.testing.assert_array_equal(self.velocities, [[0.1, 0.1], [0.0, 0.1], [0.1, 0.0]])
+
+    def test_soft_wall(self):
+        # the wall only pushes particles within its width, the deeper the harder
+        positions = np.array([[0.5, 0.5], [0.01, 0.5], [0.5, 0.995]])
+        velocities = np.zeros((3, 2))
+        Boundaries("soft", wall_width=0.02, wall_stiffness=0.1).apply(positions, velocities)
+        np.testing.assert_allclose(velocities, [[0.0, 0.0], [0.05, 0.0], [0.0, -0.075]])
+
+    def test_periodic(self):
+        # particles leaving on one side re-enter on the other with unchanged velocity
+        velocities = self.velocities.copy()
+        boundaries = Boundaries("periodic")
+        boundaries.apply(self.positions, self.velocities)
+        self.assertTrue(boundaries.periodic)
+        np.testing.assert_allclose(self.positions, [[0.5, 0.5], [0.9, 0.5], [0.5, 0.2]])
+        np.testing.assert_array_equal(self.velocities, velocities)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Boundaries("sticky")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, 'src')
+from src.checkpoint import Autosaver, read_checkpoint, write_checkpoint
+from src.interactions import InteractionMatrix
+from src.simulation import Simulation
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        # a small simulation with random movement, so the random number generator state matters
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.npz")
+        self.interaction_matrix = InteractionMatrix(num_types=4, min_radius=0.01, max_radius=0.1, global_repulsion=0.004)
+        self.simulation = Simulation(1000, 1000, self.interaction_matrix, 300, 4, 0.1, 0.2, 0.5, 0.01, boundary="periodic")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_is_exact(self):
+        # continuing from a checkpoint gives exactly the same trajectory as never stopping
+        self.simulation.update(0.1)
+        self.simulation.save_checkpoint(self.path)
+        for _ in range(3):
+            self.simulation.update(0.1)
+
+        resumed = Simulation.from_checkpoint(self.path, 1000, 1000)
+        for _ in range(3):
+            resumed.update(0.1)
+        np.testing.assert_array_equal(resumed.particles.positions, self.simulation.particles.positions)
+        np.testing.assert_array_equal(resumed.interaction_matrix.interactions, self.interaction_matrix.interactions)
+        self.assertTrue(resumed.cells.periodic)
+
+    def test_load_in_place(self):
+        # loading into a running simulation restores particles and forces in the shared interaction matrix
+        self.simulation.save_checkpoint(self.path)
+        expected = self.simulation.particles.positions.copy()
+        interactions = self.interaction_matrix.interactions.copy()
+        self.simulation.reset_simulation()
+        self.interaction_matrix.randomize_fields()
+
+        self.simulation.load_checkpoint(self.path)
+        np.testing.assert_array_equal(self.simulation.particles.positions, expected)
+        np.testing.assert_array_equal(self.interaction_matrix.interactions, interactions)
+
+    def test_version_check(self):
+        # files of another format version are rejected
+        write_checkpoint(self.path, {"positions": np.zeros((1, 2))}, {"version": 0})
+        arrays, metadata = read_checkpoint(self.path)
+        self.assertEqual(metadata["version"], 2)  # write_checkpoint always stamps the current version
+
+        np.savez(self.path, metadata=np.array('{"version": 99}'))
+        with self.assertRaises(ValueError):
+            read_checkpoint(self.path)
+
+    def test_autosave(self):
+        # the autosave writes in the background once the interval has passed
+        self.simulation.set_autosave(self.path, interval=0)
+        self.simulation.update(0.1)
+        self.simulation.autosaver.wait()
+        arrays, _ = read_checkpoint(self.path)
+        np.testing.assert_array_equal(arrays["positions"], self.simulation.particles.positions)
+
+        autosaver = Autosaver(self.path, interval=3600)
+        self.assertFalse(autosaver.maybe_save(self.simulation))
+        autosaver.close()
+        self.simulation.set_autosave(None)
+        self.assertIsNone(self.simulation.autosaver)
+
+if __name__ == "__main__":
+    unittest.main()
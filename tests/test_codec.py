@@ -0,0 +1,104 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, 'src')
+from src.codec import (ERROR_BOUND, CompressedRecorder, CompressedTrajectoryReader, compress_trajectory,
+                       decode_stream, encode_frames, error_bound, quantize)
+from src.config import build_simulation, simulation_parameters
+from src.particle import ParticleStore
+from src.trajectory import TrajectoryRecorder, TrajectoryReader
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        # smoothly moving particles with jitter, some of them wrapping around the edges, and a change in count
+        rng = np.random.default_rng(4)
+        positions = rng.random((500, 2))
+        velocities = rng.uniform(-0.003, 0.003, (500, 2))
+        types = rng.integers(0, 5, 500)
+        self.frames = []
+        for step in range(70):
+            velocities *= 0.9
+            velocities += rng.normal(0, 0.00005, velocities.shape)
+            positions = (positions + velocities) % 1.0
+            count = 500 if step < 50 else 400
+            self.frames.append((positions[:count].copy(), types[:count].copy()))
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        # every frame is decoded within the error bound, the quantized values exactly
+        data = b"".join(encode_frames(self.frames, keyframe_interval=16))
+        decoded = list(decode_stream(io.BytesIO(data)))
+        self.assertEqual(len(decoded), len(self.frames))
+        for (positions, types), (expected, expected_types) in zip(decoded, self.frames):
+            self.assertLessEqual(np.abs(positions - expected).max(), ERROR_BOUND)
+            np.testing.assert_array_equal(quantize(positions), quantize(expected))
+            np.testing.assert_array_equal(types, expected_types)
+
+    def test_compression(self):
+        # slowly moving particles need a fraction of the space of float64 positions
+        raw = sum(positions.nbytes for positions, _ in self.frames)
+        data = b"".join(encode_frames(self.frames))
+        self.assertGreater(raw / len(data), 10)
+
+    def test_default_parameters_ratio(self):
+        # a run with the default parameters fits into a tenth of the space with 16383 quantization steps
+        simulation = build_simulation(dict(simulation_parameters, n_particles=1000), seed=1)
+        simulation.start_simulation()
+        frames = []
+        for _ in range(90):
+            simulation.update(1 / 30)
+            order = simulation.particles.id_order()
+            frames.append((simulation.particles.positions[order].copy(), simulation.particles.types[order].copy()))
+        frames = frames[30:]  # Starts after the particles left their random initial placement
+
+        raw = sum(positions.nbytes for positions, _ in frames)
+        data = b"".join(encode_frames(frames, quantization_steps=16383))
+        self.assertGreaterEqual(raw / len(data), 10)
+        for (positions, _), (expected, _) in zip(decode_stream(io.BytesIO(data)), frames):
+            self.assertLessEqual(np.abs(positions - np.clip(expected, 0, 1)).max(), error_bound(16383))
+
+    def test_reader_and_recorder(self):
+        # frames recorded in the background can be read in any order
+        path = os.path.join(self.directory.name, "run.ptz")
+        recorder = CompressedRecorder(path, keyframe_interval=8, quantization_steps=4095)
+        for positions, types in self.frames:
+            store = ParticleStore()
+            store.append(positions, np.zeros_like(positions), types)
+            recorder.record(store)
+        recorder.close()
+
+        reader = CompressedTrajectoryReader(path)
+        self.assertEqual(len(reader), len(self.frames))
+        self.assertEqual(reader.num_types, 5)
+        for index in (69, 3, 50, 49, 0):
+            positions, types = reader.frame(index)
+            self.assertLessEqual(np.abs(positions - self.frames[index][0]).max(), error_bound(4095))
+            self.assertEqual(len(types), len(self.frames[index][1]))
+        reader.close()
+
+    def test_compress_trajectory(self):
+        # a memory-mapped trajectory converts into the same frames
+        directory = os.path.join(self.directory.name, "run.traj")
+        recorder = TrajectoryRecorder(directory)
+        for positions, types in self.frames[:10]:
+            store = ParticleStore()
+            store.append(positions, np.zeros_like(positions), types)
+            recorder.record(store)
+        recorder.close()
+
+        path = os.path.join(self.directory.name, "run.ptz")
+        size = compress_trajectory(TrajectoryReader(directory), path)
+        self.assertEqual(size, os.path.getsize(path))
+        reader = CompressedTrajectoryReader(path)
+        self.assertLessEqual(np.abs(reader.frame(9)[0] - self.frames[9][0]).max(), ERROR_BOUND)
+        reader.close()
+
+if __name__ == "__main__":
+    unittest.main()
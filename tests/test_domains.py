@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.interactions import InteractionMatrix
+from src.simulation import Simulation
+from src.domains import strip_of, halo_mask
+
+def sorted_state(particles):
+    # the workers reorder the particles, so states are compared sorted by id
+    order = particles.id_order()
+    return particles.positions[order], particles.types[order]
+
+class TestDomains(unittest.TestCase):
+
+    def test_strips_and_halos(self):
+        # coordinates outside the square are wrapped or clamped, halos reach max_radius beyond the strip
+        x = np.array([-0.1, 0.1, 0.3, 0.6, 0.99, 1.2])
+        np.testing.assert_array_equal(strip_of(x, 4, periodic=False), [0, 0, 1, 2, 3, 3])
+        np.testing.assert_array_equal(strip_of(x, 4, periodic=True), [3, 0, 1, 2, 3, 0])
+        np.testing.assert_array_equal(halo_mask(x, 0, 4, 0.1, periodic=False), [True, True, True, False, False, False])
+        np.testing.assert_array_equal(halo_mask(x, 0, 4, 0.1, periodic=True), [True, True, True, False, True, True])
+
+    def test_matches_serial(self):
+        # two periodic strips exchange halos across both of their borders and stay on the serial trajectory,
+        # including after particles are added between updates
+        interaction_matrix = InteractionMatrix(num_types=5, min_radius=0.01, max_radius=0.1, global_repulsion=0.004)
+        domains = Simulation(1000, 1000, interaction_matrix, 1500, 5, 0.1, 0.2, 0.5, 0, engine="domains", workers=2, boundary="periodic")
+        serial = Simulation(1000, 1000, interaction_matrix, 0, 5, 0.1, 0.2, 0.5, 0, boundary="periodic")
+        serial.particles.append(domains.particles.positions, domains.particles.velocities, domains.particles.types)
+
+        try:
+            for step in range(30):
+                if step == 15:
+                    domains.add_particles(200)
+                    serial.particles.append(domains.particles.positions[-200:], domains.particles.velocities[-200:], domains.particles.types[-200:])
+                domains.update(dt=1 / 30)
+                serial.update(dt=1 / 30)
+
+            self.assertEqual(domains.domains.num_domains, 2)
+            positions, types = sorted_state(domains.particles)
+            expected_positions, expected_types = sorted_state(serial.particles)
+            np.testing.assert_allclose(positions, expected_positions, atol=1e-10)
+            np.testing.assert_array_equal(types, expected_types)
+        finally:
+            domains.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import numba
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src import engine
+from src.engine import CellGrid, bin_particles, balanced_blocks, set_threads
+from src.interactions import InteractionMatrix, calculate_force, minimum_image
+
+def reference_forces(positions, types, matrix, periodic=False):
+    # straightforward python loop over every pair within the interaction radius
+    forces = np.zeros_like(positions)
+    for i in range(len(positions)):
+        for j in range(len(positions)):
+            delta = positions[j] - positions[i]
+            if periodic:
+                delta = np.array([minimum_image(delta[0]), minimum_image(delta[1])])
+            if i != j and np.hypot(*delta) <= matrix.max_radius:
+                fx, fy = calculate_force(positions[i, 0], positions[i, 1], types[i],
+                                         positions[j, 0], positions[j, 1], types[j],
+                                         matrix.interactions, matrix.global_repulsion,
+                                         matrix.max_radius, matrix.min_radius, periodic=periodic)
+                forces[i] += fx, fy
+    return forces
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        # a small random system that is cheap to check pair by pair
+        rng = np.random.default_rng(1)
+        self.positions = rng.random((200, 2))
+        self.types = rng.integers(0, 4, 200)
+        self.matrix = InteractionMatrix(num_types=4, min_radius=0.01, max_radius=0.15, global_repulsion=0.004)
+
+    def test_bin_particles(self):
+        # every particle ends up exactly once in the cell that contains it
+        cell_start, cell_count, cell_particles = bin_particles(self.positions, 7)
+        self.assertEqual(cell_count.sum(), len(self.positions))
+        self.assertEqual(sorted(cell_particles), list(range(len(self.positions))))
+
+        grid = CellGrid(max_radius=0.15)
+        grid.rebuild(self.positions)
+        grid_size = grid.grid_size
+        for x in range(grid_size):
+            for y in range(grid_size):
+                for i in grid.members(x, y):
+                    self.assertEqual(int(self.positions[i, 0] * grid_size), x)
+                    self.assertEqual(int(self.positions[i, 1] * grid_size), y)
+
+    def test_forces_match_reference(self):
+        # the compiled pass finds every pair within max_radius, with and without sub-cells
+        expected = reference_forces(self.positions, self.types, self.matrix)
+        for subdivisions in (1, 3):
+            forces = CellGrid(self.matrix.max_radius, subdivisions).accumulate_forces(self.positions, self.types, self.matrix)
+            np.testing.assert_allclose(forces, expected, rtol=1e-10, atol=1e-12)
+
+    def test_grid_follows_max_radius(self):
+        # cells are at least max_radius / subdivisions wide and the grid refits when the radius changes
+        grid = CellGrid(0.15, subdivisions=2)
+        self.assertEqual(grid.grid_size, 13)
+        self.assertFalse(grid.fit(0.15))
+        self.matrix.set_max_radius(0.3)
+        grid.accumulate_forces(self.positions, self.types, self.matrix)
+        self.assertEqual(grid.grid_size, 6)
+        self.assertGreaterEqual(1 / grid.grid_size * grid.reach, 0.3)
+
+    def test_parallel_is_bit_identical(self):
+        # the parallel pass gives exactly the same forces for every thread count
+        set_threads(1)
+        single = CellGrid(0.15).accumulate_forces(self.positions, self.types, self.matrix, parallel=True)
+        set_threads(None)
+        parallel = CellGrid(0.15).accumulate_forces(self.positions, self.types, self.matrix, parallel=True)
+        np.testing.assert_array_equal(parallel, single)
+
+    def test_parallel_restores_chunk_size(self):
+        # the chunk size of the parallel pass is reset even if the kernel raises
+        kernel = engine.step_forces_parallel
+        def failing(*arguments):
+            raise RuntimeError("kernel failed")
+        engine.step_forces_parallel = failing
+        try:
+            with self.assertRaises(RuntimeError):
+                CellGrid(0.15).accumulate_forces(self.positions, self.types, self.matrix, parallel=True)
+        finally:
+            engine.step_forces_parallel = kernel
+        self.assertEqual(numba.get_parallel_chunksize(), 0)
+
+    def test_half_shell_matches_full_shell(self):
+        # evaluating each pair once gives the same physics as visiting it from both sides
+        half = CellGrid(0.15).accumulate_forces(self.positions, self.types, self.matrix)
+        full = CellGrid(0.15).accumulate_forces(self.positions, self.types, self.matrix, parallel=True)
+        np.testing.assert_allclose(half, full, rtol=1e-10, atol=1e-12)
+
+    def test_periodic_forces_match_reference(self):
+        # particles near opposite edges interact across them, serial and parallel agree with the reference
+        expected = reference_forces(self.positions, self.types, self.matrix, periodic=True)
+        self.assertFalse(np.allclose(expected, reference_forces(self.positions, self.types, self.matrix)))
+        for subdivisions in (1, 3):
+            for parallel in (False, True):
+                grid = CellGrid(self.matrix.max_radius, subdivisions, periodic=True)
+                forces = grid.accumulate_forces(self.positions, self.types, self.matrix, parallel=parallel)
+                np.testing.assert_allclose(forces, expected, rtol=1e-10, atol=1e-12)
+
+    def test_periodic_grid_too_small(self):
+        # a grid too coarse to wrap without visiting a cell twice falls back to a single cell
+        self.matrix.set_max_radius(0.45)
+        grid = CellGrid(self.matrix.max_radius, periodic=True)
+        self.assertEqual((grid.grid_size, grid.reach), (1, 0))
+        forces = grid.accumulate_forces(self.positions, self.types, self.matrix)
+        np.testing.assert_allclose(forces, reference_forces(self.positions, self.types, self.matrix, periodic=True),
+                                   rtol=1e-10, atol=1e-12)
+
+    def test_balanced_blocks(self):
+        # blocks cover every cell exactly once, even for very uneven occupancy
+        cell_count = np.zeros(100, dtype=np.int64)
+        cell_count[42] = 1000
+        blocks = balanced_blocks(10, 1, False, cell_count, 8)
+        self.assertEqual(blocks[0], 0)
+        self.assertEqual(blocks[-1], 100)
+        self.assertTrue(np.all(np.diff(blocks) > 0))
+
+if __name__ == "__main__":
+    unittest.main()
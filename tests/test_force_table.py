@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.engine import CellGrid
+from src.neighbor_list import VerletList
+from src.particle import ParticleStore
+from src.interactions import InteractionMatrix
+from src.force_table import ForceTable
+from src.spawning import poisson_disk
+
+class TestForceTable(unittest.TestCase):
+
+    def setUp(self):
+        # particles at least min_radius apart, where the tables are accurate
+        positions, types = poisson_disk(np.random.default_rng(3), 400, 4, radius=0.01)
+        self.particles = ParticleStore()
+        self.particles.append(positions, np.zeros((400, 2)), types)
+        self.matrix = InteractionMatrix(num_types=4, min_radius=0.01, max_radius=0.1, global_repulsion=0.004,
+                                        rng=np.random.default_rng(3))
+
+    def test_forces_match_analytic(self):
+        # looked up forces match the calculated ones for the grid and the neighbor lists, serial and parallel
+        expected = CellGrid(0.1, periodic=True).accumulate_forces(self.particles.positions, self.particles.types, self.matrix)
+        table = ForceTable()
+        self.assertLess(table.max_error(self.matrix), 1e-3)
+        tolerance = 1e-3 * np.abs(expected).max()
+        for parallel in (False, True):
+            forces = CellGrid(0.1, periodic=True).accumulate_forces(self.particles.positions, self.particles.types,
+                                                                    self.matrix, parallel, force_table=table)
+            np.testing.assert_allclose(forces, expected, atol=tolerance)
+            forces = VerletList(0.02).accumulate_forces(CellGrid(0.1, periodic=True), self.particles, self.matrix,
+                                                         parallel, force_table=table)
+            np.testing.assert_allclose(forces, expected, atol=tolerance)
+
+    def test_rebuilt_when_matrix_changes(self):
+        # the tables are only rebuilt after the matrix changed
+        table = ForceTable(samples=64)
+        table.lookup(self.matrix)
+        table.lookup(self.matrix)
+        self.assertEqual(table.build_count, 1)
+        for change in (self.matrix.randomize_fields, lambda: self.matrix.set_max_radius(0.12), self.matrix.mark_changed):
+            change()
+            table.lookup(self.matrix)
+        self.assertEqual(table.build_count, 4)
+        self.assertAlmostEqual(table.scale, 64 / 0.12 ** 2)
+
+    def test_custom_curve(self):
+        # a custom curve replaces the force model, here a constant attraction between all types
+        table = ForceTable(curve=lambda distance, interactions, matrix: np.ones((*interactions.shape, len(distance))))
+        positions = np.array([[0.5, 0.5], [0.55, 0.5]])
+        forces = CellGrid(0.1).accumulate_forces(positions, np.array([0, 1]), self.matrix, force_table=table)
+        np.testing.assert_allclose(forces, [[1.0, 0.0], [-1.0, 0.0]], atol=1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
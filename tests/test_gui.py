@@ -0,0 +1,103 @@
+import os
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src.particle import ParticleStore
+from src.interactions import InteractionMatrix
+from src.gui import ParticleRenderer, GUI
+
+class TestParticleRenderer(unittest.TestCase):
+
+    def setUp(self):
+        # sets up a store with particles everywhere in the area, including on its edges
+        pygame.init()
+        rng = np.random.default_rng(0)
+        self.colors = [(163, 217, 165), (255, 103, 125), (246, 255, 181)]
+        self.particles = ParticleStore(0, size=2)
+        positions = np.concatenate((rng.random((500, 2)), [[0.0, 0.0], [1.0, 1.0], [0.0, 1.0]]))
+        self.particles.append(positions, np.zeros_like(positions), np.arange(len(positions)) % 3)
+
+    def test_matches_draw_calls(self):
+        # the batched renderer produces the same pixels inside the area as one pygame.draw.circle call per particle
+        size = 200
+        batched, expected = pygame.Surface((300, size + 1), depth=32), pygame.Surface((300, size + 1), depth=32)
+        ParticleRenderer(size + 1, (0, 0, 0), self.colors).draw(batched, self.particles, size)
+
+        expected.fill((0, 0, 0))
+        for (x, y), particle_type in zip(np.round(self.particles.positions * size).astype(int).tolist(), self.particles.types.tolist()):
+            pygame.draw.circle(expected, self.colors[particle_type], (x, y), self.particles.size)
+
+        area = slice(0, size + 1)
+        np.testing.assert_array_equal(pygame.surfarray.array3d(batched)[area], pygame.surfarray.array3d(expected)[area])
+
+    def test_render_threshold(self):
+        # render positions only follow particles that moved more than the threshold
+        renderer = ParticleRenderer(101, (0, 0, 0), self.colors)
+        screen = pygame.Surface((101, 101), depth=32)
+        self.particles.render_positions[:] = self.particles.positions
+        self.particles.positions[0] += 0.0005
+        self.particles.positions[1] += 0.01
+        renderer.draw(screen, self.particles, 100, threshold=0.001)
+
+        self.assertFalse(np.array_equal(self.particles.render_positions[0], self.particles.positions[0]))
+        np.testing.assert_array_equal(self.particles.render_positions[1], self.particles.positions[1])
+
+class TestControlPanel(unittest.TestCase):
+
+    def setUp(self):
+        # sets up a panel whose controls read and write a dict instead of a simulation
+        pygame.init()
+        self.values = {"sim_speed": 1.0, "force_scaling": 1.0, "friction": 0.5, "random_movement": 0.0, "count": 1000}
+        self.interaction_matrix = InteractionMatrix(num_types=5, min_radius=0.01, max_radius=0.1, global_repulsion=0.004)
+
+    def build_gui(self):
+        values = self.values
+        controls = {name: lambda *args: None for name in ("start", "stop", "reset", "exit", "add_particles", "remove_particles")}
+        for name in ("sim_speed", "force_scaling", "friction", "random_movement"):
+            controls["set_" + name] = lambda value, name=name: values.__setitem__(name, value)
+            controls["get_" + name] = lambda name=name: values[name]
+        matrix = self.interaction_matrix
+        for name in ("global_repulsion", "min_radius", "max_radius"):
+            controls["set_" + name], controls["get_" + name] = getattr(matrix, "set_" + name), getattr(matrix, "get_" + name)
+        controls["randomize_fields"], controls["adjust_interaction"] = matrix.randomize_fields, matrix.adjust_interaction
+        controls["set_particle_count"] = lambda count: None
+        controls["get_particle_count"] = controls["particle_count"] = lambda: values["count"]
+        screen = pygame.Surface((1000, 700), depth=32)
+        return GUI(screen, 1000, 700, self.interaction_matrix, controls)
+
+    def test_unchanged_panel_is_not_redrawn(self):
+        gui = self.build_gui()
+        self.assertEqual(gui.draw_control_panel((0, 0)), [gui.panel_rect])
+        self.assertEqual(gui.draw_control_panel((0, 0)), [])
+
+    def test_changed_widgets_match_full_redraw(self):
+        # only the changed widgets are drawn again, and the result looks like a panel drawn from scratch
+        gui = self.build_gui()
+        gui.draw_control_panel((0, 0))
+        self.values["count"] = 123456
+        field = next(iter(gui.interactions_interface.fields.values()))
+        dirty_rects = gui.draw_control_panel(field.center)  # hovering shows the value of the field
+
+        self.assertEqual(len(dirty_rects), 2)
+        self.assertTrue(all(gui.panel_rect.contains(rect) for rect in dirty_rects))
+        expected = self.build_gui()
+        expected.draw_control_panel(field.center)
+        np.testing.assert_array_equal(pygame.surfarray.array3d(gui.screen), pygame.surfarray.array3d(expected.screen))
+
+    def test_inspection(self):
+        # the inspected particle is marked within the simulation area, positions outside of it are not inspected
+        gui = self.build_gui()
+        self.assertIsNone(gui.simulation_position((800, 100)))
+        self.assertEqual(gui.simulation_position((350, 70)), (0.5, 0.1))
+        gui.take_dirty_rects()
+        gui.inspection = {"index": 3, "id": 7, "type": 1, "position": (0.99, 0.99), "velocity": (0.01, -0.02), "neighbors": 4}
+        gui.draw_inspection()
+        dirty_rects = gui.take_dirty_rects()
+        self.assertEqual(len(dirty_rects), 2)
+        self.assertTrue(all(pygame.Rect(0, 0, 701, 701).contains(rect) for rect in dirty_rects))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 print("Aktueller sys.path:")
 print(sys.path)
 
-from interactions import InteractionMatrix, calculate_force
+from interactions import InteractionMatrix, calculate_force, calculate_pair_forces
 
 class TestParticleSimulation(unittest.TestCase):
 
@@ -28,6 +28,19 @@ class TestParticleSimulation(unittest.TestCase):
         self.assertIsInstance(force_x, float)
         self.assertIsInstance(force_y, float)
 
+    def test_calculate_pair_forces(self):
+        # Test, ob beide Kräfte eines Paares calculate_force aus beiden Richtungen entsprechen
+        interactions = np.array([[0.0, 0.5, -0.2], [0.5, 0.0, 0.3], [-0.2, 0.8, 0.0]])
+        for p2 in ((0.05, 0.02), (0.1, -0.08)):  # innerhalb von max_radius, weiter entfernte Paare werden übersprungen
+            fx1, fy1, fx2, fy2 = calculate_pair_forces(0.0, 0.0, 2, p2[0], p2[1], 1, interactions, 0.1, 0.15, 0.01)
+            np.testing.assert_allclose((fx1, fy1), calculate_force(0.0, 0.0, 2, p2[0], p2[1], 1, interactions, 0.1, 0.15, 0.01), rtol=1e-12)
+            np.testing.assert_allclose((fx2, fy2), calculate_force(p2[0], p2[1], 1, 0.0, 0.0, 2, interactions, 0.1, 0.15, 0.01), rtol=1e-12)
+
+    def test_no_force_beyond_max_radius(self):
+        # Test, ob jenseits von max_radius keine Kraft wirkt, auch keine Abstoßung
+        interactions = np.array([[0.0, 0.5], [0.5, 0.0]])
+        self.assertEqual(calculate_force(0.0, 0.0, 0, 0.3, 0.4, 1, interactions, 0.1, 0.15, 0.01), (0.0, 0.0))
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -21,13 +21,26 @@ class TestInteractionsInterface(unittest.TestCase):
         # simulate scrolling up and modify the interaction value
         mouse_pos = (270, 190)
         event = pygame.event.Event(pygame.MOUSEBUTTONDOWN, {'pos': mouse_pos, 'button': 4})  # Scroll up event
+        version = self.interaction_matrix.version
         self.interface.handle_click(event)
+        self.assertGreater(self.interaction_matrix.version, version)  # Force tables are rebuilt
 
         # check if the interaction value increased by 0.2 as expected
         expected_value = 0.7
         actual_value = self.interaction_matrix.interactions[(0, 1)]
         self.assertAlmostEqual(actual_value, expected_value, delta=1e-6)
 
+    def test_handle_click_through_callback(self):
+        # with a callback, e.g. one queueing the change for a simulation thread, the matrix is not changed by the click
+        calls = []
+        interface = InteractionsInterface(self.interaction_matrix, self.type_colors, (100, 100), 500,
+                                          adjust_interaction=lambda *args: calls.append(args))
+        version = self.interaction_matrix.version
+        interface.handle_click(pygame.event.Event(pygame.MOUSEBUTTONDOWN, {'pos': (270, 190), 'button': 5}))
+        self.assertEqual(calls, [(0, 1, -0.2)])
+        self.assertEqual(self.interaction_matrix.version, version)
+        self.assertEqual(self.interaction_matrix.interactions[(0, 1)], 0.5)
+
     def test_draw(self):
         # test draw method by confirming no exceptions occur
         try:
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from src import main
+from src.particle import ParticleStore
+from src.trajectory import open_recorder, open_trajectory
+from src.interactions import InteractionMatrix
+from src.simulation import Simulation
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        # the parameters record and autosave to the trajectory that is replayed
+        self.directory = tempfile.TemporaryDirectory()
+        self.parameters = dict(main.simulation_parameters)
+
+    def tearDown(self):
+        main.simulation_parameters.clear()
+        main.simulation_parameters.update(self.parameters)
+        pygame.quit()
+        self.directory.cleanup()
+
+    def record(self, path):
+        recorder = open_recorder(path)
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            store = ParticleStore()
+            store.append(rng.random((50, 2)), np.zeros((50, 2)), np.arange(50) % 5)
+            recorder.record(store)
+        recorder.close()
+
+    def test_replay_keeps_the_recording(self):
+        # replaying builds no simulation, so the recording the parameters point at is neither replaced nor recorded to
+        for name in ("run.traj", "run.ptz"):
+            path = os.path.join(self.directory.name, name)
+            self.record(path)
+            main.simulation_parameters.update(record_path=path, autosave_path=os.path.join(self.directory.name, "autosave.npz"),
+                                              physics_rate=60)
+            app = main.Main(replay=path)
+            self.assertIsNone(app.simulation)
+            self.assertIsNone(app.simulation_thread)
+            self.assertEqual(len(app.player.reader), 20)
+            self.assertEqual(len(open_trajectory(path)), 20)
+            self.assertFalse(os.path.exists(main.simulation_parameters["autosave_path"]))
+
+            # no simulation may start recording over the replayed trajectory until the replay ends
+            simulation = Simulation(1000, 1000, InteractionMatrix(5, 0.01, 0.1, 0.004), 10, 5, 0.1, 0.2, 0.5, 0)
+            with self.assertRaises(ValueError):
+                simulation.set_recorder(path)
+            app.player.close()
+            simulation.set_recorder(path)
+            simulation.close()
+            pygame.quit()  # The next window needs a new display
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.engine import CellGrid
+from src.neighbor_list import VerletList
+from src.particle import ParticleStore
+from src.interactions import InteractionMatrix
+
+class TestVerletList(unittest.TestCase):
+
+    def setUp(self):
+        # random particles and a grid for the force pass to compare against
+        rng = np.random.default_rng(2)
+        self.particles = ParticleStore()
+        self.particles.append(rng.random((300, 2)), np.zeros((300, 2)), rng.integers(0, 4, 300))
+        self.matrix = InteractionMatrix(num_types=4, min_radius=0.01, max_radius=0.1, global_repulsion=0.004)
+
+    def test_forces_match_cell_search(self):
+        # the lists give the same forces as a full grid search, in serial and parallel mode
+        expected = CellGrid(0.1).accumulate_forces(self.particles.positions, self.particles.types, self.matrix)
+        for parallel in (False, True):
+            verlet = VerletList(skin=0.03)
+            forces = verlet.accumulate_forces(CellGrid(0.1), self.particles, self.matrix, parallel)
+            np.testing.assert_allclose(forces, expected, rtol=1e-10, atol=1e-12)
+
+    def test_periodic_lists(self):
+        # periodic lists reach across the edges and a particle wrapping around only moved a little
+        expected = CellGrid(0.1, periodic=True).accumulate_forces(self.particles.positions, self.particles.types, self.matrix)
+        verlet, grid = VerletList(skin=0.03), CellGrid(0.1, periodic=True)
+        forces = verlet.accumulate_forces(grid, self.particles, self.matrix)
+        np.testing.assert_allclose(forces, expected, rtol=1e-10, atol=1e-12)
+
+        self.particles.positions[0] = 0.999
+        verlet.reference_positions[0] = 0.001
+        self.assertFalse(verlet.needs_rebuild(self.particles, verlet.radius, False))
+
+    def test_rebuild_only_after_displacement(self):
+        # small movements reuse the lists, moving more than skin / 2 triggers a rebuild
+        verlet, grid = VerletList(skin=0.04), CellGrid(0.1)
+        verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.particles.positions += 0.005
+        forces = verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.assertEqual(verlet.rebuild_count, 1)
+
+        # forces from the reused lists are still exact
+        expected = CellGrid(0.1).accumulate_forces(self.particles.positions, self.particles.types, self.matrix)
+        np.testing.assert_allclose(forces, expected, rtol=1e-10, atol=1e-12)
+
+        self.particles.positions[0] += 0.03
+        verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.assertEqual(verlet.rebuild_count, 2)
+        self.assertEqual(verlet.get_stats()["steps"], 3)
+
+    def test_rebuild_after_particle_change(self):
+        # adding particles or changing the radius invalidates the lists
+        verlet, grid = VerletList(), CellGrid(0.1)
+        verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.particles.append([[0.5, 0.5]], [[0.0, 0.0]], [1])
+        verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.matrix.set_max_radius(0.12)
+        verlet.accumulate_forces(grid, self.particles, self.matrix)
+        self.assertEqual(verlet.rebuild_count, 3)
+
+if __name__ == "__main__":
+    unittest.main()
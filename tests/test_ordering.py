@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.ordering import morton_key, hilbert_key, curve_order, disorder
+from src.engine import bin_particles
+
+class TestOrdering(unittest.TestCase):
+
+    def test_morton_key(self):
+        # the bits of x and y are interleaved, x in the higher bit of every pair
+        self.assertEqual([morton_key(x, y) for x, y in ((0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (3, 3))], [0, 1, 2, 3, 8, 15])
+
+    def test_hilbert_key(self):
+        # the curve visits every cell of the grid once, each step moving to a neighbouring cell
+        n = 16
+        cells = sorted((hilbert_key(x, y, n), x, y) for x in range(n) for y in range(n))
+        self.assertEqual([key for key, _, _ in cells], list(range(n * n)))
+        steps = np.abs(np.diff([(x, y) for _, x, y in cells], axis=0)).sum(axis=1)
+        np.testing.assert_array_equal(steps, 1)
+
+    def test_curve_order(self):
+        # after ordering, the particles of every cell are stored next to each other
+        positions = np.random.default_rng(0).random((5000, 2))
+        for curve in ("morton", "hilbert"):
+            order = curve_order(positions, 10, curve=curve)
+            np.testing.assert_array_equal(np.sort(order), np.arange(5000))
+            self.assertGreater(disorder(*bin_particles(positions, 10)), 0.9)
+            self.assertEqual(disorder(*bin_particles(positions[order], 10)), 0.0)
+        with self.assertRaises(ValueError):
+            curve_order(positions, 10, curve="peano")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,8 @@ import pygame
 import sys
 sys.path.insert(0, 'src') 
 from src.main import simulation_parameters
-from src.particle import Particle
+import numpy as np
+from src.particle import Particle, ParticleStore
 
 class TestParticle(unittest.TestCase):
     def setUp(self):
@@ -76,5 +77,121 @@ class TestParticle(unittest.TestCase):
         # clean up by quitting pygame
         pygame.quit()
 
+class TestParticleStore(unittest.TestCase):
+    def setUp(self):
+        # a store with three particles of different types
+        self.store = ParticleStore(0, friction=0.5, force_scaling=0.2)
+        self.store.append(positions=[[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]],
+                          velocities=np.zeros((3, 2)), types=[0, 1, 2])
+
+    def test_arrays_are_contiguous(self):
+        # all state lives in contiguous numeric arrays, not in python objects
+        self.assertEqual(self.store.positions.shape, (3, 2))
+        self.assertEqual(self.store.velocities.shape, (3, 2))
+        self.assertEqual(self.store.types.shape, (3,))
+        self.assertTrue(self.store.positions.flags['C_CONTIGUOUS'])
+        self.assertNotEqual(self.store.positions.dtype, object)
+
+    def test_views_write_through(self):
+        # particles obtained from the store read and write the store's arrays
+        particle = self.store[1]
+        self.assertEqual(particle.type, 1)
+        self.assertEqual(particle.position, [0.3, 0.4])
+        particle.apply_force(1.0, 0.0)
+        self.assertAlmostEqual(self.store.velocities[1, 0], 0.2)
+
+    def test_from_particles_rebinds(self):
+        # standalone particles become views onto the new store
+        particles = [Particle(type=0, size=1, position=[0.2, 0.2]), Particle(type=1, size=1, position=[0.7, 0.7])]
+        store = ParticleStore.from_particles(particles, like=self.store)
+        store.positions[1] = [0.9, 0.9]
+        self.assertEqual(particles[1].position, [0.9, 0.9])
+        self.assertEqual(store.friction, 0.5)
+
+    def test_integrate(self):
+        # integration applies friction before moving the particles
+        self.store.velocities[:] = 1.0
+        self.store.integrate(dt=1, time_factor=0.1)
+        np.testing.assert_allclose(self.store.velocities, 0.5)
+        np.testing.assert_allclose(self.store.positions[0], [0.15, 0.25])
+
+    def test_growable_buffers(self):
+        # appending doubles the capacity when full and keeps the particles, truncating keeps the buffers
+        for _ in range(10):
+            self.store.append(np.full((10, 2), 0.5), np.zeros((10, 2)), np.zeros(10))
+        self.assertEqual(len(self.store), 103)
+        self.assertLess(self.store.capacity, 2 * 103)
+        self.assertEqual(self.store.positions.shape, (103, 2))
+        np.testing.assert_array_equal(self.store.positions[1], [0.3, 0.4])
+        capacity = self.store.capacity
+        self.store.truncate(50)
+        self.assertEqual((len(self.store), self.store.capacity), (50, capacity))
+
+    def test_float32_store(self):
+        # a float32 store keeps its positions and velocities in float32, also when appending or assigning
+        store = ParticleStore(0, dtype=np.float32)
+        store.append([[0.1, 0.2]], [[0.0, 0.0]], [0])
+        store.positions = np.array([[0.3, 0.4]])
+        self.assertEqual(store.positions.dtype, np.float32)
+        self.assertEqual(store.velocities.dtype, np.float32)
+        self.assertEqual(store.types.dtype, np.int64)
+
+    def test_replace(self):
+        # replacing keeps all fields and the capacity at the new count and invalidates cached data, assigning keeps the count
+        version = self.store.version
+        self.store.replace([[0.1, 0.2], [0.3, 0.4]], [1, 2])
+        self.assertEqual((len(self.store), self.store.capacity), (2, 2))
+        self.assertGreater(self.store.version, version)
+        np.testing.assert_array_equal(self.store.render_positions, [[0.1, 0.2], [0.3, 0.4]])
+        np.testing.assert_array_equal(self.store.velocities, np.zeros((2, 2)))
+        np.testing.assert_array_equal(self.store.ids, [0, 1])
+        self.store.append([[0.5, 0.5]], [[0.0, 0.0]], [0])
+        self.assertEqual(self.store.ids[-1], 2)
+
+        # the same count is copied into the current buffers instead of allocating new ones
+        positions = self.store.positions
+        self.store.replace([[0.6, 0.6], [0.7, 0.7], [0.8, 0.8]], [0, 1, 2])
+        self.assertTrue(np.shares_memory(self.store.positions, positions))
+        np.testing.assert_array_equal(self.store.positions, [[0.6, 0.6], [0.7, 0.7], [0.8, 0.8]])
+        np.testing.assert_array_equal(self.store.ids, [0, 1, 2])
+        self.assertEqual(self.store.next_id, 3)
+        with self.assertRaises(ValueError):
+            self.store.positions = np.zeros((5, 2))
+
+    def test_swap_remove(self):
+        # removed particles are replaced by the last ones, from the front, the middle and the end
+        self.store.append([[0.7, 0.7], [0.9, 0.9]], np.zeros((2, 2)), [3, 4])
+        self.store.swap_remove([0, 4, 2])
+        self.assertEqual(sorted(self.store.types.tolist()), [1, 3])
+        self.assertEqual(len(self.store.positions), 2)
+        with self.assertRaises(IndexError):
+            self.store.swap_remove([2])
+
+    def test_ids(self):
+        # every particle keeps its id when particles are removed or reordered, new particles get new ids
+        self.store.append([[0.7, 0.7], [0.9, 0.9]], np.zeros((2, 2)), [3, 4])
+        np.testing.assert_array_equal(self.store.ids, [0, 1, 2, 3, 4])
+        self.store.swap_remove([1])
+        self.store.reorder([3, 2, 1, 0])
+        np.testing.assert_array_equal(self.store.ids, [3, 2, 4, 0])
+        np.testing.assert_array_equal(self.store.types, [3, 2, 4, 0])
+        np.testing.assert_array_equal(self.store.index_of([0, 4]), [3, 2])
+        np.testing.assert_array_equal(self.store.ids[self.store.id_order()], [0, 2, 3, 4])
+        self.store.append([[0.1, 0.1]], np.zeros((1, 2)), [1])
+        self.assertEqual(self.store.ids[-1], 5)
+
+    def test_type_factors(self):
+        # friction and force scaling are multiplied by the factor of each particle's type
+        self.store.type_friction = np.array([1.0, 0.0, 2.0])
+        self.store.type_force_scaling = np.array([1.0, 2.0, 0.5])
+        self.store.velocities[:] = 1.0
+        self.store.integrate(dt=1, time_factor=0.1)
+        np.testing.assert_allclose(self.store.velocities[:, 0], [0.5, 1.0, 0.0])
+
+        self.store.apply_forces(np.ones((3, 2)))
+        np.testing.assert_allclose(self.store.velocities[:, 0], [0.7, 1.4, 0.1])
+        self.assertAlmostEqual(self.store[1].friction, 0.5)  # The global values stay unchanged
+        self.assertEqual(self.store.friction_of(2), 1.0)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.config import simulation_parameters, build_simulation
+from src.precision import accuracy_report
+
+class TestPrecision(unittest.TestCase):
+
+    def test_float32_state(self):
+        # the particles of a float32 simulation stay float32 through updates, spawning and force tables
+        parameters = {**simulation_parameters, "n_particles": 300, "precision": "float32", "force_model": "table"}
+        simulation = build_simulation(parameters, seed=1)
+        simulation.update(1 / 30)
+        simulation.add_particles(50)
+        simulation.update(1 / 30)
+        particles = simulation.particles
+        self.assertEqual(particles.positions.dtype, np.float32)
+        self.assertEqual(particles.velocities.dtype, np.float32)
+        self.assertEqual(simulation.force_table.table.dtype, np.float32)
+        self.assertTrue(np.all(np.isfinite(particles.positions)))
+
+    def test_accuracy_report(self):
+        # both runs start from the same particles and stay close over the first steps
+        parameters = {**simulation_parameters, "n_particles": 300, "boundary": "periodic"}
+        report = accuracy_report(parameters, steps=10, every=5)
+        self.assertEqual([entry["step"] for entry in report["deviation"]], [0, 5, 10])
+        self.assertLess(report["deviation"][0]["rms"], 1e-7)  # Only the float32 rounding of the start positions
+        self.assertLess(report["deviation"][-1]["rms"], 1e-3)
+        self.assertLess(report["state_bytes"]["float32"], report["state_bytes"]["float64"])
+        self.assertEqual(set(report["metrics"]), {"float64", "float32"})
+
+if __name__ == '__main__':
+    unittest.main()
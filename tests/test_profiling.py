@@ -0,0 +1,37 @@
+import unittest
+import time
+import sys
+sys.path.insert(0, 'src')
+from src.profiling import PhaseTimer
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def test_laps(self):
+        # every lap is recorded under its phase, in milliseconds
+        timer = PhaseTimer()
+        for _ in range(3):
+            timer.start()
+            time.sleep(0.002)
+            timer.lap("sleep")
+            timer.lap("nothing")
+        stats = timer.get_stats()
+        self.assertEqual(list(stats), ["sleep", "nothing"])
+        self.assertEqual(stats["sleep"]["samples"], 3)
+        self.assertGreaterEqual(stats["sleep"]["p50_ms"], 2)
+        self.assertLess(stats["nothing"]["mean_ms"], stats["sleep"]["mean_ms"])
+
+    def test_window(self):
+        # only the most recent durations are kept
+        timer = PhaseTimer(window=5)
+        for _ in range(20):
+            timer.lap("phase")
+        self.assertEqual(timer.get_stats()["phase"]["samples"], 5)
+
+    def test_disabled(self):
+        # a disabled timer records nothing
+        timer = PhaseTimer(enabled=False)
+        timer.lap("phase")
+        self.assertEqual(timer.get_stats(), {})
+
+if __name__ == "__main__":
+    unittest.main()
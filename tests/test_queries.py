@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.engine import CellGrid
+from src.queries import query_radius, query_knn, query_rect, query_radius_batch
+
+def distances(positions, x, y, periodic):
+    delta = positions - (x, y)
+    if periodic:
+        delta -= np.round(delta)
+    return np.sqrt((delta ** 2).sum(axis=1))
+
+class TestQueries(unittest.TestCase):
+
+    def setUp(self):
+        # sets up particles binned into a grid of 10 cells per axis
+        self.positions = np.random.default_rng(0).random((3000, 2))
+        self.grids = {periodic: CellGrid(0.1, periodic=periodic) for periodic in (False, True)}
+        for grid in self.grids.values():
+            grid.rebuild(self.positions)
+
+    def test_radius(self):
+        # the cells around the point find exactly the particles a scan finds, also across periodic edges and beyond one cell
+        for periodic, grid in self.grids.items():
+            for x, y, radius in ((0.5, 0.5, 0.05), (0.02, 0.97, 0.08), (0.3, 0.6, 0.35), (0.5, 0.5, 2.0)):
+                found = query_radius(grid, self.positions, x, y, radius)
+                expected = np.flatnonzero(distances(self.positions, x, y, periodic) <= radius)
+                np.testing.assert_array_equal(np.sort(found), expected)
+
+    def test_knn(self):
+        # the k nearest particles are returned nearest first, all of them if k exceeds the particle count
+        for periodic, grid in self.grids.items():
+            for x, y, k in ((0.5, 0.5, 1), (0.99, 0.01, 20), (0.2, 0.7, 500)):
+                expected = np.argsort(distances(self.positions, x, y, periodic), kind="stable")[:k]
+                np.testing.assert_array_equal(query_knn(grid, self.positions, x, y, k), expected)
+        self.assertEqual(len(query_knn(self.grids[False], self.positions, 0.5, 0.5, 5000)), 3000)
+
+    def test_rect_and_batch(self):
+        # the rectangle includes its edges, the batch returns the same indices as single queries
+        grid = self.grids[False]
+        found = query_rect(grid, self.positions, 0.15, 0.4, 0.42, 0.9)
+        inside = np.all((self.positions >= (0.15, 0.4)) & (self.positions <= (0.42, 0.9)), axis=1)
+        np.testing.assert_array_equal(np.sort(found), np.flatnonzero(inside))
+
+        points = np.array([[0.1, 0.1], [0.5, 0.9], [0.8, 0.3]])
+        for indices, (x, y) in zip(query_radius_batch(grid, self.positions, points, 0.07), points):
+            np.testing.assert_array_equal(indices, query_radius(grid, self.positions, x, y, 0.07))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, 'src')
+from src.config import load_config, build_simulation, simulation_parameters
+from src.run import main, run_headless
+
+class TestRun(unittest.TestCase):
+
+    def setUp(self):
+        # a small configuration file in a temporary directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = os.path.join(self.directory.name, "config.json")
+        with open(self.config, "w") as file:
+            json.dump({"n_particles": 200, "boundary": "periodic"}, file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_config(self):
+        # the file overrides the defaults, unknown keys are rejected
+        parameters = load_config(self.config)
+        self.assertEqual(parameters["n_particles"], 200)
+        self.assertEqual(parameters["friction"], simulation_parameters["friction"])
+
+        toml = os.path.join(self.directory.name, "config.toml")
+        with open(toml, "w") as file:
+            file.write("n_particles = 100\nparticle_count = 3\n")
+        with self.assertRaises(ValueError):
+            load_config(toml)
+
+    def test_run_headless(self):
+        # the report counts steps and interacting pairs
+        simulation = build_simulation(load_config(self.config), seed=1)
+        report = run_headless(simulation, steps=4)
+        self.assertEqual(report["steps"], 4)
+        self.assertEqual(report["particles"], 200)
+        self.assertGreater(report["mean_pairs"], 0)
+        self.assertGreater(report["steps_per_second"], 0)
+
+    def test_runs_exact_steps(self):
+        # steps updates are run, no extra warm-up step, and none for steps=0
+        for steps in (0, 1, 3):
+            simulation = build_simulation(load_config(self.config), seed=1)
+            updates = []
+            update = simulation.update
+            def counted(dt):
+                updates.append(dt)
+                update(dt)
+            simulation.update = counted
+            report = run_headless(simulation, steps=steps)
+            self.assertEqual(len(updates), steps)
+            self.assertEqual(report["timed_steps"], min(steps, max(steps - 1, 1)))
+
+        # the final state matches stepping the simulation by hand
+        simulation = build_simulation(load_config(self.config), seed=1)
+        reference = build_simulation(load_config(self.config), seed=1)
+        run_headless(simulation, steps=3)
+        for _ in range(3):
+            reference.update(1 / 30)
+        np.testing.assert_array_equal(simulation.particles.positions, reference.particles.positions)
+
+    def test_seed_is_reproducible(self):
+        # two runs with the same seed end in the same state
+        states = []
+        for name in ("first.npz", "second.npz"):
+            output = os.path.join(self.directory.name, name)
+            main([self.config, "--steps", "3", "--seed", "7", "--output", output,
+                  "--report", os.path.join(self.directory.name, "report.json")])
+            states.append(np.load(output)["positions"])
+        np.testing.assert_array_equal(states[0], states[1])
+
+    def test_no_pygame(self):
+        # the headless runner never loads pygame
+        code = "import sys; import src.run; print('pygame' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,5 +53,156 @@ class TestSimulation(unittest.TestCase):
         self.assertGreaterEqual(particle.position[1], 0)
         self.assertLessEqual(particle.position[1], 1)
 
+    def test_parallel_engine(self):
+        # the parallel engine gives the same trajectory as the serial one and reports its speedup
+        parallel = Simulation(1000, 1000, self.interaction_matrix, 1000, 5, 0.1, 0.2, 0.5, 0, engine="parallel", threads=1)
+        serial = Simulation(1000, 1000, self.interaction_matrix, 1000, 5, 0.1, 0.2, 0.5, 0)
+        serial.particles.positions[:] = parallel.particles.positions
+        serial.particles.velocities[:] = parallel.particles.velocities
+        for _ in range(3):
+            serial.update(dt=0.1)
+            parallel.update(dt=0.1)
+        np.testing.assert_allclose(parallel.particles.positions, serial.particles.positions, rtol=1e-9)
+
+        report = parallel.measure_speedup(repeats=1)
+        self.assertGreater(report["speedup"], 0)
+        self.assertEqual(report["threads"], 1)
+
+    def test_grid_follows_max_radius(self):
+        # the grid is sized by the interaction radius and rebuilt when the radius slider changes it
+        self.assertEqual(self.simulation.cells.grid_size, int(1 / 0.15))
+        self.interaction_matrix.set_max_radius(0.05)
+        self.simulation.update(dt=0.1)
+        self.assertEqual(self.simulation.cells.grid_size, 20)
+        self.assertEqual(self.simulation.cells.cell_count.sum(), 1000)
+
+    def test_verlet_neighbor_search(self):
+        # neighbor lists reproduce the grid search and are reused while the particles barely move
+        verlet = Simulation(1000, 1000, self.interaction_matrix, 1000, 5, 0.1, 0.2, 0.5, 0, neighbor_search="verlet", verlet_skin=0.05)
+        cells = Simulation(1000, 1000, self.interaction_matrix, 1000, 5, 0.1, 0.2, 0.5, 0)
+        cells.particles.positions[:] = verlet.particles.positions
+        cells.particles.velocities[:] = 0
+        verlet.particles.velocities[:] = 0
+        for _ in range(3):
+            verlet.update(dt=0.01)
+            cells.update(dt=0.01)
+        np.testing.assert_allclose(verlet.particles.positions, cells.particles.positions, rtol=1e-9)
+        self.assertLess(verlet.get_neighbor_stats()["rebuilds"], 3)
+
+        # the speedup times the force loop over lists built once per engine, without touching the statistics
+        stats, rebuild, rebuilds = verlet.get_neighbor_stats(), verlet.verlet_list.rebuild, []
+        verlet.verlet_list.rebuild = lambda *args: rebuilds.append(rebuild(*args))
+        verlet.measure_speedup(repeats=3)
+        self.assertLessEqual(len(rebuilds), 2)  # At most once per engine, never during the timed passes
+        self.assertEqual([verlet.get_neighbor_stats()[key] for key in ("rebuilds", "steps")], [stats["rebuilds"], stats["steps"]])
+
+    def test_periodic_boundary(self):
+        # in a periodic world particles stay in the unit square without bouncing off the edges
+        simulation = Simulation(1000, 1000, self.interaction_matrix, 300, 5, 0.1, 0.2, 0.5, 0.01, boundary="periodic")
+        self.assertTrue(simulation.cells.periodic)
+        for _ in range(5):
+            simulation.update(0.1)
+        positions = simulation.particles.positions
+        self.assertTrue(np.all((positions >= 0) & (positions < 1)))
+
+    def test_perf_stats(self):
+        # every update phase is timed
+        self.simulation.update(0.1)
+        stats = self.simulation.get_perf_stats()
+        self.assertEqual(list(stats), ["integrate", "forces", "apply_forces", "boundaries"])
+        self.assertEqual(stats["forces"]["samples"], 1)
+
+    def test_seeded_generator(self):
+        # all randomness comes from the simulation's generator, so equal seeds give identical runs
+        global_state = np.random.get_state()[1].copy()
+        runs = []
+        for _ in range(2):
+            rng = np.random.default_rng(5)
+            interaction_matrix = InteractionMatrix(5, 0.01, 0.15, 0.005, rng)
+            simulation = Simulation(1000, 1000, interaction_matrix, 300, 5, 0.1, 0.2, 0.5, 0.01, rng=rng)
+            for _ in range(3):
+                simulation.update(dt=0.1)
+            interaction_matrix.randomize_fields()
+            runs.append((simulation.particles.positions, interaction_matrix.interactions))
+
+        np.testing.assert_array_equal(runs[0][0], runs[1][0])
+        np.testing.assert_array_equal(runs[0][1], runs[1][1])
+        np.testing.assert_array_equal(np.random.get_state()[1], global_state)  # The global generator is left alone
+
+    def test_type_factors(self):
+        # per-type factors are checked against the number of types and only change the particles of their type
+        with self.assertRaises(ValueError):
+            self.simulation.set_type_friction([1.0, 2.0])
+        self.simulation.set_type_friction([1.0, 1.0, 1.0, 1.0, 0.0])
+        self.simulation.set_type_force_scaling([0.0, 0.0, 0.0, 0.0, 1.0])
+        self.simulation.set_friction(1.0)  # Stops every type except the one without friction and forces
+        self.simulation.update(0.1)
+        particles = self.simulation.particles
+        moving = np.any(particles.velocities != 0, axis=1)
+        np.testing.assert_array_equal(moving, particles.types == 4)
+
+    def test_spawn_and_despawn(self):
+        # bulk changes keep the particle count and the grid up to date, modify_particle_count works in both directions
+        self.simulation.spawn(500, layout="rings")
+        self.simulation.despawn(np.arange(0, 1500, 3))
+        self.assertEqual(len(self.simulation.particles), 1000)
+        self.assertEqual(self.simulation.num_particles, 1000)
+        self.simulation.modify_particle_count(100)
+        self.simulation.modify_particle_count(-300)
+        self.assertEqual(self.simulation.get_particle_count(), 800)
+        self.assertEqual(self.simulation.num_types, 5)
+        self.simulation.update(0.1)
+
+    def test_reorder(self):
+        # reordering along the curve changes where particles are stored, but not where they move
+        ordered = Simulation(1000, 1000, self.interaction_matrix, 0, 5, 0.1, 0.2, 0.5, 0, reorder="morton", reorder_interval=5)
+        unordered = Simulation(1000, 1000, self.interaction_matrix, 0, 5, 0.1, 0.2, 0.5, 0)
+        for simulation in (ordered, unordered):
+            simulation.particles.append(self.simulation.particles.positions, self.simulation.particles.velocities,
+                                        self.simulation.particles.types)
+        for _ in range(12):
+            ordered.update(0.1)
+            unordered.update(0.1)
+        self.assertEqual(ordered.reorder_count, 2)
+        self.assertFalse(np.array_equal(ordered.particles.ids, unordered.particles.ids))
+        np.testing.assert_allclose(ordered.particles.positions[ordered.particles.id_order()], unordered.particles.positions, atol=1e-9)
+
+    def test_reorder_threshold(self):
+        # randomly ordered particles are reordered on the first update, after which their cells are contiguous
+        simulation = Simulation(1000, 1000, self.interaction_matrix, 2000, 5, 0.1, 0.2, 0.5, 0, reorder="hilbert",
+                                reorder_interval=None, reorder_threshold=0.5)
+        self.assertGreater(simulation.get_disorder(), 0.5)
+        simulation.update(0.1)
+        simulation.update(0.1)
+        self.assertEqual(simulation.reorder_count, 1)
+        self.assertLess(simulation.get_disorder(), 0.5)
+        with self.assertRaises(ValueError):
+            Simulation(1000, 1000, self.interaction_matrix, 10, 5, 0.1, 0.2, 0.5, 0, reorder="peano")
+
+    def test_queries_follow_updates(self):
+        # queries see the positions after the latest update, also with neighbor lists, which do not bin every update
+        for neighbor_search in ("cells", "verlet"):
+            simulation = Simulation(1000, 1000, self.interaction_matrix, 1000, 5, 0.1, 0.2, 0.5, 0.01, neighbor_search=neighbor_search)
+            for _ in range(3):
+                simulation.update(0.1)
+            positions = simulation.particles.positions
+            expected = np.flatnonzero(((positions - 0.5) ** 2).sum(axis=1) <= 0.1 ** 2)
+            np.testing.assert_array_equal(np.sort(simulation.query_radius(0.5, 0.5, 0.1)), expected)
+
+    def test_inspect(self):
+        # the particle nearest to the point is described, nothing is found far from all particles
+        particles = self.simulation.particles
+        index = len(particles) // 2
+        x, y = particles.positions[index]
+        inspection = self.simulation.inspect(x + 1e-6, y, 0.01)
+        self.assertEqual((inspection["index"], inspection["id"], inspection["type"]), (index, particles.ids[index], particles.types[index]))
+        distance = np.sqrt(((particles.positions - (x, y)) ** 2).sum(axis=1))
+        self.assertEqual(inspection["neighbors"], np.count_nonzero(distance <= self.interaction_matrix.max_radius) - 1)
+        self.assertIsNone(self.simulation.inspect(5.0, 5.0, 0.01))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Simulation(1000, 1000, self.interaction_matrix, 10, 5, 0.1, 0.2, 0.5, 0, engine="gpu")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.particle import ParticleStore
+from src.interactions import InteractionMatrix
+from src.simulation import Simulation
+from src.simulation_thread import SnapshotBuffer, SimulationThread
+
+class TestSnapshotBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.particles = ParticleStore(0)
+        self.particles.append([[0.2, 0.2], [0.99, 0.5]], np.zeros((2, 2)), [0, 1])
+        self.snapshots = SnapshotBuffer()
+        self.snapshots.publish(self.particles, 0)
+
+    def test_interpolation(self):
+        # snapshots are placed between the last two steps, particles wrapping around an edge are not interpolated
+        self.particles.positions[:] = [[0.3, 0.2], [0.01, 0.5]]
+        self.snapshots.publish(self.particles, 1)
+
+        with self.snapshots.read(0.5) as store:
+            np.testing.assert_allclose(store.positions, [[0.25, 0.2], [0.01, 0.5]])
+            np.testing.assert_array_equal(store.types, [0, 1])
+        with self.snapshots.read(1.0) as store:
+            np.testing.assert_allclose(store.positions, [[0.3, 0.2], [0.01, 0.5]])
+
+    def test_changed_particles(self):
+        # after particles are added, the new state is shown without interpolation
+        self.particles.append([[0.7, 0.7]], [[0.0, 0.0]], [2])
+        self.snapshots.publish(self.particles, 1)
+        with self.snapshots.read(0.0) as store:
+            np.testing.assert_array_equal(store.positions, self.particles.positions)
+
+class TestSimulationThread(unittest.TestCase):
+
+    def test_runs_commands_and_steps(self):
+        # queued commands run on the simulation thread, which then steps at its own rate
+        interaction_matrix = InteractionMatrix(num_types=5, min_radius=0.01, max_radius=0.15, global_repulsion=0.005)
+        simulation = Simulation(1000, 1000, interaction_matrix, 300, 5, 0.1, 0.2, 0.5, 0)
+        simulation.update(1 / 30)  # Compiles the kernels before timing the thread
+        runner = SimulationThread(simulation, rate=100)
+        threads = []
+
+        runner.start()
+        runner.submit(lambda: threads.append(threading.current_thread().name))
+        runner.submit(simulation.start_simulation)
+        time.sleep(0.5)
+        runner.stop()
+
+        self.assertEqual(threads, ["simulation"])
+        self.assertGreater(runner.steps, 10)
+        self.assertLessEqual(runner.steps, 60)  # The fixed rate limits the steps
+        with runner.snapshots.read() as store:
+            np.testing.assert_array_equal(store.positions, simulation.particles.positions)
+
+    def test_error_is_reported(self):
+        # an error in a step ends the thread and is raised on the main thread instead of being lost
+        interaction_matrix = InteractionMatrix(num_types=5, min_radius=0.01, max_radius=0.15, global_repulsion=0.005)
+        simulation = Simulation(1000, 1000, interaction_matrix, 100, 5, 0.1, 0.2, 0.5, 0)
+        def update(dt):
+            raise ValueError("broken step")
+        simulation.update = update
+        runner = SimulationThread(simulation, rate=100)
+
+        runner.start()
+        runner.submit(simulation.start_simulation)
+        runner._thread.join(timeout=5)
+        self.assertFalse(runner._thread.is_alive())
+        self.assertIsInstance(runner.error, ValueError)
+        with self.assertRaises(RuntimeError):
+            runner.interpolation()
+        with self.assertRaises(RuntimeError):
+            runner.submit(simulation.stop_simulation)
+        runner.stop()
+
+if __name__ == '__main__':
+    unittest.main()
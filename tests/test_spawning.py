@@ -0,0 +1,32 @@
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, 'src')
+from src.spawning import LAYOUTS, poisson_disk
+
+class TestSpawning(unittest.TestCase):
+
+    def test_layouts(self):
+        # every layout places the particles inside the square and continues the type sequence
+        for name, layout in LAYOUTS.items():
+            positions, types = layout(np.random.default_rng(0), 1000, 5, start_type=2)
+            self.assertEqual(positions.shape, (1000, 2), name)
+            self.assertTrue(np.all((positions >= 0) & (positions <= 1)), name)
+            np.testing.assert_array_equal(types[:4], [2, 3, 4, 0])
+
+    def test_regions(self):
+        # every type stays in its own strip
+        positions, types = LAYOUTS["regions"](np.random.default_rng(0), 1000, 4)
+        np.testing.assert_array_equal(np.floor(positions[:, 0] * 4), types)
+
+    def test_poisson_disk_distance(self):
+        # no two particles are closer than the radius
+        positions, _ = poisson_disk(np.random.default_rng(0), 2000, 5, radius=0.01)
+        differences = positions[:, None] - positions[None]
+        distances = np.sqrt((differences ** 2).sum(axis=2)) + np.eye(len(positions))
+        self.assertGreaterEqual(distances.min(), 0.01)
+        with self.assertRaises(ValueError):
+            poisson_disk(np.random.default_rng(0), 2000, 5, radius=0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, 'src')
+from src.sweep import expand_jobs, run_sweep
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        # a tiny sweep over two frictions, two random radii and two seeds
+        self.spec = {
+            "base": {"n_particles": 60},
+            "grid": {"friction": [0.3, 0.6]},
+            "random": {"samples": 2, "ranges": {"max_radius": [0.05, 0.2]}},
+            "seeds": 2,
+            "steps": 2
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "results.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_expand_jobs(self):
+        # every combination is expanded with stable ids, random samples are drawn the same way every time
+        jobs = expand_jobs(self.spec)
+        self.assertEqual(len(jobs), 8)
+        self.assertEqual(len({job["id"] for job in jobs}), 8)
+        self.assertEqual([job["id"] for job in jobs], [job["id"] for job in expand_jobs(self.spec)])
+        self.assertTrue(all(0.05 <= job["parameters"]["max_radius"] <= 0.2 for job in jobs))
+        with self.assertRaises(ValueError):
+            expand_jobs({"grid": {"fricton": [0.1]}})
+
+    def test_resume(self):
+        # an interrupted sweep only runs the missing jobs
+        jobs = expand_jobs(self.spec)
+        with open(self.output, "w") as file:
+            file.write(json.dumps({"id": jobs[0]["id"]}) + "\n")
+            file.write('{"id": "cut off')  # Incomplete last line of an interrupted sweep
+
+        self.assertEqual(run_sweep(self.spec, self.output, workers=0, progress=lambda line: None), 7)
+        with open(self.output) as file:
+            results = [json.loads(line) for line in file.readlines()[2:]]
+        self.assertEqual(len(results), 7)
+        self.assertEqual(set(results[0]["metrics"]), {"mean_speed", "neighbors", "clustering", "steps_per_second"})
+        self.assertEqual(run_sweep(self.spec, self.output, workers=0, progress=lambda line: None), 0)
+
+    def test_process_pool(self):
+        # jobs run in worker processes and stream back their results
+        spec = {**self.spec, "grid": {}, "random": None, "seeds": 2}
+        lines = []
+        self.assertEqual(run_sweep(spec, self.output, workers=2, progress=lines.append), 2)
+        self.assertEqual(len(lines), 3)
+
+if __name__ == "__main__":
+    unittest.main()
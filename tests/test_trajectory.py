@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.insert(0, 'src')
+import src.trajectory as trajectory
+from src.trajectory import TrajectoryRecorder, TrajectoryReader, ReplayPlayer
+from src.particle import ParticleStore
+from src.interactions import InteractionMatrix
+from src.simulation import Simulation
+
+class TestTrajectory(unittest.TestCase):
+
+    def setUp(self):
+        # a temporary directory and a few stores of different sizes to record
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.traj")
+        rng = np.random.default_rng(3)
+        self.stores = []
+        for count in (50, 50, 80, 0, 20):
+            store = ParticleStore()
+            store.append(rng.random((count, 2)), np.zeros((count, 2)), rng.integers(0, 5, count))
+            self.stores.append(store)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self, every=1):
+        recorder = TrajectoryRecorder(self.path, every)
+        for store in self.stores:
+            recorder.record(store)
+        recorder.close()
+        return TrajectoryReader(self.path)
+
+    def test_round_trip(self):
+        # every frame is read back with its own particle count, positions are stored as float32
+        reader = self.record()
+        self.assertEqual(len(reader), len(self.stores))
+        for index, store in enumerate(self.stores):
+            positions, types = reader.frame(index)
+            np.testing.assert_allclose(positions, store.positions, rtol=1e-6)
+            np.testing.assert_array_equal(types, store.types)
+        with self.assertRaises(IndexError):
+            reader.frame(len(self.stores))
+
+    def test_growth_and_every(self):
+        # files grow across many remaps, only every n-th frame is kept
+        chunk_bytes, trajectory.CHUNK_BYTES = trajectory.CHUNK_BYTES, 64
+        try:
+            reader = self.record(every=2)
+        finally:
+            trajectory.CHUNK_BYTES = chunk_bytes
+        self.assertEqual(len(reader), 3)
+        np.testing.assert_allclose(reader.frame(2)[0], self.stores[4].positions, rtol=1e-6)
+
+    def test_replay_player(self):
+        # the player seeks, clamps to the recorded range and plays at fractional and negative speeds
+        player = ReplayPlayer(self.record(), ParticleStore())
+        self.assertEqual(len(player.store), 50)
+        player.seek(2)
+        self.assertEqual(len(player.store), 80)
+        player.speed = 0.5
+        player.advance()
+        self.assertEqual(player.frame_index, 2)
+        player.advance()
+        self.assertEqual(player.frame_index, 3)
+        self.assertEqual(len(player.store), 0)
+        player.seek(100)
+        self.assertEqual(player.frame_index, 4)
+        player.speed = -10
+        player.advance()
+        self.assertEqual(player.frame_index, 0)
+
+    def test_simulation_recording(self):
+        # the simulation records every update until it is closed
+        matrix = InteractionMatrix(num_types=4, min_radius=0.01, max_radius=0.1, global_repulsion=0.004)
+        simulation = Simulation(1000, 1000, matrix, 100, 4, 0.1, 0.2, 0.5, 0.0)
+        simulation.set_recorder(self.path)
+        for _ in range(3):
+            simulation.update(0.1)
+        simulation.close()
+
+        reader = TrajectoryReader(self.path)
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(reader.num_types, 4)
+        np.testing.assert_allclose(reader.frame(2)[0], simulation.particles.positions, rtol=1e-6)
+
+if __name__ == "__main__":
+    unittest.main()